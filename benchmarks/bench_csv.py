@@ -0,0 +1,82 @@
+"""
+Benchmarks de la exportación e importación de CSV
+
+Compara CsvStream (bloques con NumPy) contra la versión anterior de
+FileHandler, que escribía y leía fila por fila con el módulo csv.
+
+Uso:
+    python benchmarks/bench_csv.py
+"""
+
+import csv
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from utils.CsvStream import read_csv, write_csv  # noqa: E402
+
+
+def legacy_write(path, data):
+    """save_data_to_csv anterior (sin el diálogo)"""
+    data_to_write = [['tiempo', 'presion', 'flujo', 'volumen']]
+    for i in range(len(data['t'])):
+        data_to_write.append([data['t'][i], data['p'][i], data['f'][i], data['v'][i]])
+    with open(path, 'w', newline='') as file:
+        csv.writer(file).writerows(data_to_write)
+
+
+def legacy_read(path):
+    """open_data_file anterior (sin el diálogo), más la conversión a arreglos"""
+    data = {'t': [], 'p': [], 'f': [], 'v': []}
+    with open(path, 'r') as file:
+        csv_reader = csv.reader(file)
+        next(csv_reader)
+        for row in csv_reader:
+            if len(row) >= 4:
+                data['t'].append(float(row[0]))
+                data['p'].append(float(row[1]))
+                data['f'].append(float(row[2]))
+                data['v'].append(float(row[3]))
+    return {key: np.asarray(values, dtype=np.float64) for key, values in data.items()}
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def bench_csv(sample_rate=500):
+    folder = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    for minutes in (10, 60):
+        n = minutes * 60 * sample_rate
+        t = np.arange(n) / sample_rate
+        data = {
+            't': t,
+            'p': rng.normal(0, 50, n),
+            'f': np.sin(t) + rng.normal(0, 0.01, n),
+            'v': np.cumsum(rng.normal(0, 0.001, n))
+        }
+        print(f"== {minutes} min a {sample_rate} Hz ({n} filas) ==")
+
+        legacy_path = os.path.join(folder, 'legacy.csv')
+        t_legacy_write = timed(legacy_write, legacy_path, {key: values.tolist() for key, values in data.items()})
+        t_legacy_read = timed(legacy_read, legacy_path)
+
+        for extension in ('.csv', '.csv.gz'):
+            path = os.path.join(folder, 'bloques' + extension)
+            t_write = timed(write_csv, path, data)
+            t_read = timed(read_csv, path)
+            print(f"  {extension:7s} escritura {t_write:6.2f} s (csv {t_legacy_write:6.2f} s, "
+                  f"{t_legacy_write / t_write:4.1f}x), lectura {t_read:6.2f} s (csv {t_legacy_read:6.2f} s, "
+                  f"{t_legacy_read / t_read:4.1f}x), {os.path.getsize(path) / 1e6:6.1f} MB")
+
+
+if __name__ == '__main__':
+    bench_csv()
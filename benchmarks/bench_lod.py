@@ -0,0 +1,43 @@
+"""
+Benchmarks de los niveles de detalle de curvas almacenadas
+
+Mide la construcción de CurvePyramid y la cantidad de puntos que llegan a
+pyqtgraph por redibujado, contra dibujar todas las muestras.
+
+Uso:
+    python benchmarks/bench_lod.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from utils.CurveLOD import CurvePyramid  # noqa: E402
+
+
+def bench_pyramid(pixels=800):
+    rng = np.random.default_rng(0)
+    for seconds in (6, 60, 3600):
+        t = np.arange(0, seconds, 1 / 500)
+        v = np.sin(t) + rng.normal(0, 0.01, len(t))
+        print(f"== Curva de {seconds} s ({len(t)} muestras), vista de {pixels} px ==")
+
+        start = time.perf_counter()
+        pyramid = CurvePyramid(t, v)
+        t_build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        x, y = pyramid.select(pixels, (0, seconds))
+        t_select = time.perf_counter() - start
+
+        assert y.max() == v.max() and y.min() == v.min()
+        print(f"  construcción {t_build * 1e3:8.2f} ms, selección {t_select * 1e3:.3f} ms, "
+              f"{len(x)} puntos dibujados de {len(t)} ({len(t) / len(x):.0f}x menos)")
+
+
+if __name__ == '__main__':
+    bench_pyramid()
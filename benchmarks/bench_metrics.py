@@ -0,0 +1,184 @@
+"""
+Benchmarks del cálculo de métricas de espirometría
+
+Compara el cálculo anterior de GraphHandler (intercambio de display_data y
+búsqueda de cruces recorriendo toda la curva en Python) con SpirometryMetrics
+sobre estudios sintéticos de 9 o más grabaciones, y las sugerencias de
+eliminación de maniobras (lazo anterior contra la versión vectorizada).
+
+Uso:
+    python benchmarks/bench_metrics.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from utils import SpirometryMetrics  # noqa: E402
+
+
+def build_recording(recording_number, rng, duration=6.0, sample_rate=500.0):
+    """Maniobra sintética: espiración forzada, meseta con ruido e inspiración"""
+    t = np.arange(0, duration, 1.0 / sample_rate)
+    fvc = rng.uniform(3.0, 4.5)
+    tau = rng.uniform(0.4, 0.7)
+
+    v = fvc * (1 - np.exp(-t / tau))
+    inspiration = t > 4.5
+    v[inspiration] -= fvc * 0.8 * (1 - np.cos(np.pi * (t[inspiration] - 4.5) / 1.5)) / 2
+    v += rng.normal(0, 0.002, len(t))
+    f = np.gradient(v, t)
+
+    return {
+        'recording_number': recording_number,
+        'bronchodilator_status': 'PRE' if recording_number % 2 else 'POST',
+        'data': {'t': t, 'p': np.zeros_like(t), 'f': f, 'v': v}
+    }, {
+        'vLine1': 0.0,
+        'vLine2': 1.0,
+        'v_line_pef': 0.3,
+        'v_line_fvc': float(fvc * 0.95)
+    }
+
+
+def build_study(n_recordings, seed=0):
+    rng = np.random.default_rng(seed)
+    recordings = []
+    line_positions = {}
+    for number in range(1, n_recordings + 1):
+        recording, positions = build_recording(number, rng)
+        recordings.append(recording)
+        line_positions[number] = positions
+    return recordings, line_positions
+
+
+def legacy_intersections(v_data, f_data, volume_pos):
+    """get_flow_intersections_at_volume anterior (recorrido de la curva en Python)"""
+    intersections = []
+    for i in range(1, len(v_data)):
+        if min(v_data[i-1], v_data[i]) <= volume_pos <= max(v_data[i-1], v_data[i]):
+            if v_data[i] != v_data[i-1]:
+                t = (volume_pos - v_data[i-1]) / (v_data[i] - v_data[i-1])
+                intersections.append(f_data[i-1] + t * (f_data[i] - f_data[i-1]))
+
+    positive_flows = [f for f in intersections if f > 0]
+    negative_flows = [f for f in intersections if f < 0]
+    return (max(positive_flows) if positive_flows else None,
+            min(negative_flows) if negative_flows else None)
+
+
+def legacy_study(recordings, line_positions):
+    """Métricas de todas las grabaciones como las calculaba GraphHandler"""
+    result = {}
+    for rec in recordings:
+        data = {key: list(values) for key, values in rec['data'].items()}
+        positions = line_positions[rec['recording_number']]
+
+        # El código anterior reconstruía arreglos desde listas en cada consulta
+        t = np.array(data['t'])
+        v_array = np.array(data['v'])
+        y1 = SpirometryMetrics.value_at_time(t, v_array, positions['vLine1'])
+        y2 = SpirometryMetrics.value_at_time(t, v_array, positions['vLine2'])
+
+        pef_vol = positions['v_line_pef']
+        fvc_vol = positions['v_line_fvc']
+        diff = (fvc_vol - pef_vol) / 4
+
+        metrics = {'pef': legacy_intersections(np.array(data['v']), np.array(data['f']), pef_vol)[0]}
+        for step, percent in enumerate((25, 50, 75), start=1):
+            fef, fif = legacy_intersections(np.array(data['v']), np.array(data['f']), pef_vol + diff * step)
+            metrics[f'fef{percent}'] = fef
+            metrics[f'fif{percent}'] = abs(fif) if fif is not None else None
+        metrics['fev1'] = abs(y2 - y1) if y1 is not None and y2 is not None else None
+        result[rec['recording_number']] = metrics
+    return result
+
+
+def timed(func, *args, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def engine_refresh(recordings, line_positions):
+    """Métricas, calidad y promedios PRE/POST como en un refresco del panel"""
+    metrics = SpirometryMetrics.study_metrics(recordings, line_positions)
+    summary = {}
+    for status in ('PRE', 'POST'):
+        group = [rec for rec in recordings if rec['bronchodilator_status'] == status]
+        pef_values = [{'recording_number': rec['recording_number'], 'pef': metrics[rec['recording_number']]['pef']}
+                      for rec in group if metrics[rec['recording_number']]['pef'] is not None]
+        summary[status] = (
+            SpirometryMetrics.quality(pef_values, len(group), status),
+            SpirometryMetrics.averages([metrics[rec['recording_number']] for rec in group], len(group), status)
+        )
+    return metrics, summary
+
+
+def bench_study_metrics():
+    for n_recordings in (9, 18, 36):
+        recordings, line_positions = build_study(n_recordings)
+        print(f"== {n_recordings} grabaciones de {len(recordings[0]['data']['t'])} muestras ==")
+
+        t_legacy, legacy = timed(legacy_study, recordings, line_positions, repeat=1)
+        t_engine, (metrics, _) = timed(engine_refresh, recordings, line_positions)
+
+        for number, expected in legacy.items():
+            for key, value in expected.items():
+                got = metrics[number][key]
+                assert (value is None) == (got is None), (number, key)
+                assert value is None or abs(value - got) < 1e-9, (number, key, value, got)
+
+        print(f"  anterior {t_legacy * 1e3:9.2f} ms, SpirometryMetrics {t_engine * 1e3:8.2f} ms "
+              f"({t_legacy / t_engine:.0f}x)")
+
+
+def legacy_removal_suggestions(pef_values, current_n, current_repeatability):
+    """calculate_removal_suggestions anterior (una lista nueva por maniobra)"""
+    suggestions = []
+    current_grade_value = SpirometryMetrics.GRADE_ORDER.get(
+        SpirometryMetrics.grade_for(current_n, current_repeatability), 0)
+    for i, pef_data in enumerate(pef_values):
+        remaining_pefs = [p['pef'] for j, p in enumerate(pef_values) if j != i]
+        new_repeatability = (max(remaining_pefs) - min(remaining_pefs)) * 1000
+        new_grade = SpirometryMetrics.grade_for(len(remaining_pefs), new_repeatability)
+        if SpirometryMetrics.GRADE_ORDER.get(new_grade, 0) > current_grade_value:
+            suggestions.append({
+                'recording_number': pef_data['recording_number'],
+                'new_grade': new_grade,
+                'new_repeatability': new_repeatability
+            })
+    return suggestions
+
+
+def bench_removal_suggestions():
+    rng = np.random.default_rng(1)
+    for n_maneuvers in (9, 100, 1000):
+        # Maniobras repetibles y algunas fuera de rango que impiden el grado A
+        pefs = rng.normal(7.0, 0.03, n_maneuvers)
+        pefs[:2] += (0.5, -0.4)
+        pef_values = [{'recording_number': i + 1, 'pef': float(pef)} for i, pef in enumerate(pefs)]
+        repeatability = (pefs.max() - pefs.min()) * 1000
+        print(f"== Sugerencias con {n_maneuvers} maniobras ==")
+
+        t_legacy, legacy = timed(legacy_removal_suggestions, pef_values, n_maneuvers, repeatability, repeat=1)
+        t_loo, suggestions = timed(SpirometryMetrics.removal_suggestions, pef_values, n_maneuvers, repeatability)
+        assert suggestions == legacy
+        t_subset, subset = timed(SpirometryMetrics.best_subset, pef_values)
+
+        print(f"  anterior {t_legacy * 1e3:9.2f} ms, vectorizado {t_loo * 1e3:8.3f} ms "
+              f"({t_legacy / t_loo:.0f}x); mejor subconjunto {t_subset * 1e3:.3f} ms "
+              f"(grado {subset['grade']}, elimina {len(subset['remove'])})")
+
+
+if __name__ == '__main__':
+    bench_study_metrics()
+    bench_removal_suggestions()
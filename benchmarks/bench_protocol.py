@@ -0,0 +1,163 @@
+"""
+Benchmarks del protocolo binario del ESP32
+
+Uso:
+    python benchmarks/bench_protocol.py
+"""
+
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from serial_comm.binary_protocol import BinaryProtocolDecoder, SYNC_BYTE_1, SYNC_BYTE_2  # noqa: E402
+from serial_comm.crc16 import crc16, crc16_batch  # noqa: E402
+
+
+def firmware_crc16(data):
+    """Traducción literal de calculateCRC16() en firmware/esp32-unified/src/protocol.cpp"""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ 0x8408
+            else:
+                crc >>= 1
+    return crc & 0xFFFF
+
+
+def build_payloads(n_frames, n_datos, seed=0):
+    """Genera payloads (ID_ESP32 .. fin de DATOS) como los arma sendBuffer()"""
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for i in range(n_frames):
+        payload = struct.pack('<HIB', 1, 1000 + 2 * i, n_datos)
+        for k in range(n_datos):
+            payload += struct.pack('<Bf', 0x10 + k, float(rng.normal(0, 1e5)))
+        payloads.append(payload)
+    return payloads
+
+
+def build_noisy_stream(n_frames, n_datos, noise_ratio, seed=0):
+    """
+    Genera un flujo de mensajes válidos intercalados con basura
+
+    La basura mezcla bytes aleatorios (incluyendo falsos 0xFF) con texto ASCII
+    como el que imprime el firmware al arrancar.
+    """
+    rng = np.random.default_rng(seed)
+    ascii_noise = b"Iniciando mediciones...\r\nTiempo(ms),Presion(kPa)\r\n"
+    stream = bytearray()
+    for payload in build_payloads(n_frames, n_datos, seed):
+        if rng.random() < noise_ratio:
+            if rng.random() < 0.5:
+                stream += ascii_noise
+            else:
+                stream += rng.integers(0, 256, int(rng.integers(1, 64)), dtype=np.uint8).tobytes()
+        stream += bytes((SYNC_BYTE_1, SYNC_BYTE_2)) + payload + struct.pack('<H', crc16(payload))
+    return bytes(stream)
+
+
+def legacy_find_sync(buffer):
+    """Búsqueda índice por índice usada antes de bytes.find"""
+    for i in range(len(buffer) - 1):
+        if buffer[i] == SYNC_BYTE_1 and buffer[i + 1] == SYNC_BYTE_2:
+            return i
+    return -1
+
+
+def timed(func, *args, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_crc16(n_frames=5000, n_datos=4):
+    print(f"== CRC16: {n_frames} mensajes de {n_datos} datos ==")
+
+    # Valor de verificación estándar de CRC-16/MCRF4XX
+    assert firmware_crc16(b"123456789") == 0x6F91
+    assert crc16(b"123456789") == 0x6F91
+
+    payloads = build_payloads(n_frames, n_datos)
+    matrix = np.frombuffer(b"".join(payloads), dtype=np.uint8).reshape(n_frames, -1)
+
+    t_ref, ref = timed(lambda: [firmware_crc16(p) for p in payloads])
+    t_table, table = timed(lambda: [crc16(p) for p in payloads])
+    t_batch, batch = timed(crc16_batch, matrix)
+
+    assert table == ref, "crc16 no coincide con el firmware"
+    assert batch.tolist() == ref, "crc16_batch no coincide con el firmware"
+
+    print(f"  firmware (bit a bit): {t_ref * 1e3:8.2f} ms")
+    print(f"  tabla 256 entradas:   {t_table * 1e3:8.2f} ms  (x{t_ref / t_table:.1f})")
+    print(f"  lote NumPy:           {t_batch * 1e3:8.2f} ms  (x{t_ref / t_batch:.1f})")
+
+
+def bench_sync_search(garbage_size=64 * 1024, seed=0):
+    print(f"== Búsqueda de sincronía en {garbage_size // 1024} KiB de basura ==")
+
+    # Basura sin pares 0xFF 0xAA y una sincronía al final
+    rng = np.random.default_rng(seed)
+    garbage = rng.integers(0, 256, garbage_size, dtype=np.uint8)
+    garbage[garbage == SYNC_BYTE_2] = 0
+    data = garbage.tobytes() + bytes((SYNC_BYTE_1, SYNC_BYTE_2))
+
+    decoder = BinaryProtocolDecoder(buffer_capacity=2 * len(data))
+    decoder.add_data(data)
+
+    t_legacy, idx_legacy = timed(legacy_find_sync, bytearray(data))
+    t_find, idx_find = timed(decoder.find_sync_bytes)
+
+    assert idx_legacy == idx_find == garbage_size
+
+    print(f"  índice por índice:    {t_legacy * 1e3:8.2f} ms")
+    print(f"  bytes.find:           {t_find * 1e3:8.3f} ms  (x{t_legacy / t_find:.0f})")
+
+
+def bench_noisy_decode(n_frames=5000, n_datos=4, chunk_size=4096):
+    print(f"== Decodificación de flujos ruidosos: {n_frames} mensajes, chunks de {chunk_size} B ==")
+
+    for noise_ratio in (0.0, 0.1, 0.5):
+        stream = build_noisy_stream(n_frames, n_datos, noise_ratio)
+        chunks = [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+
+        def run_messages():
+            decoder = BinaryProtocolDecoder()
+            count = 0
+            for chunk in chunks:
+                decoder.add_data(chunk)
+                count += len(decoder.process_buffer())
+            return count, decoder.get_stats()
+
+        def run_batch():
+            decoder = BinaryProtocolDecoder()
+            count = 0
+            for chunk in chunks:
+                decoder.add_data(chunk)
+                count += len(decoder.decode_batch())
+            return count // n_datos, decoder.get_stats()
+
+        t_messages, (n_messages, stats) = timed(run_messages)
+        t_batch, (n_batch, _) = timed(run_batch)
+
+        assert n_messages == n_batch == n_frames
+
+        print(f"  ruido {noise_ratio:.0%}: process_buffer {t_messages * 1e3:8.2f} ms, "
+              f"decode_batch {t_batch * 1e3:8.2f} ms, "
+              f"resincronizaciones={stats['resync_count']}, descartados={stats['discarded_bytes']} B")
+
+
+if __name__ == '__main__':
+    bench_crc16()
+    bench_sync_search()
+    bench_noisy_decode()
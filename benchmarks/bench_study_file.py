@@ -0,0 +1,60 @@
+"""
+Benchmarks del formato de estudio: RAW JSON contra el contenedor binario
+
+Uso:
+    python benchmarks/bench_study_file.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_metrics import build_study  # noqa: E402
+from utils import StudyContainer  # noqa: E402
+
+
+def bench_study_file():
+    folder = tempfile.mkdtemp()
+    for n_recordings in (9, 36):
+        recordings, line_positions = build_study(n_recordings)
+        study = {
+            'device': 'fisioaccess_espiro',
+            'version': '1.0',
+            'patient': {'nombre': 'Paciente', 'rut': '1-9'},
+            'recordings': recordings,
+            'line_positions': {str(number): positions for number, positions in line_positions.items()}
+        }
+
+        json_path = os.path.join(folder, f'estudio_{n_recordings}.json')
+        binary_path = os.path.join(folder, f'estudio_{n_recordings}{StudyContainer.STUDY_EXTENSION}')
+        StudyContainer.study_to_json(study, json_path)
+        StudyContainer.write_study(binary_path, study)
+
+        start = time.perf_counter()
+        with open(json_path, 'r') as file:
+            json.load(file)
+        t_json = time.perf_counter() - start
+
+        start = time.perf_counter()
+        StudyContainer.read_study(binary_path)
+        t_binary = time.perf_counter() - start
+
+        start = time.perf_counter()
+        StudyContainer.read_study_header(binary_path)
+        t_header = time.perf_counter() - start
+
+        json_size = os.path.getsize(json_path)
+        binary_size = os.path.getsize(binary_path)
+        print(f"== {n_recordings} grabaciones ==")
+        print(f"  JSON {json_size / 1e6:6.2f} MB, binario {binary_size / 1e6:6.2f} MB ({json_size / binary_size:.1f}x)")
+        print(f"  lectura JSON {t_json * 1e3:7.2f} ms, binario {t_binary * 1e3:6.2f} ms, "
+              f"solo encabezado {t_header * 1e3:.3f} ms")
+
+
+if __name__ == '__main__':
+    bench_study_file()
@@ -1,11 +1,18 @@
+import time
+
 from PySide6.QtCore import QObject, Signal, Slot
-from .binary_protocol import BinaryProtocolDecoder, SensorDataProcessor
+from .binary_protocol import BinaryProtocolDecoder, SensorDataProcessor, SamplePipeline
 
 class SerialDataHandler(QObject):
     # Señal para nuevos datos procesados
     new_data = Signal(dict)
+    # Señal para bloques de muestras (dict de arreglos NumPy 't', 'p', 'f', 'v')
+    new_block = Signal(object)
     # Señal para strings no estándar
     other_string = Signal(str)
+    # Estado de la adquisición (TimeBase.get_stats más los huecos nuevos),
+    # como mucho una vez por stats_interval segundos
+    acquisition_stats = Signal(dict)
 
     def __init__(self):
         super().__init__()
@@ -13,17 +20,41 @@ class SerialDataHandler(QObject):
         self.binary_decoder = BinaryProtocolDecoder()
         self.sensor_processor = SensorDataProcessor()
 
-        # Modo de operación: 'binary' o 'csv' (para compatibilidad)
-        self.mode = 'binary'
+        # Pipeline que decodifica en el thread lector (modo 'pipeline')
+        self.pipeline = SamplePipeline(self.sensor_processor, self.binary_decoder)
+
+        # Modo de operación: 'pipeline' (decodificación en el thread lector y
+        # bloques por new_block), 'binary' (decodificación en la GUI y una señal
+        # new_data por muestra) o 'csv' (para compatibilidad)
+        self.mode = 'pipeline'
+
+        self.stats_interval = 1.0
+        self._last_stats = 0.0
 
     def reset_volume(self):
         """Reinicia el cálculo de volumen acumulado"""
-        self.sensor_processor.reset_volume()
+        if self.mode == 'pipeline':
+            # El procesador lo usa el thread lector: reiniciar allí
+            self.pipeline.request_reset()
+        else:
+            self.sensor_processor.reset_volume()
 
     def set_pressure_calibration(self, offset_1, offset_2):
         """Establece los valores de calibración para los sensores de presión"""
         self.sensor_processor.set_pressure_calibration(offset_1, offset_2)
 
+    def get_channel(self, name):
+        """
+        Buffer de un canal del dispositivo (ECG, EMG, IMU, ...)
+
+        Args:
+            name (str): Nombre del canal (ej. 'ecg_ch1')
+
+        Returns:
+            ChannelBuffer: Buffer del canal o None si no existe
+        """
+        return self.sensor_processor.get_channel(name)
+
     @Slot(bytes)
     def analisis_input_binary(self, data_bytes):
         """
@@ -47,11 +78,43 @@ class SerialDataHandler(QObject):
                     # Emitir los datos procesados
                     self.new_data.emit(data_dict)
 
+            self.report_stats()
+
         except Exception as e:
             error_msg = f"Error procesando datos binarios: {str(e)}"
             print(error_msg)
             self.other_string.emit(error_msg)
 
+    @Slot(object)
+    def analisis_block(self, block):
+        """
+        Recibir un bloque de muestras ya decodificado en el thread lector
+
+        Args:
+            block (dict): Arreglos NumPy con keys 't', 'p', 'f', 'v'
+        """
+        self.new_block.emit(block)
+        self.report_stats()
+
+    def report_stats(self, force=False):
+        """
+        Emitir acquisition_stats con la frecuencia y el jitter estimados y
+        los mensajes perdidos
+
+        Args:
+            force (bool): Emitir aunque no haya pasado stats_interval
+        """
+        now = time.monotonic()
+        if not force and now - self._last_stats < self.stats_interval:
+            return
+        self._last_stats = now
+
+        processor = self.sensor_processor
+        stats = processor.timebase.get_stats()
+        stats['gaps'] = processor.timebase.take_gaps()
+        stats['integration_gaps'] = processor.integrator.take_gaps()
+        self.acquisition_stats.emit(stats)
+
     def validate_time(self, time_value):
         """
         Validar el valor del tiempo.
@@ -95,9 +158,10 @@ class SerialDataHandler(QObject):
                 if not all(isinstance(x, (int, float)) for x in [p, f, v]):
                     raise ValueError("Valores no numéricos detectados")
                 
-                # Crear diccionario de datos
+                # Crear diccionario de datos (el dispositivo envía ms; la
+                # base de tiempo aguas abajo es en segundos)
                 data_dict = {
-                    't': t,
+                    't': t / 1000.0,
                     'p': p,
                     'f': f,
                     'v': v
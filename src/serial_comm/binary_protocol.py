@@ -14,28 +14,178 @@ Endianness: Little-endian
 
 import struct
 
+import numpy as np
+
+from .channels import ChannelBuffer
+from .crc16 import crc16, crc16_frames
+from .integrator import StreamingIntegrator
+from .ring_buffer import ByteRingBuffer
+from .timebase import TimeBase
+
 # Constantes del protocolo
 SYNC_BYTE_1 = 0xFF
 SYNC_BYTE_2 = 0xAA
-
-# IDs de sensores
-ID_PRESION_1 = 0x33  # Sensor 1 RAW ADC (HX710B 24-bit) - Espirometría
-ID_PRESION_2 = 0x34  # Sensor 2 RAW ADC (HX710B 24-bit) - Rinomanometría
+SYNC_WORD = bytes((SYNC_BYTE_1, SYNC_BYTE_2))
+HEADER_SIZE = 9  # SYNC(2) + ID_ESP32(2) + TIMESTAMP(4) + N_DATOS(1)
+DATUM_SIZE = 5   # ID(1) + VALUE_FLOAT(4)
+CRC_SIZE = 2
+
+# IDs de sensores (hardware/firmware/esp32-unified/src/protocol.h)
+# Ambientales
+ID_TEMPERATURA = 0x01
+ID_HUMEDAD = 0x02
+ID_PRESION_BAR = 0x03
+
+# ECG (AD8232)
 ID_ECG_CH1 = 0x10    # ECG Canal 1 (RAW ADC)
-ID_EMG_CH1 = 0x18    # EMG Canal 1 (RAW ADC)
+ID_ECG_CH2 = 0x11    # ECG Canal 2 (RAW ADC)
+ID_ECG_CH3 = 0x12    # ECG Canal 3 (RAW ADC)
+ID_ECG_CH4 = 0x13    # ECG Canal 4 (RAW ADC)
+ID_HEART_RATE = 0x14    # Frecuencia cardíaca (BPM)
+ID_SPO2 = 0x15          # SpO2 (%)
 ID_ECG_LD_PLUS = 0x16   # Estado del lead detection positivo (0/1)
 ID_ECG_LD_MINUS = 0x17  # Estado del lead detection negativo (0/1)
 
+# EMG
+ID_EMG_CH1 = 0x18    # EMG Canal 1 (RAW ADC)
+ID_EMG_CH2 = 0x19    # EMG Canal 2 (RAW ADC)
+ID_EMG_CH3 = 0x1A    # EMG Canal 3 (RAW ADC)
+ID_EMG_CH4 = 0x1B    # EMG Canal 4 (RAW ADC)
+
+# ADC genérico
+ID_ADC_CH0 = 0x20
+ID_ADC_CH1 = 0x21
+ID_ADC_CH2 = 0x22
+ID_ADC_CH3 = 0x23
+
+# Presión / fuerza
+ID_PRESION_AIRE = 0x30
+ID_CELULA_CARGA = 0x31
+ID_FUERZA = 0x32
+ID_PRESION_1 = 0x33  # Sensor 1 RAW ADC (HX710B 24-bit) - Espirometría
+ID_PRESION_2 = 0x34  # Sensor 2 RAW ADC (HX710B 24-bit) - Rinomanometría
+
+# TGAM (EEG)
+ID_TGAM_QUALITY = 0x40
+ID_TGAM_ATTENTION = 0x41
+ID_TGAM_MEDITATION = 0x42
+ID_TGAM_DELTA = 0x43
+ID_TGAM_THETA = 0x44
+ID_TGAM_LOW_ALPHA = 0x45
+ID_TGAM_HIGH_ALPHA = 0x46
+ID_TGAM_LOW_BETA = 0x47
+ID_TGAM_HIGH_BETA = 0x48
+ID_TGAM_LOW_GAMMA = 0x49
+ID_TGAM_HIGH_GAMMA = 0x4A
+
+# EEG RAW
+ID_EEG_RAW_CH1 = 0x50
+ID_EEG_RAW_CH2 = 0x51
+ID_EEG_RAW_CH3 = 0x52
+ID_EEG_RAW_CH4 = 0x53
+
+# IMU
+ID_ACCEL_X = 0x60
+ID_ACCEL_Y = 0x61
+ID_ACCEL_Z = 0x62
+ID_GYRO_X = 0x63
+ID_GYRO_Y = 0x64
+ID_GYRO_Z = 0x65
+ID_MAG_X = 0x66
+ID_MAG_Y = 0x67
+ID_MAG_Z = 0x68
+
+# Orientación
+ID_ROLL = 0x70
+ID_PITCH = 0x71
+ID_YAW = 0x72
+ID_QUAT_W = 0x73
+ID_QUAT_X = 0x74
+ID_QUAT_Y = 0x75
+ID_QUAT_Z = 0x76
+
+# Nombre y unidad de cada sensor para la tabla de canales
+SENSOR_INFO = {
+    ID_TEMPERATURA: ('temperatura', '°C'),
+    ID_HUMEDAD: ('humedad', '%'),
+    ID_PRESION_BAR: ('presion_bar', 'hPa'),
+    ID_ECG_CH1: ('ecg_ch1', 'raw'),
+    ID_ECG_CH2: ('ecg_ch2', 'raw'),
+    ID_ECG_CH3: ('ecg_ch3', 'raw'),
+    ID_ECG_CH4: ('ecg_ch4', 'raw'),
+    ID_HEART_RATE: ('heart_rate', 'BPM'),
+    ID_SPO2: ('spo2', '%'),
+    ID_ECG_LD_PLUS: ('ecg_ld_plus', ''),
+    ID_ECG_LD_MINUS: ('ecg_ld_minus', ''),
+    ID_EMG_CH1: ('emg_ch1', 'raw'),
+    ID_EMG_CH2: ('emg_ch2', 'raw'),
+    ID_EMG_CH3: ('emg_ch3', 'raw'),
+    ID_EMG_CH4: ('emg_ch4', 'raw'),
+    ID_ADC_CH0: ('adc_ch0', 'raw'),
+    ID_ADC_CH1: ('adc_ch1', 'raw'),
+    ID_ADC_CH2: ('adc_ch2', 'raw'),
+    ID_ADC_CH3: ('adc_ch3', 'raw'),
+    ID_PRESION_AIRE: ('presion_aire', 'raw'),
+    ID_CELULA_CARGA: ('celula_carga', 'raw'),
+    ID_FUERZA: ('fuerza', 'raw'),
+    ID_PRESION_1: ('presion_1', 'kPa'),
+    ID_PRESION_2: ('presion_2', 'kPa'),
+    ID_TGAM_QUALITY: ('tgam_quality', ''),
+    ID_TGAM_ATTENTION: ('tgam_attention', ''),
+    ID_TGAM_MEDITATION: ('tgam_meditation', ''),
+    ID_TGAM_DELTA: ('tgam_delta', ''),
+    ID_TGAM_THETA: ('tgam_theta', ''),
+    ID_TGAM_LOW_ALPHA: ('tgam_low_alpha', ''),
+    ID_TGAM_HIGH_ALPHA: ('tgam_high_alpha', ''),
+    ID_TGAM_LOW_BETA: ('tgam_low_beta', ''),
+    ID_TGAM_HIGH_BETA: ('tgam_high_beta', ''),
+    ID_TGAM_LOW_GAMMA: ('tgam_low_gamma', ''),
+    ID_TGAM_HIGH_GAMMA: ('tgam_high_gamma', ''),
+    ID_EEG_RAW_CH1: ('eeg_raw_ch1', 'raw'),
+    ID_EEG_RAW_CH2: ('eeg_raw_ch2', 'raw'),
+    ID_EEG_RAW_CH3: ('eeg_raw_ch3', 'raw'),
+    ID_EEG_RAW_CH4: ('eeg_raw_ch4', 'raw'),
+    ID_ACCEL_X: ('accel_x', 'g'),
+    ID_ACCEL_Y: ('accel_y', 'g'),
+    ID_ACCEL_Z: ('accel_z', 'g'),
+    ID_GYRO_X: ('gyro_x', '°/s'),
+    ID_GYRO_Y: ('gyro_y', '°/s'),
+    ID_GYRO_Z: ('gyro_z', '°/s'),
+    ID_MAG_X: ('mag_x', 'uT'),
+    ID_MAG_Y: ('mag_y', 'uT'),
+    ID_MAG_Z: ('mag_z', 'uT'),
+    ID_ROLL: ('roll', '°'),
+    ID_PITCH: ('pitch', '°'),
+    ID_YAW: ('yaw', '°'),
+    ID_QUAT_W: ('quat_w', ''),
+    ID_QUAT_X: ('quat_x', ''),
+    ID_QUAT_Y: ('quat_y', ''),
+    ID_QUAT_Z: ('quat_z', ''),
+}
+
+# Tipo de muestra devuelto por la decodificación por lotes (una fila por dato)
+SAMPLE_DTYPE = np.dtype([
+    ('timestamp', '<u4'),
+    ('esp32_id', '<u2'),
+    ('sensor_id', 'u1'),
+    ('value', '<f4'),
+])
+
 
 class BinaryProtocolDecoder:
     """Decodificador del protocolo binario del ESP32"""
 
-    def __init__(self):
-        self.buffer = bytearray()
+    def __init__(self, buffer_capacity=65536):
+        self.buffer = ByteRingBuffer(buffer_capacity)
+
+        # Diagnóstico de sincronización
+        self.resync_count = 0      # Veces que se descartaron bytes para recuperar la sincronía
+        self.discarded_bytes = 0   # Total de bytes descartados
+        self.crc_errors = 0        # Mensajes descartados por CRC inválido
 
     def calculate_crc16(self, data):
         """
-        Calcula CRC16 usando el algoritmo compatible con el ESP32
+        Calcula CRC16 usando el algoritmo compatible con el ESP32 (tabla de 256 entradas)
 
         Args:
             data (bytes): Datos para calcular CRC
@@ -43,15 +193,7 @@ class BinaryProtocolDecoder:
         Returns:
             int: Valor CRC16
         """
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 0x0001:
-                    crc = (crc >> 1) ^ 0x8408
-                else:
-                    crc >>= 1
-        return crc & 0xFFFF
+        return crc16(data)
 
     def add_data(self, data):
         """
@@ -60,19 +202,64 @@ class BinaryProtocolDecoder:
         Args:
             data (bytes): Datos recibidos del puerto serial
         """
-        self.buffer.extend(data)
+        self.buffer.write(data)
 
-    def find_sync_bytes(self):
+    def find_sync_bytes(self, start=0):
         """
         Busca los bytes de sincronización en el buffer
 
+        Args:
+            start (int): Posición desde la cual buscar
+
         Returns:
             int: Índice donde comienzan los bytes de sincronización, -1 si no se encuentra
         """
-        for i in range(len(self.buffer) - 1):
-            if self.buffer[i] == SYNC_BYTE_1 and self.buffer[i + 1] == SYNC_BYTE_2:
-                return i
-        return -1
+        return self.buffer.find(SYNC_WORD, start)
+
+    def discard(self, n):
+        """
+        Descarta n bytes del inicio del buffer y registra la resincronización
+
+        Args:
+            n (int): Cantidad de bytes a descartar
+        """
+        if n <= 0:
+            return
+        self.buffer.consume(n)
+        self.resync_count += 1
+        self.discarded_bytes += n
+
+    def discard_until_sync(self, start=0):
+        """
+        Salta directamente al siguiente candidato de sincronización desde start
+
+        Si no hay ninguno se descarta todo salvo un posible SYNC_BYTE_1 final,
+        que podría ser la primera mitad de la siguiente sincronía.
+
+        Args:
+            start (int): Posición desde la cual buscar
+        """
+        next_sync = self.find_sync_bytes(start)
+        if next_sync == -1:
+            length = len(self.buffer)
+            keep = 1 if length and self.buffer[-1] == SYNC_BYTE_1 else 0
+            next_sync = length - keep
+        self.discard(next_sync)
+
+    def get_stats(self):
+        """
+        Obtener estadísticas de sincronización para diagnóstico
+
+        Returns:
+            dict: resync_count, discarded_bytes, crc_errors, dropped_bytes, buffered_bytes
+        """
+        return {
+            'resync_count': self.resync_count,
+            'discarded_bytes': self.discarded_bytes,
+            'crc_errors': self.crc_errors,
+            'dropped_bytes': self.buffer.dropped_bytes,
+            'buffered_bytes': len(self.buffer)
+        }
 
     def decode_message(self):
         """
@@ -86,63 +273,57 @@ class BinaryProtocolDecoder:
                     'sensors': {sensor_id: value, ...}
                 }
         """
-        # Buscar bytes de sincronización
-        sync_idx = self.find_sync_bytes()
-
-        if sync_idx == -1:
-            # No se encontraron bytes de sincronización
-            # Limpiar buffer si es muy grande para evitar acumulación
-            if len(self.buffer) > 1024:
-                self.buffer = self.buffer[-256:]
-            return None
-
-        # Eliminar datos antes de los bytes de sincronización
-        if sync_idx > 0:
-            self.buffer = self.buffer[sync_idx:]
+        # Saltar datos basura hasta los bytes de sincronización
+        if self.find_sync_bytes() != 0:
+            self.discard_until_sync()
+            if len(self.buffer) < 2:
+                return None
 
         # Verificar que haya suficientes bytes para el header mínimo
         # SYNC(2) + ID_ESP32(2) + TIMESTAMP(4) + N_DATOS(1) = 9 bytes
-        if len(self.buffer) < 9:
+        if len(self.buffer) < HEADER_SIZE:
             return None
 
-        # Decodificar header
-        esp32_id = struct.unpack('<H', self.buffer[2:4])[0]  # Little-endian uint16
-        timestamp = struct.unpack('<I', self.buffer[4:8])[0]  # Little-endian uint32
-        n_datos = self.buffer[8]
+        view = self.buffer.view()
+        try:
+            # Decodificar header (little-endian uint16, uint32, uint8)
+            esp32_id, timestamp, n_datos = struct.unpack_from('<HIB', view, 2)
 
-        # Calcular tamaño total del mensaje
-        # Header(9) + Datos(n_datos * 5) + CRC(2)
-        message_size = 9 + (n_datos * 5) + 2
+            # Calcular tamaño total del mensaje
+            # Header(9) + Datos(n_datos * 5) + CRC(2)
+            message_size = HEADER_SIZE + (n_datos * DATUM_SIZE) + CRC_SIZE
 
-        # Verificar que tengamos el mensaje completo
-        if len(self.buffer) < message_size:
-            return None
+            # Verificar que tengamos el mensaje completo
+            if len(view) < message_size:
+                return None
 
-        # Extraer mensaje completo
-        message = self.buffer[:message_size]
+            # Vista del mensaje completo (sin copia)
+            message = view[:message_size]
 
-        # Verificar CRC
-        crc_received = struct.unpack('<H', message[-2:])[0]
-        crc_calculated = self.calculate_crc16(message[2:-2])  # Desde ID_ESP32 hasta fin de datos
+            # Verificar CRC
+            crc_received = struct.unpack_from('<H', message, message_size - CRC_SIZE)[0]
+            crc_calculated = self.calculate_crc16(message[2:-CRC_SIZE])  # Desde ID_ESP32 hasta fin de datos
 
-        if crc_received != crc_calculated:
-            print(f"Error CRC: recibido={crc_received:04X}, calculado={crc_calculated:04X}")
-            # Eliminar el mensaje corrupto y buscar el siguiente
-            self.buffer = self.buffer[2:]  # Saltar los bytes de sync y buscar el siguiente
-            return None
+            if crc_received != crc_calculated:
+                print(f"Error CRC: recibido={crc_received:04X}, calculado={crc_calculated:04X}")
+                self.crc_errors += 1
+                # Saltar al siguiente candidato de sincronización (sin copiar el buffer)
+                self.discard_until_sync(2)
+                return None
 
-        # Decodificar datos de sensores
-        sensors = {}
-        idx = 9  # Comenzar después del header
+            # Decodificar datos de sensores
+            sensors = {}
+            idx = HEADER_SIZE  # Comenzar después del header
 
-        for _ in range(n_datos):
-            sensor_id = message[idx]
-            sensor_value = struct.unpack('<f', message[idx+1:idx+5])[0]  # Little-endian float
-            sensors[sensor_id] = sensor_value
-            idx += 5
+            for _ in range(n_datos):
+                sensor_id, sensor_value = struct.unpack_from('<Bf', message, idx)  # Little-endian float
+                sensors[sensor_id] = sensor_value
+                idx += DATUM_SIZE
+        finally:
+            view.release()
 
         # Eliminar mensaje procesado del buffer
-        self.buffer = self.buffer[message_size:]
+        self.buffer.consume(message_size)
 
         return {
             'esp32_id': esp32_id,
@@ -160,13 +341,157 @@ class BinaryProtocolDecoder:
         messages = []
 
         while True:
+            pending = len(self.buffer)
             message = self.decode_message()
             if message is None:
-                break
+                # Tras descartar un mensaje corrupto puede haber otros completos
+                if len(self.buffer) == pending:
+                    break
+                continue
             messages.append(message)
 
         return messages
 
+    def decode_batch(self):
+        """
+        Decodifica en una sola pasada todos los mensajes completos del buffer
+
+        Localiza todos los pares de sincronización de forma vectorizada, encadena
+        los mensajes estructuralmente completos y valida sus CRC en una sola
+        llamada vectorizada. Ante un CRC inválido se vuelve a encadenar desde el
+        siguiente par de sincronización. El buffer se compacta una sola vez al final.
+
+        Returns:
+            numpy.ndarray: Arreglo estructurado con dtype SAMPLE_DTYPE
+                (timestamp, esp32_id, sensor_id, value), una fila por dato
+        """
+        length = len(self.buffer)
+
+        if length < 2:
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+
+        # Vista sin copia de la región legible del buffer
+        buf = np.frombuffer(self.buffer.view(), dtype=np.uint8)
+
+        candidates = np.flatnonzero((buf[:-1] == SYNC_BYTE_1) & (buf[1:] == SYNC_BYTE_2)).tolist()
+
+        frame_starts = []
+        frame_counts = []
+        consumed = None
+        pos = 0
+        idx = 0
+
+        while consumed is None:
+            # Encadenar mensajes completos a partir de pos
+            chain_starts = []
+            chain_counts = []
+            while idx < len(candidates):
+                start = candidates[idx]
+                idx += 1
+                if start < pos:
+                    # Sincronía dentro de un mensaje ya encadenado
+                    continue
+
+                if start + HEADER_SIZE > length:
+                    consumed = start
+                    break
+
+                n_datos = int(buf[start + 8])
+                message_size = HEADER_SIZE + n_datos * DATUM_SIZE + CRC_SIZE
+
+                if start + message_size > length:
+                    consumed = start
+                    break
+
+                chain_starts.append(start)
+                chain_counts.append(n_datos)
+                pos = start + message_size
+            else:
+                # Sin mensajes incompletos: conservar un posible SYNC_BYTE_1 final
+                # (solo si no es el último byte de un mensaje ya encadenado)
+                consumed = length - 1 if pos < length and buf[-1] == SYNC_BYTE_1 else length
+
+            if not chain_starts:
+                break
+
+            # Validar todos los CRC del encadenamiento de una vez
+            starts = np.asarray(chain_starts, dtype=np.int64)
+            payload_sizes = 7 + np.asarray(chain_counts, dtype=np.int64) * DATUM_SIZE
+            crc_offsets = starts + 2 + payload_sizes
+            crc_received = buf[crc_offsets].astype(np.uint16) | (buf[crc_offsets + 1].astype(np.uint16) << 8)
+            crc_calculated = crc16_frames(buf, starts + 2, payload_sizes)
+            invalid = np.flatnonzero(crc_received != crc_calculated)
+
+            if len(invalid) == 0:
+                frame_starts.extend(chain_starts)
+                frame_counts.extend(chain_counts)
+                continue
+
+            first_bad = int(invalid[0])
+            self.crc_errors += 1
+            print(f"Error CRC: recibido={int(crc_received[first_bad]):04X}, "
+                  f"calculado={int(crc_calculated[first_bad]):04X}")
+            frame_starts.extend(chain_starts[:first_bad])
+            frame_counts.extend(chain_counts[:first_bad])
+
+            # Resincronizar desde el siguiente par posterior al mensaje corrupto
+            pos = chain_starts[first_bad] + 2
+            idx = int(np.searchsorted(candidates, pos))
+            consumed = None
+
+        self._count_discarded(frame_starts, frame_counts, consumed)
+
+        # Único avance del cursor de lectura
+        self.buffer.consume(consumed)
+
+        return self._extract_samples(buf, frame_starts, frame_counts)
+
+    def _count_discarded(self, frame_starts, frame_counts, consumed):
+        """
+        Contar los bytes consumidos que no pertenecen a mensajes válidos
+
+        Se calcula una vez al final de la pasada (y no al encadenar) para que
+        los reintentos tras un CRC inválido no cuenten dos veces el mismo
+        tramo: cada hueco entre mensajes válidos es una resincronización.
+        """
+        starts = np.asarray(frame_starts, dtype=np.int64)
+        ends = starts + HEADER_SIZE + np.asarray(frame_counts, dtype=np.int64) * DATUM_SIZE + CRC_SIZE
+        gap_starts = np.concatenate(([0], ends))
+        gap_ends = np.concatenate((starts, [consumed]))
+        gaps = gap_ends - gap_starts
+        gaps = gaps[gaps > 0]
+
+        self.resync_count += len(gaps)
+        self.discarded_bytes += int(gaps.sum())
+
+    def _extract_samples(self, buf, frame_starts, frame_counts):
+        """Extrae los datos de los mensajes validados como arreglo estructurado"""
+        starts = np.asarray(frame_starts, dtype=np.int64)
+        counts = np.asarray(frame_counts, dtype=np.int64)
+        total = int(counts.sum()) if len(counts) else 0
+
+        samples = np.empty(total, dtype=SAMPLE_DTYPE)
+        if total == 0:
+            return samples
+
+        # Cabecera de cada mensaje (little-endian)
+        header = buf[starts[:, None] + np.arange(2, 8)]
+        esp32_ids = header[:, 0:2].copy().view('<u2').ravel()
+        timestamps = header[:, 2:6].copy().view('<u4').ravel()
+
+        # Posición de cada dato dentro del buffer
+        frame_of_datum = np.repeat(np.arange(len(starts)), counts)
+        first_datum = np.cumsum(counts) - counts
+        datum_in_frame = np.arange(total) - np.repeat(first_datum, counts)
+        offsets = starts[frame_of_datum] + HEADER_SIZE + datum_in_frame * DATUM_SIZE
+
+        samples['timestamp'] = timestamps[frame_of_datum]
+        samples['esp32_id'] = esp32_ids[frame_of_datum]
+        samples['sensor_id'] = buf[offsets]
+        samples['value'] = buf[offsets[:, None] + np.arange(1, 5)].copy().view('<f4').ravel()
+
+        return samples
+
 
 class SensorDataProcessor:
     """Procesa datos RAW de sensores y los convierte a unidades físicas"""
@@ -176,8 +501,10 @@ class SensorDataProcessor:
         self.pressure_offset_1 = 0.0
         self.pressure_offset_2 = 0.0
 
+        # Base de tiempo: timestamp uint32 en ms -> segundos monótonos
+        self.timebase = TimeBase()
+
         # Estado para cálculo de flujo y volumen
-        self.last_timestamp = None
         self.accumulated_volume = 0.0
 
         # Constantes de conversión
@@ -186,6 +513,108 @@ class SensorDataProcessor:
         # Asumiendo sensibilidad típica del HX710B con MPS20N0040D
         self.kpa_per_raw_unit = 80.0 / 16777216.0  # 80 kPa rango total / 2^24
 
+        # Neumotacógrafo: Q = K * sqrt(|ΔP|) * sign(ΔP)
+        self.flow_constant = 0.5  # K, ajustar según calibración del dispositivo
+        self.noise_threshold_pa = 0.1  # Umbral de ruido
+
+        # Integración de volumen
+        self.max_dt = 0.5  # s; un salto mayor indica pérdida de datos
+        self.volume_min = 0.0  # L
+        self.volume_max = 10.0  # L
+
+        # Integrador del flujo ('rectangular', 'trapezoidal' o 'simpson');
+        # guarda el último tiempo/flujo y registra los huecos de datos
+        self.integrator = StreamingIntegrator('rectangular', max_gap=self.max_dt)
+
+        # Tabla de enrutamiento: ID de sensor -> ChannelBuffer con su conversión
+        self.channels = {}
+        self._build_default_channels()
+
+    def _build_default_channels(self):
+        """Registra un canal por cada sensor conocido del firmware"""
+        for sensor_id, (name, unit) in SENSOR_INFO.items():
+            self.register_channel(sensor_id, name, unit)
+
+        # Las presiones se convierten a kPa con el offset vigente al llegar el dato
+        self.channels[ID_PRESION_1].convert = lambda raw: self.raw_to_pressure(raw, self.pressure_offset_1)
+        self.channels[ID_PRESION_2].convert = lambda raw: self.raw_to_pressure(raw, self.pressure_offset_2)
+
+        # Lead detection: estado binario
+        for sensor_id in (ID_ECG_LD_PLUS, ID_ECG_LD_MINUS):
+            self.channels[sensor_id].convert = lambda raw: (raw >= 0.5).astype(np.float64)
+
+    def register_channel(self, sensor_id, name, unit='', convert=None, capacity=8192):
+        """
+        Enruta un ID de sensor a un buffer propio (reemplaza el existente)
+
+        Args:
+            sensor_id (int): ID del sensor en el protocolo
+            name (str): Nombre del canal
+            unit (str): Unidad del valor convertido
+            convert (callable): Conversión de un arreglo RAW a unidades físicas
+            capacity (int): Muestras retenidas por el canal
+
+        Returns:
+            ChannelBuffer: Buffer del canal
+        """
+        channel = ChannelBuffer(sensor_id, name, unit, convert, capacity)
+        self.channels[sensor_id] = channel
+        return channel
+
+    def unregister_channel(self, sensor_id):
+        """Deja de enrutar un ID de sensor (sus datos se ignoran)"""
+        self.channels.pop(sensor_id, None)
+
+    def get_channel(self, name):
+        """
+        Busca un canal por nombre
+
+        Args:
+            name (str): Nombre del canal (ej. 'ecg_ch1')
+
+        Returns:
+            ChannelBuffer: Buffer del canal o None si no existe
+        """
+        for channel in self.channels.values():
+            if channel.name == name:
+                return channel
+        return None
+
+    def route_samples(self, samples, t):
+        """
+        Distribuye las muestras de decode_batch a los buffers de cada canal
+
+        Los IDs sin canal registrado se ignoran.
+
+        Args:
+            samples (numpy.ndarray): Arreglo estructurado con dtype SAMPLE_DTYPE
+            t (numpy.ndarray): Tiempo en segundos de cada muestra (base de tiempo)
+        """
+        if len(samples) == 0:
+            return
+
+        sensor_ids = samples['sensor_id']
+        for sensor_id in np.unique(sensor_ids).tolist():
+            channel = self.channels.get(sensor_id)
+            if channel is None:
+                continue
+            mask = sensor_ids == sensor_id
+            channel.append(t[mask], samples['value'][mask])
+
+    def route_message(self, message, t):
+        """
+        Distribuye los datos de un mensaje decodificado a los buffers de cada canal
+
+        Args:
+            message (dict): Mensaje decodificado del protocolo binario
+            t (float): Tiempo del mensaje en segundos (base de tiempo)
+        """
+        t = np.array([t], dtype=np.float64)
+        for sensor_id, value in message['sensors'].items():
+            channel = self.channels.get(sensor_id)
+            if channel is not None:
+                channel.append(t, np.array([value], dtype=np.float64))
+
     def set_pressure_calibration(self, offset_1, offset_2):
         """
         Establece los valores de calibración para los sensores de presión
@@ -198,10 +627,19 @@ class SensorDataProcessor:
         self.pressure_offset_2 = offset_2
         print(f"Calibración actualizada: Sensor1={offset_1:.0f}, Sensor2={offset_2:.0f}")
 
+    def set_integration_method(self, method):
+        """
+        Cambia el método de integración del volumen
+
+        Args:
+            method (str): 'rectangular', 'trapezoidal' o 'simpson'
+        """
+        self.integrator = StreamingIntegrator(method, max_gap=self.max_dt)
+
     def reset_volume(self):
         """Reinicia el cálculo de volumen acumulado"""
         self.accumulated_volume = 0.0
-        self.last_timestamp = None
+        self.integrator.reset()
 
     def raw_to_pressure(self, raw_value, offset):
         """
@@ -235,9 +673,9 @@ class SensorDataProcessor:
         # Ecuación simplificada de flujo
         # Q = K * sqrt(|ΔP|) * sign(ΔP)
         # K es una constante de calibración del neumotacógrafo
-        K = 0.5  # Ajustar según calibración del dispositivo
+        K = self.flow_constant
 
-        if abs(pressure_pa) < 0.1:  # Umbral de ruido
+        if abs(pressure_pa) < self.noise_threshold_pa:  # Umbral de ruido
             return 0.0
 
         flow_sign = 1.0 if pressure_pa >= 0 else -1.0
@@ -245,40 +683,156 @@ class SensorDataProcessor:
 
         return flow
 
-    def calculate_volume(self, flow, timestamp):
+    def calculate_volume(self, flow, t):
         """
         Calcula volumen acumulado por integración numérica del flujo
 
         Args:
             flow (float): Flujo en L/s
-            timestamp (int): Timestamp en milisegundos
+            t (float): Tiempo en segundos (base de tiempo)
 
         Returns:
             float: Volumen acumulado en L
         """
-        if self.last_timestamp is None:
-            self.last_timestamp = timestamp
-            return self.accumulated_volume
-
-        # Calcular delta de tiempo en segundos
-        dt = (timestamp - self.last_timestamp) / 1000.0
-
-        # Limitar dt para evitar saltos grandes
-        if dt > 0.5:  # Más de 500ms indica pérdida de datos
-            dt = 0.0
-
-        # Integración trapezoidal (más precisa que rectangular)
-        # Necesitaríamos el flujo anterior, por ahora usamos rectangular
-        delta_volume = flow * dt
+        # Volumen del intervalo desde la muestra anterior; los saltos mayores
+        # a max_dt (pérdida de datos) no aportan y quedan en integrator.gaps
+        delta_volume = self.integrator.integrate_sample(t, flow)
 
         self.accumulated_volume += delta_volume
-        self.last_timestamp = timestamp
 
         # Limitar volumen a rango razonable (0 a 10L)
-        self.accumulated_volume = max(0.0, min(10.0, self.accumulated_volume))
+        self.accumulated_volume = max(self.volume_min, min(self.volume_max, self.accumulated_volume))
 
         return self.accumulated_volume
 
+    def calculate_flow_array(self, pressure_kpa):
+        """
+        Versión vectorizada de calculate_flow
+
+        Args:
+            pressure_kpa (numpy.ndarray): Presiones diferenciales en kPa
+
+        Returns:
+            numpy.ndarray: Flujos en L/s
+        """
+        pressure_pa = np.asarray(pressure_kpa, dtype=np.float64) * 1000.0
+        flow = self.flow_constant * np.sqrt(np.abs(pressure_pa)) * np.sign(pressure_pa)
+        flow[np.abs(pressure_pa) < self.noise_threshold_pa] = 0.0
+        return flow
+
+    def calculate_volume_array(self, flow, t):
+        """
+        Versión vectorizada de calculate_volume para un bloque de muestras
+
+        Mantiene el estado entre bloques (integrador y volumen acumulado), no
+        integra los saltos mayores a max_dt y limita el volumen a
+        [volume_min, volume_max] igual que la versión escalar.
+
+        Args:
+            flow (numpy.ndarray): Flujos en L/s
+            t (numpy.ndarray): Tiempos en segundos (base de tiempo)
+
+        Returns:
+            numpy.ndarray: Volumen acumulado en L para cada muestra
+        """
+        flow = np.asarray(flow, dtype=np.float64)
+
+        if len(flow) == 0:
+            return np.empty(0, dtype=np.float64)
+
+        delta_volume = self.integrator.integrate(t, flow)
+        volume = self._clamped_cumsum(self.accumulated_volume, delta_volume)
+
+        self.accumulated_volume = float(volume[-1])
+
+        return volume
+
+    def _clamped_cumsum(self, start, delta):
+        """
+        Suma acumulada limitada a [volume_min, volume_max] en cada paso
+
+        El límite inferior se resuelve sin bucle con la recursión de Lindley
+        (v_n = S_n - min(0, min_k S_k - volume_min)). Solo si se alcanza el
+        límite superior se recorre el resto del bloque muestra a muestra.
+        """
+        lower = self.volume_min
+        upper = self.volume_max
+
+        cumulative = start + np.cumsum(delta)
+        volume = cumulative - np.minimum(np.minimum.accumulate(cumulative) - lower, 0.0)
+
+        over = np.flatnonzero(volume > upper)
+        if len(over):
+            first = over[0]
+            accumulated = upper
+            volume[first] = upper
+            for i in range(first + 1, len(volume)):
+                accumulated = max(lower, min(upper, accumulated + delta[i]))
+                volume[i] = accumulated
+
+        return volume
+
+    def process_block(self, t, raw_pressure, offset):
+        """
+        Convierte un bloque de presiones RAW a presión, flujo y volumen
+
+        Args:
+            t (numpy.ndarray): Tiempos en segundos (base de tiempo)
+            raw_pressure (numpy.ndarray): Valores RAW del ADC
+            offset (float): Offset de calibración
+
+        Returns:
+            dict: Arreglos float64 con keys 't', 'p', 'f', 'v'
+        """
+        t = np.asarray(t, dtype=np.float64)
+        pressure_kpa = self.raw_to_pressure(np.asarray(raw_pressure, dtype=np.float64), offset)
+        flow_lps = self.calculate_flow_array(pressure_kpa)
+        volume_l = self.calculate_volume_array(flow_lps, t)
+
+        return {
+            't': t,
+            'p': pressure_kpa,
+            'f': flow_lps,
+            'v': volume_l
+        }
+
+    def process_samples(self, samples):
+        """
+        Versión por lotes de process_message sobre la salida de decode_batch
+
+        Todas las muestras se enrutan a los buffers de canal. Para la
+        espirometría, igual que process_message, usa el sensor 1 y recurre al
+        sensor 2 solo en los mensajes que no traen el sensor 1.
+
+        Args:
+            samples (numpy.ndarray): Arreglo estructurado con dtype SAMPLE_DTYPE
+
+        Returns:
+            dict: Arreglos float64 con keys 't', 'p', 'f', 'v' o None si no hay datos de presión
+        """
+        t = self.timebase.process(samples['timestamp'])
+        self.route_samples(samples, t)
+
+        is_sensor_1 = samples['sensor_id'] == ID_PRESION_1
+        is_sensor_2 = samples['sensor_id'] == ID_PRESION_2
+
+        if is_sensor_2.any():
+            # Mensajes sin sensor 1 (identificados por su timestamp)
+            is_sensor_2 &= ~np.isin(samples['timestamp'], samples['timestamp'][is_sensor_1])
+
+        is_pressure = is_sensor_1 | is_sensor_2
+        selected = samples[is_pressure]
+        if len(selected) == 0:
+            return None
+
+        offsets = np.where(
+            selected['sensor_id'] == ID_PRESION_1,
+            self.pressure_offset_1,
+            self.pressure_offset_2
+        )
+
+        return self.process_block(t[is_pressure], selected['value'], offsets)
+
     def process_message(self, message):
         """
         Procesa un mensaje decodificado y extrae t, p, f, v
@@ -288,9 +842,12 @@ class SensorDataProcessor:
 
         Returns:
             dict: Diccionario con keys 't', 'p', 'f', 'v' o None si no hay datos de presión
+                ('t' en segundos de la base de tiempo, monótono)
         """
+        t = self.timebase.process_one(message['timestamp'])
+        self.route_message(message, t)
+
         sensors = message['sensors']
-        timestamp = message['timestamp']
 
         # Verificar que tengamos al menos un sensor de presión
         if ID_PRESION_1 not in sensors and ID_PRESION_2 not in sensors:
@@ -307,11 +864,67 @@ class SensorDataProcessor:
         flow_lps = self.calculate_flow(pressure_kpa)
 
         # Calcular volumen
-        volume_l = self.calculate_volume(flow_lps, timestamp)
+        volume_l = self.calculate_volume(flow_lps, t)
 
         return {
-            't': timestamp,
+            't': t,
             'p': pressure_kpa,
             'f': flow_lps,
             'v': volume_l
         }
+
+
+class SamplePipeline:
+    """
+    Decodifica bytes y los convierte a bloques t, p, f, v fuera del thread de la GUI
+
+    Lo usa SerialReaderThread: cada lectura se decodifica con feed() en el
+    thread lector y las muestras se acumulan hasta que take_block() las
+    entrega como un único bloque de arreglos NumPy.
+    """
+
+    def __init__(self, processor=None, decoder=None):
+        self.decoder = decoder if decoder is not None else BinaryProtocolDecoder()
+        self.processor = processor if processor is not None else SensorDataProcessor()
+
+        self._pending = []
+        self._reset_requested = False
+
+    def request_reset(self):
+        """Solicita reiniciar el volumen; se aplica en el thread lector antes del próximo lote"""
+        self._reset_requested = True
+
+    def feed(self, data_bytes):
+        """
+        Decodifica los bytes recibidos y acumula las muestras convertidas
+
+        Args:
+            data_bytes (bytes): Datos binarios del protocolo
+        """
+        if self._reset_requested:
+            self._reset_requested = False
+            self.processor.reset_volume()
+
+        self.decoder.add_data(data_bytes)
+
+        block = self.processor.process_samples(self.decoder.decode_batch())
+        if block is not None:
+            self._pending.append(block)
+
+    def take_block(self):
+        """
+        Entrega las muestras acumuladas desde la última llamada
+
+        Returns:
+            dict: Arreglos float64 con keys 't', 'p', 'f', 'v' o None si no hay muestras
+        """
+        if not self._pending:
+            return None
+
+        pending = self._pending
+        self._pending = []
+
+        if len(pending) == 1:
+            return pending[0]
+
+        return {key: np.concatenate([block[key] for block in pending]) for key in ('t', 'p', 'f', 'v')}
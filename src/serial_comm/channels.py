@@ -0,0 +1,126 @@
+"""
+Buffers por canal para los sensores del protocolo binario
+
+Cada ID de sensor se enruta a un ChannelBuffer propio: dos arreglos NumPy
+preasignados (tiempo y valor convertido) usados como buffer circular de
+capacidad fija, de modo que un mismo flujo del ESP32 puede alimentar varias
+adquisiciones (espirometría, ECG, EMG, IMU...) sin decodificar dos veces. Si
+nadie lee un canal, se conservan solo sus últimas `capacity` muestras.
+
+La escritura ocurre en el thread lector y la lectura en la GUI, por eso cada
+buffer se protege con un lock.
+"""
+
+import threading
+
+import numpy as np
+
+
+class ChannelBuffer:
+    """Buffer circular columnar (tiempo, valor) para un canal de sensor"""
+
+    def __init__(self, sensor_id, name, unit='', convert=None, capacity=8192):
+        """
+        Args:
+            sensor_id (int): ID del sensor en el protocolo
+            name (str): Nombre del canal
+            unit (str): Unidad del valor convertido
+            convert (callable): Función que recibe un arreglo de valores RAW
+                y devuelve el arreglo convertido (None = sin conversión)
+            capacity (int): Cantidad máxima de muestras retenidas
+        """
+        self.sensor_id = sensor_id
+        self.name = name
+        self.unit = unit
+        self.convert = convert
+        self.capacity = capacity
+
+        self._t = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros(capacity, dtype=np.float64)
+        self._write = 0      # Próxima posición de escritura
+        self._count = 0      # Muestras válidas en el buffer
+        self._unread = 0     # Muestras aún no entregadas por take()
+        self._lock = threading.Lock()
+
+        # Muestras perdidas porque el buffer se llenó sin ser leído
+        self.overwritten = 0
+        self.total_samples = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamps, raw_values):
+        """
+        Agrega un bloque de muestras aplicando la conversión del canal
+
+        Args:
+            timestamps (numpy.ndarray): Tiempos en segundos (base de tiempo del procesador)
+            raw_values (numpy.ndarray): Valores RAW recibidos
+        """
+        values = np.asarray(raw_values, dtype=np.float64)
+        if self.convert is not None:
+            values = self.convert(values)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+
+        n = len(values)
+        if n == 0:
+            return
+
+        if n > self.capacity:
+            timestamps = timestamps[-self.capacity:]
+            values = values[-self.capacity:]
+
+        with self._lock:
+            self.total_samples += n
+            lost = max(0, self._unread + n - self.capacity)
+            self.overwritten += lost
+
+            m = len(values)
+            first = min(m, self.capacity - self._write)
+            self._t[self._write:self._write + first] = timestamps[:first]
+            self._values[self._write:self._write + first] = values[:first]
+            if first < m:
+                self._t[:m - first] = timestamps[first:]
+                self._values[:m - first] = values[first:]
+
+            self._write = (self._write + m) % self.capacity
+            self._count = min(self.capacity, self._count + m)
+            self._unread = min(self.capacity, self._unread + n)
+
+    def _last(self, n):
+        """Copia de las últimas n muestras en orden cronológico (con lock tomado)"""
+        idx = (self._write - n + np.arange(n)) % self.capacity
+        return self._t[idx], self._values[idx]
+
+    def snapshot(self, n=None):
+        """
+        Copia de las últimas muestras del canal sin marcarlas como leídas
+
+        Args:
+            n (int): Cantidad de muestras (None = todas las retenidas)
+
+        Returns:
+            tuple: (tiempos, valores) como arreglos float64
+        """
+        with self._lock:
+            n = self._count if n is None else min(n, self._count)
+            return self._last(n)
+
+    def take(self):
+        """
+        Entrega las muestras recibidas desde la última llamada
+
+        Returns:
+            tuple: (tiempos, valores) como arreglos float64
+        """
+        with self._lock:
+            t, values = self._last(self._unread)
+            self._unread = 0
+            return t, values
+
+    def clear(self):
+        """Vacía el canal"""
+        with self._lock:
+            self._write = 0
+            self._count = 0
+            self._unread = 0
@@ -0,0 +1,90 @@
+"""
+CRC16 del protocolo binario del ESP32 FisioAccess
+
+Equivale a calculateCRC16() de hardware/firmware/esp32-unified/src/protocol.cpp:
+polinomio reflejado 0x8408, valor inicial 0xFFFF y sin XOR final
+(CRC-16/MCRF4XX). En lugar de recorrer bit a bit se usa una tabla
+precalculada de 256 entradas, y crc16_batch valida muchos mensajes a la vez
+recorriendo las columnas de una matriz de bytes con NumPy.
+"""
+
+import numpy as np
+
+CRC16_INIT = 0xFFFF
+CRC16_POLY = 0x8408
+
+
+def _build_table():
+    """Construye la tabla de 256 entradas para el polinomio reflejado"""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ CRC16_POLY
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC16_TABLE = _build_table()
+_CRC16_TABLE_NP = np.array(CRC16_TABLE, dtype=np.uint16)
+
+
+def crc16(data, crc=CRC16_INIT):
+    """
+    Calcula el CRC16 de un bloque de bytes usando la tabla
+
+    Args:
+        data (bytes): Datos para calcular CRC
+        crc (int): Valor inicial (permite cálculo incremental)
+
+    Returns:
+        int: Valor CRC16
+    """
+    table = CRC16_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def crc16_batch(frames):
+    """
+    Calcula el CRC16 de muchos bloques de igual longitud en una sola llamada
+
+    Args:
+        frames (numpy.ndarray): Matriz uint8 de forma (n_mensajes, longitud)
+
+    Returns:
+        numpy.ndarray: Arreglo uint16 con el CRC de cada fila
+    """
+    frames = np.asarray(frames, dtype=np.uint8)
+    crc = np.full(frames.shape[0], CRC16_INIT, dtype=np.uint16)
+    for column in frames.T:
+        crc = (crc >> 8) ^ _CRC16_TABLE_NP[(crc ^ column) & 0xFF]
+    return crc
+
+
+def crc16_frames(buf, starts, lengths):
+    """
+    Calcula el CRC16 de varios segmentos de un buffer, agrupando por longitud
+
+    Args:
+        buf (numpy.ndarray): Buffer uint8
+        starts (numpy.ndarray): Índice de inicio de cada segmento
+        lengths (numpy.ndarray): Longitud de cada segmento
+
+    Returns:
+        numpy.ndarray: Arreglo uint16 con el CRC de cada segmento
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    result = np.empty(len(starts), dtype=np.uint16)
+
+    for length in np.unique(lengths):
+        mask = lengths == length
+        rows = buf[starts[mask][:, None] + np.arange(length)]
+        result[mask] = crc16_batch(rows)
+
+    return result
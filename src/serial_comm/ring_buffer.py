@@ -0,0 +1,118 @@
+"""
+Acumulador de bytes de capacidad fija para el decodificador del protocolo
+
+Los bytes se guardan en un bytearray preasignado con cursores de lectura y
+escritura. Consumir datos solo avanza el cursor de lectura, y el acceso para
+buscar sincronía o extraer mensajes se hace con memoryview, sin copias. Cuando
+el cursor de escritura llega al final, los bytes aún no leídos (normalmente
+menos de un mensaje) se mueven al inicio, de modo que la región legible es
+siempre contigua y la memoria usada no crece.
+"""
+
+
+class ByteRingBuffer:
+    """Buffer de bytes de capacidad fija con cursores de lectura/escritura"""
+
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self._data = bytearray(capacity)
+        self._read = 0
+        self._write = 0
+
+        # Bytes descartados por desborde (los más antiguos se pierden)
+        self.dropped_bytes = 0
+
+    def __len__(self):
+        return self._write - self._read
+
+    def __getitem__(self, index):
+        """Byte en la posición index relativa al cursor de lectura"""
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("índice fuera del buffer")
+        return self._data[self._read + index]
+
+    def write(self, data):
+        """
+        Agrega bytes al final del buffer
+
+        Args:
+            data (bytes): Datos recibidos del puerto serial
+        """
+        n = len(data)
+        if n == 0:
+            return
+
+        if n >= self.capacity:
+            # El bloque nuevo ocupa todo el buffer: conservar solo su final
+            self.dropped_bytes += len(self) + n - self.capacity
+            self._data[:] = data[n - self.capacity:]
+            self._read = 0
+            self._write = self.capacity
+            return
+
+        if self._write + n > self.capacity:
+            unread = len(self)
+            if unread + n > self.capacity:
+                # Desborde: descartar los bytes más antiguos
+                drop = unread + n - self.capacity
+                self._read += drop
+                self.dropped_bytes += drop
+                unread -= drop
+
+            # Mover los bytes no leídos al inicio
+            self._data[0:unread] = self._data[self._read:self._write]
+            self._read = 0
+            self._write = unread
+
+        self._data[self._write:self._write + n] = data
+        self._write += n
+
+    def view(self, start=0, end=None):
+        """
+        Vista sin copia de la región legible
+
+        Args:
+            start (int): Inicio relativo al cursor de lectura
+            end (int): Fin relativo al cursor de lectura (None = hasta el final)
+
+        Returns:
+            memoryview: Vista de los bytes solicitados
+        """
+        length = len(self)
+        if end is None or end > length:
+            end = length
+        return memoryview(self._data)[self._read + start:self._read + end]
+
+    def find(self, sub, start=0):
+        """
+        Busca una secuencia de bytes en la región legible (búsqueda en C, sin copia)
+
+        Args:
+            sub (bytes): Secuencia a buscar
+            start (int): Posición inicial relativa al cursor de lectura
+
+        Returns:
+            int: Índice relativo al cursor de lectura, -1 si no se encuentra
+        """
+        idx = self._data.find(sub, self._read + start, self._write)
+        return -1 if idx < 0 else idx - self._read
+
+    def consume(self, n):
+        """
+        Descarta n bytes del inicio avanzando el cursor de lectura
+
+        Args:
+            n (int): Cantidad de bytes a descartar
+        """
+        self._read += min(n, len(self))
+        if self._read == self._write:
+            # Buffer vacío: volver al inicio para evitar compactaciones
+            self._read = 0
+            self._write = 0
+
+    def clear(self):
+        """Vacía el buffer"""
+        self._read = 0
+        self._write = 0
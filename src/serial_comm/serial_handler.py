@@ -7,17 +7,85 @@ import time
 
 class SerialReaderThread(QThread):
     data_received = Signal(bytes)  # Cambiado de str a bytes
+    # Bloque de muestras decodificadas (dict de arreglos NumPy) en modo pipeline
+    block_received = Signal(object)
 
-    def __init__(self, serial_port, mutex):
+    def __init__(self, serial_port, mutex, read_mode='blocking', chunk_size=4096,
+                 pipeline=None, block_interval_ms=30):
         super().__init__()
         self.serial_port = serial_port
-        self.mutex = mutex  # Compartir el mutex
+        self.mutex = mutex  # Compartir el mutex (solo lo usa el modo 'polling')
         self.is_running = False
         self.wait_condition = QWaitCondition()
 
+        # Modo de lectura: 'blocking' (espera en el SO) o 'polling' (legacy, 1 ms)
+        self.read_mode = read_mode
+        # Máximo de bytes por lectura en modo 'blocking'
+        self.chunk_size = chunk_size
+
+        # Si hay pipeline, se decodifica aquí y se emiten bloques en lugar de bytes
+        self.pipeline = pipeline
+        self.block_interval = block_interval_ms / 1000.0
+        self.last_block_time = 0.0
+
+    def deliver(self, data):
+        """Emitir bytes crudos o, en modo pipeline, decodificarlos y emitir bloques"""
+        if self.pipeline is None:
+            if data:
+                self.data_received.emit(data)
+            return
+
+        if data:
+            self.pipeline.feed(data)
+
+        now = time.monotonic()
+        if now - self.last_block_time >= self.block_interval:
+            block = self.pipeline.take_block()
+            if block is not None:
+                self.block_received.emit(block)
+            self.last_block_time = now
+
     def run(self):
         self.is_running = True
 
+        if self.read_mode == 'polling':
+            self.run_polling()
+        else:
+            self.run_blocking()
+
+        # Entregar las muestras que quedaron pendientes en el pipeline
+        if self.pipeline is not None:
+            block = self.pipeline.take_block()
+            if block is not None:
+                self.block_received.emit(block)
+
+    def run_blocking(self):
+        """
+        Lectura bloqueante en el SO, sin mutex
+
+        read(chunk_size) espera en select/ReadFile hasta completar chunk_size
+        bytes o hasta que vence el timeout del puerto, por lo que el thread no
+        consume CPU sin datos y las lecturas se agrupan en lotes de hasta un
+        timeout de duración. Como no se toma el mutex mientras se espera,
+        write_bytes nunca queda bloqueado por el lector.
+        """
+        while self.is_running and self.serial_port and self.serial_port.is_open:
+            try:
+                data = self.serial_port.read(self.chunk_size)
+                self.deliver(data)
+
+            except Exception as e:
+                if not self.is_running:
+                    # Lectura cancelada por stop()
+                    break
+                error_msg = f"Error en thread de lectura: {str(e)}"
+                print(error_msg)
+                # Emitir mensaje de error como bytes UTF-8
+                self.data_received.emit(error_msg.encode('utf-8'))
+                break
+
+    def run_polling(self):
+        """Lectura por sondeo cada 1 ms (modo legacy)"""
         while self.is_running and self.serial_port and self.serial_port.is_open:
             try:
                 # Usar un bloqueo con timeout para permitir escrituras
@@ -26,7 +94,7 @@ class SerialReaderThread(QThread):
                     # Leer bytes disponibles (máximo 256 bytes por lectura)
                     data = self.serial_port.read(min(self.serial_port.in_waiting, 256))
                     if data:
-                        self.data_received.emit(data)
+                        self.deliver(data)
                 self.mutex.unlock()
 
                 # Pequeña pausa para no saturar el CPU y dar oportunidad a la escritura
@@ -45,16 +113,23 @@ class SerialReaderThread(QThread):
         print("Stopping thread...")
         self.is_running = False
         self.wait_condition.wakeAll()  # Despertar el thread si está esperando
+        # Interrumpir una lectura bloqueante en curso (pyserial POSIX)
+        if self.read_mode != 'polling' and hasattr(self.serial_port, 'cancel_read'):
+            try:
+                self.serial_port.cancel_read()
+            except Exception:
+                pass
         self.wait()
         print("Thread stopped")
 
 
 class SerialHandler(QObject):
     data_received_serial = Signal(bytes)  # Cambiado de str a bytes
+    data_block_serial = Signal(object)  # Bloques decodificados en modo pipeline
     write_status = Signal(str)
     error_occurred = Signal(str)
 
-    def __init__(self, port=None, baudrate=115200):
+    def __init__(self, port=None, baudrate=115200, read_mode='blocking'):
         super().__init__()
         self.serial = None
         self.port = port
@@ -63,6 +138,26 @@ class SerialHandler(QObject):
         self.mutex = QMutex()  # Mutex para sincronización
         self.write_timeout = 1000  # timeout en ms para escritura
 
+        # Configuración de lectura ('blocking' o 'polling')
+        self.read_mode = read_mode
+        self.read_chunk_size = 4096  # bytes máximos por lectura
+        self.read_timeout = 0.02  # segundos; latencia máxima de un lote
+
+        # Pipeline de decodificación en el thread lector (None = emitir bytes crudos)
+        self.pipeline = None
+        self.block_interval_ms = 30
+
+    def set_pipeline(self, pipeline, block_interval_ms=30):
+        """
+        Decodificar en el thread lector y emitir bloques por data_block_serial
+
+        Args:
+            pipeline (SamplePipeline): Pipeline de decodificación, None para emitir bytes
+            block_interval_ms (int): Intervalo mínimo entre bloques emitidos
+        """
+        self.pipeline = pipeline
+        self.block_interval_ms = block_interval_ms
+
     def get_available_ports(self):
         ports = [port.device for port in serial.tools.list_ports.comports()]
         acm_ports = [port for port in ports if re.search(r'ACM\d+$', port)]
@@ -97,8 +192,20 @@ class SerialHandler(QObject):
             raise Exception(error_msg)
             
         if self.reader_thread is None:
-            self.reader_thread = SerialReaderThread(self.serial, self.mutex)
+            if self.read_mode == 'blocking':
+                # El timeout define cuánto se agrupan las lecturas cuando llegan pocos datos
+                self.serial.timeout = self.read_timeout
+
+            self.reader_thread = SerialReaderThread(
+                self.serial,
+                self.mutex,
+                read_mode=self.read_mode,
+                chunk_size=self.read_chunk_size,
+                pipeline=self.pipeline,
+                block_interval_ms=self.block_interval_ms
+            )
             self.reader_thread.data_received.connect(self.handle_received_data)
+            self.reader_thread.block_received.connect(self.handle_received_block)
             self.reader_thread.start()
             
             time.sleep(0.1)
@@ -112,6 +219,11 @@ class SerialHandler(QObject):
     def handle_received_data(self, data):
         """Método intermedio para debug de señales"""
         self.data_received_serial.emit(data)
+
+    @Slot(object)
+    def handle_received_block(self, block):
+        """Reenviar bloques decodificados en el thread lector"""
+        self.data_block_serial.emit(block)
     
     def stop_reading(self):
         if self.reader_thread:
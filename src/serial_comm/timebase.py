@@ -0,0 +1,179 @@
+"""
+Reconstrucción de la base de tiempo del ESP32
+
+El encabezado de cada mensaje trae un timestamp uint32 en milisegundos
+(millis() del firmware) que vuelve a cero cada ~49,7 días y también al
+reiniciar el dispositivo. TimeBase lo convierte en un tiempo float64 en
+segundos, monótono y continuo desde la primera muestra recibida, que es el
+que usan todas las etapas posteriores (volumen, canales y gráficos).
+
+Además estima en línea la frecuencia de muestreo efectiva y el jitter
+(medias exponenciales del intervalo entre mensajes) y cuenta los mensajes
+perdidos a partir de los saltos de tiempo.
+"""
+
+from collections import deque
+
+import numpy as np
+
+TIMESTAMP_MODULUS = 1 << 32  # El contador del firmware es uint32
+
+# Una vuelta del contador solo se acepta si el último timestamp estaba a menos
+# de esta distancia de 2^32 y el nuevo a menos de esta distancia de 0; un salto
+# atrás de otra forma es un reinicio del dispositivo (por ejemplo tras más de
+# ~24,8 días encendido), que se rebasa en lugar de sumar ~49,7 días
+WRAP_WINDOW_MS = 60_000
+
+
+class TimeBase:
+    """Desenvuelve el timestamp uint32 en ms y estima frecuencia y jitter"""
+
+    def __init__(self, gap_factor=1.5, smoothing=0.05, max_gaps_kept=100):
+        """
+        Args:
+            gap_factor (float): Un intervalo mayor a gap_factor veces el
+                período estimado indica mensajes perdidos
+            smoothing (float): Peso de cada intervalo nuevo en las medias
+                exponenciales de período y jitter
+            max_gaps_kept (int): Huecos recientes conservados en gaps
+        """
+        self.gap_factor = gap_factor
+        self.smoothing = smoothing
+
+        # Huecos detectados como (t_inicio, t_fin, mensajes_perdidos) en segundos
+        self.gaps = deque(maxlen=max_gaps_kept)
+
+        self.reset()
+
+    def reset(self):
+        """Reinicia la base de tiempo (la próxima muestra vuelve a t = 0)"""
+        self._origin = None       # Primer timestamp desenvuelto (ms)
+        self._last_raw = None     # Último timestamp crudo recibido
+        self._last_ms = None      # Último timestamp desenvuelto (ms)
+
+        self.period_ms = None     # Período medio estimado entre mensajes
+        self.jitter_ms = 0.0      # Desvío medio absoluto del período
+
+        self.wraps = 0            # Vueltas del contador uint32
+        self.device_resets = 0    # Saltos hacia atrás (reinicio del ESP32)
+        self.dropped_frames = 0   # Mensajes perdidos estimados
+        self.gaps.clear()
+
+    @property
+    def sample_rate(self):
+        """Frecuencia de mensajes estimada en Hz (None si aún no hay estimación)"""
+        if not self.period_ms:
+            return None
+        return 1000.0 / self.period_ms
+
+    def process(self, raw_timestamps):
+        """
+        Convierte un bloque de timestamps crudos a segundos monótonos
+
+        Las muestras de un mismo mensaje comparten timestamp, por lo que los
+        intervalos nulos se ignoran al estimar frecuencia y pérdidas.
+
+        Args:
+            raw_timestamps (numpy.ndarray): Timestamps uint32 en milisegundos
+
+        Returns:
+            numpy.ndarray: Tiempos float64 en segundos desde la primera muestra
+        """
+        raw = np.asarray(raw_timestamps, dtype=np.int64)
+        n = len(raw)
+        if n == 0:
+            return np.empty(0, dtype=np.float64)
+
+        if self._last_raw is None:
+            self._origin = int(raw[0])
+            self._last_raw = int(raw[0])
+            self._last_ms = int(raw[0])
+
+        previous = np.concatenate(([self._last_raw], raw[:-1]))
+        steps = raw - previous
+
+        # Vuelta del contador: del final del rango uint32 a cerca de cero
+        wrapped = (previous >= TIMESTAMP_MODULUS - WRAP_WINDOW_MS) & (raw < WRAP_WINDOW_MS)
+        steps[wrapped] += TIMESTAMP_MODULUS
+
+        # Reinicio del dispositivo: cualquier otro salto hacia atrás se
+        # reemplaza por un período para que el tiempo siga avanzando
+        restarted = steps < 0
+        if restarted.any():
+            steps[restarted] = round(self.period_ms) if self.period_ms else 0
+
+        unwrapped = self._last_ms + np.cumsum(steps)
+
+        self.wraps += int(np.count_nonzero(wrapped))
+        self.device_resets += int(np.count_nonzero(restarted))
+
+        advanced = (steps > 0) & ~restarted
+        self._update_rate(steps[advanced], unwrapped[advanced])
+
+        self._last_raw = int(raw[-1])
+        self._last_ms = int(unwrapped[-1])
+
+        return (unwrapped - self._origin) / 1000.0
+
+    def process_one(self, raw_timestamp):
+        """
+        Versión escalar de process
+
+        Args:
+            raw_timestamp (int): Timestamp uint32 en milisegundos
+
+        Returns:
+            float: Tiempo en segundos desde la primera muestra
+        """
+        return float(self.process(np.array([raw_timestamp]))[0])
+
+    def _update_rate(self, intervals, ends):
+        """Actualiza período, jitter y pérdidas con los intervalos positivos del bloque"""
+        alpha = self.smoothing
+
+        for interval, end in zip(intervals.tolist(), ends.tolist()):
+            if self.period_ms is None:
+                self.period_ms = float(interval)
+                continue
+
+            if interval > self.gap_factor * self.period_ms:
+                # Hueco: no actualiza la estimación del período
+                missing = max(1, int(round(interval / self.period_ms)) - 1)
+                self.dropped_frames += missing
+                start = end - interval
+                self.gaps.append(((start - self._origin) / 1000.0, (end - self._origin) / 1000.0, missing))
+                continue
+
+            deviation = abs(interval - self.period_ms)
+            self.period_ms += alpha * (interval - self.period_ms)
+            self.jitter_ms += alpha * (deviation - self.jitter_ms)
+
+    def take_gaps(self):
+        """
+        Entrega y limpia los huecos registrados
+
+        Los huecos se registran en el thread lector: se sacan de a uno
+        (popleft es seguro entre threads) en lugar de copiar y limpiar.
+
+        Returns:
+            list: Lista de tuplas (t_inicio, t_fin, mensajes_perdidos) en segundos
+        """
+        gaps = []
+        while self.gaps:
+            gaps.append(self.gaps.popleft())
+        return gaps
+
+    def get_stats(self):
+        """
+        Obtiene el estado de la base de tiempo
+
+        Returns:
+            dict: Frecuencia estimada, jitter, vueltas, reinicios y mensajes perdidos
+        """
+        return {
+            'sample_rate_hz': self.sample_rate,
+            'jitter_ms': self.jitter_ms,
+            'wraps': self.wraps,
+            'device_resets': self.device_resets,
+            'dropped_frames': self.dropped_frames
+        }
@@ -1,10 +1,10 @@
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
-                               QPushButton, QListWidget, QListWidgetItem, QMessageBox)
+                               QPushButton, QListWidget, QListWidgetItem, QMessageBox,
+                               QLineEdit)
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QFont
 import os
 from datetime import datetime
-import json
 import tempfile
 
 
@@ -28,6 +28,7 @@ class OpenStudyDialog(QDialog):
         
         # Almacenar información de estudios
         self.studies_info = []  # Lista de {type, path/url, data}
+        self.online_studies = []
         
         self.setup_ui()
         self.load_studies()
@@ -51,6 +52,12 @@ class OpenStudyDialog(QDialog):
         self.status_label.setStyleSheet("padding: 5px; background-color: #f0f0f0; border-radius: 3px;")
         layout.addWidget(self.status_label)
         
+        # Búsqueda por nombre o RUT (estudios offline, desde el índice)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Buscar por nombre o RUT...")
+        self.search_edit.textChanged.connect(self.filter_studies)
+        layout.addWidget(self.search_edit)
+        
         # Lista de estudios
         self.studies_list = QListWidget()
         self.studies_list.setFont(QFont("Monospace", 9))
@@ -117,41 +124,49 @@ class OpenStudyDialog(QDialog):
             self.status_label.setText("⚠️ Sin conexión - Solo estudios offline disponibles")
             self.status_label.setStyleSheet("padding: 5px; background-color: #FFCCBC; border-radius: 3px;")
         
-        # Cargar estudios offline
-        self.load_offline_studies()
+        # Cargar estudios offline (reindexando la carpeta una sola vez)
+        self.load_offline_studies(refresh=True)
         
         # Cargar estudios online si hay conexión
+        self.online_studies = []
         if self.has_internet:
+            self.online_studies = self.network_handler.get_online_studies() or []
             self.load_online_studies()
         
         self.refresh_button.setEnabled(True)
     
-    def load_offline_studies(self):
-        """Cargar estudios de la carpeta offline"""
+    def load_offline_studies(self, refresh=False):
+        """
+        Cargar estudios de la carpeta offline desde el índice
+
+        Args:
+            refresh (bool): Reindexar antes la carpeta (al abrir el diálogo o
+                            con Actualizar; la búsqueda solo consulta el índice)
+        """
         offline_folder = self.file_handler.get_offline_folder()
         
         if not os.path.exists(offline_folder):
             return
         
-        # Buscar archivos JSON en la carpeta
-        for filename in sorted(os.listdir(offline_folder), reverse=True):
-            if not filename.endswith('.json'):
-                continue
-            
-            filepath = os.path.join(offline_folder, filename)
-            
+        # Indexar solo los archivos nuevos o modificados y listar desde el índice
+        # (sin leer las muestras de cada estudio)
+        try:
+            study_index = self.file_handler.get_study_index()
+            if refresh:
+                study_index.refresh()
+            rows = study_index.list(search=self.search_edit.text().strip() or None)
+        except Exception as e:
+            print(f"Error al leer índice de estudios offline: {str(e)}")
+            return
+        
+        for row in rows:
             try:
-                # Leer metadata del archivo
-                with open(filepath, 'r') as f:
-                    study_data = json.load(f)
-                
-                # Extraer información
-                patient = study_data.get('patient', {})
-                nombre = patient.get('nombre', 'Sin nombre')
-                rut = patient.get('rut', 'Sin RUT')
+                nombre = row['nombre'] or 'Sin nombre'
+                rut = row['rut'] or 'Sin RUT'
+                filename = row['filename']
                 
                 # Obtener fecha del timestamp o del nombre del archivo
-                timestamp_str = study_data.get('timestamp', '')
+                timestamp_str = row['timestamp']
                 if timestamp_str:
                     try:
                         dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
@@ -168,14 +183,16 @@ class OpenStudyDialog(QDialog):
                 
                 # Crear item
                 display_text = f"🏠 {nombre} ({rut}) - {fecha}"
+                if row['synced']:
+                    display_text += " ✓"
                 item = QListWidgetItem(display_text)
                 item.setForeground(Qt.darkGreen)
                 
                 # Guardar información
                 self.studies_info.append({
                     'type': 'offline',
-                    'path': filepath,
-                    'data': study_data
+                    'path': row['path'],
+                    'data': row
                 })
                 
                 # Asociar índice al item
@@ -184,22 +201,29 @@ class OpenStudyDialog(QDialog):
                 self.studies_list.addItem(item)
                 
             except Exception as e:
-                print(f"Error al cargar estudio offline {filename}: {str(e)}")
+                print(f"Error al cargar estudio offline {row.get('filename')}: {str(e)}")
                 continue
     
+    def filter_studies(self):
+        """Volver a listar con el texto de búsqueda (sin consultar el servidor)"""
+        self.studies_list.clear()
+        self.studies_info = []
+        self.load_offline_studies()
+        self.load_online_studies()
+    
     def load_online_studies(self):
-        """Cargar estudios del servidor"""
-        studies = self.network_handler.get_online_studies()
-        
-        if not studies:
-            return
+        """Listar los estudios del servidor ya consultados"""
+        search = self.search_edit.text().strip().lower()
         
-        for study_meta in studies:
+        for study_meta in self.online_studies:
             try:
                 # Extraer información
                 owner = study_meta.get('owner', 'Sin nombre')
                 tipo = study_meta.get('type', '')
                 
+                if search and search not in str(owner).lower():
+                    continue
+                
                 # Obtener fecha
                 uploaded = study_meta.get('uploaded', '')
                 if uploaded:
@@ -1,5 +1,3 @@
-import json
-
 from PySide6.QtWidgets import QMainWindow, QListWidgetItem, QMenu
 from PySide6.QtCore import QTimer, Slot, Qt
 from PySide6.QtGui import QColor, QBrush, QAction
@@ -9,6 +7,10 @@ from serial_comm.serial_handler import SerialHandler
 from serial_comm.SerialDataHandler import SerialDataHandler
 from utils.GraphHandler import GraphHandler
 from utils.FileHandler import FileHandler
+from utils.SampleBuffer import columns_to_arrays
+from utils.LazyStudy import lazy_columns, open_study
+from utils.SessionJournal import (SessionJournal, find_recoverable_journals, journal_to_study,
+                                  new_journal_path, replay_journal)
 
 from ui.SaveDialog import SaveDialog
 from ui.LoginDialog import LoginDialog
@@ -45,6 +47,9 @@ class MainWindow(QMainWindow, Ui_Main):
         # Variable para almacenar info de calidad actual
         self.current_quality = None
 
+        # Mensajes perdidos ya informados (acquisition_stats)
+        self.reported_dropped_frames = 0
+
         # Variables para calibración binaria
         self.calibration_samples = []
         self.calibration_timer = None
@@ -88,6 +93,17 @@ class MainWindow(QMainWindow, Ui_Main):
         self.update_button_states()
         
         self.current_patient_data = None 
+
+        # Diario de sesión: las maniobras quedan en disco a medida que se
+        # completan (sincronización por lotes del resto cada 2 segundos)
+        self.session_journal = None
+        self.start_session_journal()
+        self.journal_timer = QTimer()
+        self.journal_timer.timeout.connect(self.sync_session_journal)
+        self.journal_timer.start(2000)
+
+        # Ofrecer recuperar sesiones que no se guardaron (cierre abrupto)
+        QTimer.singleShot(500, self.recover_sessions)
         
         # ========== SINCRONIZACIÓN AUTOMÁTICA AL INICIO ==========
         # Usar QTimer para ejecutar después de que la ventana esté completamente cargada
@@ -140,6 +156,9 @@ class MainWindow(QMainWindow, Ui_Main):
         
         # Conectar la señal de datos cargados del file_handler
         self.file_handler.data_loaded.connect(self.load_data_to_graph)
+        self.file_handler.progress.connect(
+            lambda percent: self.statusbar.showMessage(f"Procesando CSV... {percent}%")
+        )
 
         # Conectar el botón de conexión
         self.btn_connect.clicked.connect(self.handle_connection)
@@ -149,21 +168,16 @@ class MainWindow(QMainWindow, Ui_Main):
 
         # Verificar la conexión de señales del serial_handler
         try:
-            # Desconectar primero para evitar conexiones duplicadas
-            try:
-                self.serial_handler.data_received_serial.disconnect(self.data_handler.analisis_input_binary)
-            except:
-                pass
-
-            # Reconectar la señal (ahora usando protocolo binario)
-            self.serial_handler.data_received_serial.connect(self.data_handler.analisis_input_binary)
+            self.connect_serial_handler()
         except Exception as e:
             print(f"Error al conectar serial_handler.data_received: {str(e)}")
 
         # Verificar la conexión del data_handler
         try:
             self.data_handler.new_data.connect(self.graph_handler.update_data)
+            self.data_handler.new_block.connect(self.graph_handler.update_data_block)
             self.data_handler.other_string.connect(self.handle_calibration_response)
+            self.data_handler.acquisition_stats.connect(self.on_acquisition_stats)
 
             print("Señal new_data conectada exitosamente a graph_handler")
         except Exception as e:
@@ -195,8 +209,41 @@ class MainWindow(QMainWindow, Ui_Main):
         # Conectar botón para eliminar pruebas
         self.btn_delete_test.clicked.connect(self.delete_selected_test)
 
+        # Menú Nuevo: ECG/EMG usan adquisición continua del canal del
+        # dispositivo, Espirometría por maniobras
+        self.actionECG.triggered.connect(lambda: self.start_continuous_session('ecg_ch1'))
+        self.actionEOG.triggered.connect(lambda: self.start_continuous_session('emg_ch1'))
+        self.actionEspirometria.triggered.connect(self.stop_continuous_session)
+
+        # Menú Archivo: exportar una sesión continua terminada
+        self.actionExportSession = QAction("Exportar sesión continua...", self)
+        self.actionExportSession.triggered.connect(self.export_continuous_session)
+        self.menuArchivo.addAction(self.actionExportSession)
+
         print("Conexión de señales completada\n")
 
+    def connect_serial_handler(self):
+        """Conectar el serial_handler actual al data_handler según el modo de operación"""
+        # Desconectar primero para evitar conexiones duplicadas
+        try:
+            self.serial_handler.data_received_serial.disconnect(self.data_handler.analisis_input_binary)
+        except:
+            pass
+        try:
+            self.serial_handler.data_block_serial.disconnect(self.data_handler.analisis_block)
+        except:
+            pass
+
+        # Reconectar la señal (ahora usando protocolo binario)
+        self.serial_handler.data_received_serial.connect(self.data_handler.analisis_input_binary)
+
+        if self.data_handler.mode == 'pipeline':
+            # Decodificar en el thread lector y recibir bloques de muestras
+            self.serial_handler.set_pipeline(self.data_handler.pipeline)
+            self.serial_handler.data_block_serial.connect(self.data_handler.analisis_block)
+        else:
+            self.serial_handler.set_pipeline(None)
+
     def show_context_menu(self, position):
         """Mostrar menú contextual para cambiar estado PRE/POST"""
         item = self.list_test.itemAt(position)
@@ -310,6 +357,9 @@ class MainWindow(QMainWindow, Ui_Main):
         # Lista de puertos: deshabilitada si está conectado o probando
         self.serial_list.setEnabled(not is_connected and not self.is_testing)
 
+        # Lista de pruebas: no se cambia la prueba en pantalla durante una captura
+        self.list_test.setEnabled(not self.is_testing)
+
     @Slot()
     def calibrate(self):
         """
@@ -339,9 +389,14 @@ class MainWindow(QMainWindow, Ui_Main):
                 self.data_handler.new_data.disconnect(self.graph_handler.update_data)
             except:
                 pass
+            try:
+                self.data_handler.new_block.disconnect(self.graph_handler.update_data_block)
+            except:
+                pass
 
             # Conectar a nuestro recolector de muestras
             self.data_handler.new_data.connect(self.collect_calibration_sample)
+            self.data_handler.new_block.connect(self.collect_calibration_block)
 
             # Timer para finalizar la calibración después de 3 segundos
             self.calibration_timer = QTimer()
@@ -363,6 +418,12 @@ class MainWindow(QMainWindow, Ui_Main):
             # Por ahora guardamos presión directa (ya está en kPa pero sin calibrar)
             self.calibration_samples.append(data.get('p', 0.0))
 
+    @Slot(object)
+    def collect_calibration_block(self, block):
+        """Recopilar un bloque de muestras durante la calibración"""
+        if self.is_calibrating:
+            self.calibration_samples.extend(block['p'].tolist())
+
     def finish_calibration(self):
         """Finalizar proceso de calibración y calcular offset"""
         try:
@@ -371,9 +432,14 @@ class MainWindow(QMainWindow, Ui_Main):
                 self.data_handler.new_data.disconnect(self.collect_calibration_sample)
             except:
                 pass
+            try:
+                self.data_handler.new_block.disconnect(self.collect_calibration_block)
+            except:
+                pass
 
             # Reconectar señal al graph_handler
             self.data_handler.new_data.connect(self.graph_handler.update_data)
+            self.data_handler.new_block.connect(self.graph_handler.update_data_block)
 
             if len(self.calibration_samples) < 10:
                 self.statusbar.showMessage("Error: No se recibieron suficientes muestras para calibrar")
@@ -479,6 +545,29 @@ class MainWindow(QMainWindow, Ui_Main):
             self.statusbar.showMessage(f"Error al iniciar prueba: {str(e)}")
             print(f"Error al iniciar prueba: {str(e)}")
 
+    @Slot(dict)
+    def on_acquisition_stats(self, stats):
+        """
+        Aplicar la frecuencia estimada del dispositivo e informar mensajes perdidos
+
+        Args:
+            stats (dict): TimeBase.get_stats más 'gaps' e 'integration_gaps'
+        """
+        # Las grabaciones nuevas se preasignan con la frecuencia real
+        self.graph_handler.set_sample_rate(stats['sample_rate_hz'])
+
+        dropped = stats['dropped_frames']
+        if dropped < self.reported_dropped_frames:
+            # La base de tiempo se reinició
+            self.reported_dropped_frames = 0
+        if dropped > self.reported_dropped_frames:
+            rate = stats['sample_rate_hz']
+            rate_text = f"{rate:.0f} Hz" if rate else "frecuencia desconocida"
+            self.statusbar.showMessage(
+                f"Mensajes perdidos: {dropped} ({rate_text}, jitter {stats['jitter_ms']:.1f} ms)"
+            )
+            self.reported_dropped_frames = dropped
+
     @Slot()
     def on_test_completed(self, recording_data):
         """Manejar cuando se completa una prueba"""
@@ -593,8 +682,10 @@ class MainWindow(QMainWindow, Ui_Main):
             
             print(f"Prueba seleccionada: {test_name}, recording_number: {recording_number}")
             
-            # Activar esta grabación en el GraphHandler
-            self.graph_handler.set_active_recording(recording_number)
+            # Activar esta grabación en el GraphHandler (no durante una captura)
+            if not self.graph_handler.set_active_recording(recording_number):
+                self.statusbar.showMessage("No se puede cambiar de prueba durante una captura")
+                return
             
             self.statusbar.showMessage(f"Mostrando: {test_name}")
             
@@ -676,12 +767,8 @@ class MainWindow(QMainWindow, Ui_Main):
                 # Crear nueva instancia de SerialHandler
                 self.serial_handler = SerialHandler(port=port)
                 
-                # Reconectar la señal data_received (ahora usando protocolo binario)
-                try:
-                    self.serial_handler.data_received_serial.disconnect(self.data_handler.analisis_input_binary)
-                except:
-                    pass
-                self.serial_handler.data_received_serial.connect(self.data_handler.analisis_input_binary)
+                # Reconectar las señales de datos (protocolo binario)
+                self.connect_serial_handler()
                 
                 if self.serial_handler.open():
                     self.statusbar.showMessage(f"Conectado a {port} - Debe calibrar antes de iniciar pruebas")
@@ -707,7 +794,8 @@ class MainWindow(QMainWindow, Ui_Main):
                 self.statusbar.showMessage("Desconectado")
                 self.btn_connect.setText("Conectar")
                 
-                # Reset de estados al desconectar
+                # Reset de estados al desconectar (una maniobra a medias se descarta)
+                self.graph_handler.cancel_capture()
                 self.is_calibrated = False
                 self.is_testing = False
                 self.update_button_states()
@@ -729,12 +817,9 @@ class MainWindow(QMainWindow, Ui_Main):
             self.graph_handler.graph_record = True
             
             # Asignar datos directamente a display_data
-            self.graph_handler.display_data = {
-                't': data['t'].copy(),
-                'p': data['p'].copy(),
-                'f': data['f'].copy(),
-                'v': data['v'].copy()
-            }
+            self.graph_handler.display_data = columns_to_arrays(
+                {key: data[key] for key in ('t', 'p', 'f', 'v')}
+            )
             
             # Actualizar visualización
             self.graph_handler.update_plots()
@@ -785,17 +870,14 @@ class MainWindow(QMainWindow, Ui_Main):
         
 
         try:
-            # 1. GENERAR ARCHIVO RAW
+            # 1. ARMAR EL ESTUDIO (las grabaciones ya están en el diario de
+            # sesión; el RAW JSON se genera solo si se sube al servidor)
             self.statusbar.showMessage("Generando archivo de datos...")
-            raw_path = self.file_handler.generate_raw_file(
+            study_data = self.file_handler.build_study_data(
                 self.graph_handler,
                 patient_data
             )
-            
-            if not raw_path:
-                self.statusbar.showMessage("Error al generar archivo de datos")
-                return
-            
+
             # 2. GENERAR PDF (SIEMPRE, independiente de conexión)
             self.statusbar.showMessage("Generando PDF...")
             pdf_generator = PDFGenerator()
@@ -814,9 +896,6 @@ class MainWindow(QMainWindow, Ui_Main):
             
             if not pdf_path:
                 self.statusbar.showMessage("Error al generar PDF")
-                # Limpiar RAW temporal
-                if os.path.exists(raw_path):
-                    os.remove(raw_path)
                 return
             
             # 3. VERIFICAR CONECTIVIDAD
@@ -827,6 +906,17 @@ class MainWindow(QMainWindow, Ui_Main):
                 # 4a. GUARDAR ONLINE
                 self.statusbar.showMessage("Subiendo estudio al servidor...")
                 
+                raw_path = self.file_handler.generate_raw_file(
+                    self.graph_handler,
+                    patient_data,
+                    study_data
+                )
+                if not raw_path:
+                    self.statusbar.showMessage("Error al generar archivo de datos")
+                    if os.path.exists(pdf_path):
+                        os.remove(pdf_path)
+                    return
+
                 response = self.network_handler.upload_files(
                     pdf_path,
                     raw_path,
@@ -848,6 +938,8 @@ class MainWindow(QMainWindow, Ui_Main):
                         self.statusbar.showMessage("¡Estudio guardado exitosamente en línea!")
                     else:
                         self.statusbar.showMessage("Subido pero sin URL de respuesta")
+
+                    self.graph_handler.log_to_journal('record_saved', url)
                     
                     # Limpiar archivos temporales
                     if os.path.exists(pdf_path):
@@ -857,9 +949,10 @@ class MainWindow(QMainWindow, Ui_Main):
                 else:
                     # Si falla subida, guardar offline como backup
                     self.statusbar.showMessage("Error al subir, guardando offline...")
-                    offline_path = self.file_handler.save_study_offline(raw_path, pdf_path, patient_data)
+                    offline_path = self.file_handler.save_study_offline(study_data, pdf_path, patient_data)
                     
                     if offline_path:
+                        self.graph_handler.log_to_journal('record_saved', offline_path)
                         from PySide6.QtWidgets import QMessageBox
                         QMessageBox.information(
                             self,
@@ -877,9 +970,10 @@ class MainWindow(QMainWindow, Ui_Main):
             else:
                 # 4b. GUARDAR OFFLINE
                 self.statusbar.showMessage("Sin conexión, guardando offline...")
-                offline_path = self.file_handler.save_study_offline(raw_path, pdf_path, patient_data)
+                offline_path = self.file_handler.save_study_offline(study_data, pdf_path, patient_data)
                 
                 if offline_path:
+                    self.graph_handler.log_to_journal('record_saved', offline_path)
                     from PySide6.QtWidgets import QMessageBox
                     QMessageBox.information(
                         self,
@@ -891,8 +985,6 @@ class MainWindow(QMainWindow, Ui_Main):
                 # Limpiar archivos temporales
                 if os.path.exists(pdf_path):
                     os.remove(pdf_path)
-                if os.path.exists(raw_path):
-                    os.remove(raw_path)
                 
         except Exception as e:
             self.statusbar.showMessage(f"Error al guardar: {str(e)}")
@@ -921,22 +1013,29 @@ class MainWindow(QMainWindow, Ui_Main):
             if selected_file and os.path.exists(selected_file):
                 # Cargar el estudio
                 try:
-                    with open(selected_file, 'r') as f:
-                        study_data = json.load(f)
-                    
+                    study_data = open_study(selected_file)
+
+                    # Solo un archivo de la carpeta offline se referencia en el
+                    # diario; un estudio descargado (archivo temporal) se copia
+                    source_path = selected_file if self.file_handler.is_offline_file(selected_file) else None
+
                     # Cargar usando el método existente
-                    self.load_complete_study(study_data)
+                    self.load_complete_study(study_data, source_path)
                     
                 except Exception as e:
                     self.statusbar.showMessage(f"Error al abrir estudio: {str(e)}")
 
     @Slot(dict)
-    def load_complete_study(self, study_data):
+    def load_complete_study(self, study_data, source_path=None):
         """
         Cargar estudio completo con múltiples grabaciones
         
         Args:
             study_data (dict): Datos completos del estudio
+            source_path (str): Archivo del que se abrió (None si no viene de un archivo)
+
+        Returns:
+            bool: True si el estudio quedó cargado
         """
         try:
             # Limpiar estado actual
@@ -951,13 +1050,24 @@ class MainWindow(QMainWindow, Ui_Main):
 
             if not recordings:
                 self.statusbar.showMessage("El archivo no contiene grabaciones")
-                return
+                return False
             
-            # Restaurar grabaciones en el GraphHandler
+            # Restaurar grabaciones en el GraphHandler (las muestras se leen
+            # recién cuando se dibuja la curva o se recalcula una métrica)
+            for recording in recordings:
+                recording['data'] = lazy_columns(recording['data'])
             self.graph_handler.stored_recordings = recordings
             self.graph_handler.line_positions = {
                 int(k): v for k, v in line_positions.items()
             }
+
+            # Líneas y métricas guardadas en el estudio: no hace falta leer
+            # las muestras
+            self.graph_handler.place_missing_lines()
+            self.graph_handler.seed_saved_metrics()
+
+            # Calcular en segundo plano solo las métricas que faltan
+            self.graph_handler.refresh_metrics_async()
             
             # Recrear curvas permanentes
             for recording in recordings:
@@ -977,6 +1087,9 @@ class MainWindow(QMainWindow, Ui_Main):
             
             # Actualizar contador
             self.graph_handler.recording_count = len(recordings)
+
+            # Los cambios siguientes se registran sobre el estudio cargado
+            self.graph_handler.journal_loaded_study(source_path)
             
             # Activar primera grabación
             if recordings:
@@ -997,10 +1110,12 @@ class MainWindow(QMainWindow, Ui_Main):
             self.is_testing = False
             self.is_calibrated = False
             self.update_button_states()
+            return True
             
         except Exception as e:
             self.statusbar.showMessage(f"Error al cargar estudio: {str(e)}")
             print(f"Error en load_complete_study: {str(e)}")
+            return False
             
     def auto_sync_offline_studies(self):
         """Sincronizar automáticamente estudios offline al iniciar"""
@@ -1011,13 +1126,15 @@ class MainWindow(QMainWindow, Ui_Main):
             if not os.path.exists(offline_folder):
                 return
             
-            json_files = [f for f in os.listdir(offline_folder) if f.endswith('.json')]
+            study_index = self.file_handler.get_study_index()
+            study_index.refresh()
+            study_files = study_index.list(synced=False)
             
-            if not json_files:
+            if not study_files:
                 return  # No hay archivos para sincronizar
             
             # Mostrar en statusbar
-            self.statusbar.showMessage(f"Sincronizando {len(json_files)} estudios offline...")
+            self.statusbar.showMessage(f"Sincronizando {len(study_files)} estudios offline...")
             
             # Ejecutar sincronización
             stats = self.network_handler.sync_offline_studies(self.file_handler)
@@ -1051,10 +1168,170 @@ class MainWindow(QMainWindow, Ui_Main):
         # Limpiar info de calidad
         self.current_quality = None
 
+    def start_continuous_session(self, channel_name=None):
+        """
+        Iniciar la adquisición continua con volcado de la sesión a disco
+
+        Args:
+            channel_name (str): Canal del dispositivo a adquirir (ej. 'ecg_ch1');
+                                None para la respiración (volumen, presión y flujo)
+        """
+        try:
+            channel = None
+            if channel_name is not None:
+                channel = self.data_handler.get_channel(channel_name)
+                if channel is None:
+                    self.statusbar.showMessage(f"El dispositivo no tiene el canal {channel_name}")
+                    return
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            suffix = f"_{channel_name}" if channel_name else ""
+            spill_path = os.path.join(self.file_handler.get_sessions_folder(), f"sesion_{timestamp}{suffix}.f64")
+            self.graph_handler.start_continuous(spill_path, channel=channel)
+
+            # Asegurar que la lectura esté activa
+            if self.serial_handler:
+                if not hasattr(self.serial_handler, 'reader_thread') or self.serial_handler.reader_thread is None:
+                    self.serial_handler.start_reading()
+
+            self.statusbar.showMessage(f"Adquisición continua - sesión en {spill_path}")
+
+        except Exception as e:
+            self.statusbar.showMessage(f"Error al iniciar adquisición continua: {str(e)}")
+            print(f"Error al iniciar adquisición continua: {str(e)}")
+
+    @Slot()
+    def stop_continuous_session(self):
+        """Volver al modo por maniobras cerrando la sesión continua"""
+        path = self.graph_handler.stop_continuous()
+        if path:
+            self.statusbar.showMessage(f"Sesión continua guardada en {path}")
+
+            from PySide6.QtWidgets import QMessageBox
+            answer = QMessageBox.question(
+                self,
+                "Sesión continua",
+                "¿Exportar la sesión a CSV?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if answer == QMessageBox.Yes:
+                self.file_handler.save_session_to_csv(self, path)
+
+    @Slot()
+    def export_continuous_session(self):
+        """Elegir una sesión continua terminada y exportarla a CSV"""
+        if self.graph_handler.continuous_mode:
+            self.statusbar.showMessage("Termine la sesión continua antes de exportarla")
+            return
+
+        path = self.file_handler.ask_session_path(self)
+        if path:
+            self.file_handler.save_session_to_csv(self, path)
+
+    def start_session_journal(self):
+        """Abrir el diario de la sesión y conectarlo al GraphHandler"""
+        try:
+            path = new_journal_path(self.file_handler.get_journal_folder())
+            self.session_journal = SessionJournal(path)
+            self.session_journal.record_session({'activity': self.activity_name})
+            self.graph_handler.set_journal(self.session_journal)
+        except Exception as e:
+            self.session_journal = None
+            print(f"Error al abrir el diario de sesión: {str(e)}")
+
+    @Slot()
+    def sync_session_journal(self):
+        """fsync por lotes de lo registrado desde la última sincronización"""
+        if self.session_journal is None:
+            return
+        try:
+            self.session_journal.sync_pending()
+        except Exception as e:
+            print(f"Error sincronizando el diario de sesión: {str(e)}")
+
+    @Slot()
+    def recover_sessions(self):
+        """Ofrecer recuperar las sesiones que terminaron sin guardar"""
+        try:
+            exclude = self.session_journal.path if self.session_journal else None
+            journals = find_recoverable_journals(self.file_handler.get_journal_folder(), exclude)
+        except Exception as e:
+            print(f"Error buscando sesiones sin guardar: {str(e)}")
+            return
+
+        from PySide6.QtWidgets import QMessageBox
+        for path, state in journals:
+            started = (state.get('started') or '')[:16].replace('T', ' ')
+            answer = QMessageBox.question(
+                self,
+                "Sesión sin guardar",
+                f"Se encontró una sesión sin guardar ({started}, "
+                f"{len(state['recordings'])} grabaciones).\n\n"
+                f"¿Desea recuperarla? Si responde No, se descarta."
+            )
+
+            if answer != QMessageBox.Yes:
+                self.remove_journal(path)
+                continue
+
+            # El diario anterior se borra solo si las grabaciones quedaron
+            # cargadas y copiadas al diario de la sesión actual
+            expected = sorted(rec['recording_number'] for rec in state['recordings'])
+            if self.load_complete_study(journal_to_study(state)) and self.journal_holds(expected):
+                self.remove_journal(path)
+                self.statusbar.showMessage(f"Sesión recuperada: {len(expected)} grabaciones")
+            else:
+                self.statusbar.showMessage(
+                    f"No se pudo recuperar la sesión; se conserva en {path}"
+                )
+            break
+
+    def journal_holds(self, recording_numbers):
+        """
+        Verificar que las grabaciones están en memoria y en el diario actual
+
+        Args:
+            recording_numbers (list): Números de grabación ordenados
+
+        Returns:
+            bool: True si el GraphHandler y el diario (leído de disco) las tienen
+        """
+        if sorted(self.graph_handler.get_recording_list()) != recording_numbers:
+            return False
+        if self.session_journal is None or self.session_journal.closed:
+            return False
+
+        try:
+            self.session_journal.sync()
+            state = replay_journal(self.session_journal.path)
+        except Exception as e:
+            print(f"Error verificando el diario de sesión: {str(e)}")
+            return False
+        return sorted(rec['recording_number'] for rec in state['recordings']) == recording_numbers
+
+    def remove_journal(self, path):
+        """Borrar un diario de sesión que ya no hace falta"""
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Error borrando diario de sesión {path}: {str(e)}")
+
     def closeEvent(self, event):
         """Manejar el cierre de la ventana"""
         # Detener el timer
         self.port_timer.stop()
+
+        # Completar el archivo de una sesión continua en curso
+        self.graph_handler.stop_continuous()
+
+        # El diario se conserva solo si quedaron cambios sin guardar
+        self.journal_timer.stop()
+        if self.session_journal is not None:
+            self.graph_handler.set_journal(None)
+            if self.session_journal.unsaved:
+                self.session_journal.close()
+            else:
+                self.session_journal.discard()
         
         # Desconectar si es necesario
         if self.btn_connect.isChecked():
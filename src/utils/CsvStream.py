@@ -0,0 +1,175 @@
+"""
+Exportación e importación de CSV por bloques
+
+Las muestras se escriben y se leen de a bloques de filas con NumPy, sin pasar
+por el módulo csv ni por listas de Python: la memoria queda acotada al tamaño
+del bloque (al exportar) y el texto de cada bloque se arma o se parsea de una
+sola vez. Los archivos terminados en .gz o .zst se comprimen con gzip o
+zstandard (este último es opcional y solo se importa si se usa).
+"""
+
+import gzip
+import io
+import itertools
+import os
+
+import numpy as np
+
+from .SampleBuffer import SAMPLE_KEYS, SampleBuffer
+
+CSV_HEADERS = ('tiempo', 'presion', 'flujo', 'volumen')
+
+CSV_EXTENSIONS = ('.csv', '.csv.gz', '.csv.zst')
+
+DEFAULT_CHUNK_ROWS = 65536
+
+# Compresión rápida: el texto numérico comprime casi igual con nivel 1 y la
+# escritura no queda limitada por el compresor
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 3
+
+# 9 cifras significativas: más que la resolución de los sensores y suficiente
+# para volver a leer un float32 sin pérdida
+_VALUE_FORMAT = '%.9g'
+
+
+def _open_binary(path, mode, raw):
+    """Envolver el archivo crudo con el compresor según la extensión"""
+    if path.endswith('.gz'):
+        return gzip.GzipFile(fileobj=raw, mode=mode, compresslevel=GZIP_LEVEL)
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Para archivos .zst hay que instalar el paquete zstandard")
+        if mode == 'rb':
+            return zstandard.ZstdDecompressor().stream_reader(raw)
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw)
+    return raw
+
+
+def write_csv_chunks(path, chunks, total_rows=None, progress=None, keys=SAMPLE_KEYS, headers=CSV_HEADERS):
+    """
+    Escribir un CSV a partir de bloques de muestras
+
+    Args:
+        path (str): Archivo de destino (.csv, .csv.gz o .csv.zst)
+        chunks (iterable): Dicts con un arreglo por columna ('t', 'p', 'f', 'v')
+        total_rows (int): Filas totales, para informar el avance (opcional)
+        progress (callable): Recibe la fracción escrita (0 a 1)
+        keys (tuple): Columnas a escribir, en orden
+        headers (tuple): Encabezado de cada columna
+
+    Returns:
+        int: Filas escritas
+    """
+    rows_written = 0
+    with open(path, 'wb') as raw:
+        stream = _open_binary(path, 'wb', raw)
+        try:
+            stream.write((','.join(headers) + '\n').encode('ascii'))
+
+            row_format = ','.join([_VALUE_FORMAT] * len(keys)) + '\n'
+            for chunk in chunks:
+                block = np.column_stack([np.asarray(chunk[key], dtype=np.float64) for key in keys])
+                if len(block) == 0:
+                    continue
+
+                # Un solo formateo por bloque en lugar de uno por valor
+                text = (row_format * len(block)) % tuple(block.ravel().tolist())
+                stream.write(text.encode('ascii'))
+                rows_written += len(block)
+
+                if progress is not None and total_rows:
+                    progress(min(rows_written / total_rows, 1.0))
+        finally:
+            if stream is not raw:
+                stream.close()
+
+    return rows_written
+
+
+def write_csv(path, data, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """
+    Escribir las columnas de una grabación a un CSV
+
+    Args:
+        path (str): Archivo de destino (.csv, .csv.gz o .csv.zst)
+        data (dict): Columnas 't', 'p', 'f', 'v' (arreglos o listas)
+        chunk_rows (int): Filas por bloque
+        progress (callable): Recibe la fracción escrita (0 a 1)
+
+    Returns:
+        int: Filas escritas
+    """
+    columns = {key: np.asarray(data[key], dtype=np.float64) for key in SAMPLE_KEYS}
+    total_rows = len(columns['t'])
+    chunks = (
+        {key: values[start:start + chunk_rows] for key, values in columns.items()}
+        for start in range(0, total_rows, chunk_rows)
+    )
+    return write_csv_chunks(path, chunks, total_rows, progress)
+
+
+def iter_csv(path, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """
+    Leer un CSV por bloques
+
+    Args:
+        path (str): Archivo (.csv, .csv.gz o .csv.zst)
+        chunk_rows (int): Filas por bloque
+        progress (callable): Recibe la fracción leída del archivo (0 a 1)
+
+    Yields:
+        dict: Arreglo float64 por columna ('t', 'p', 'f', 'v')
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as raw:
+        stream = _open_binary(path, 'rb', raw)
+        text = io.TextIOWrapper(stream, encoding='ascii', newline='')
+        try:
+            # Verificar formato del archivo
+            headers = [h.strip().lower() for h in text.readline().split(',')]
+            if len(headers) < len(CSV_HEADERS) or any(h not in CSV_HEADERS for h in headers):
+                raise ValueError("Formato de archivo incorrecto: encabezados no coinciden")
+
+            while True:
+                lines = list(itertools.islice(text, chunk_rows))
+                if not lines:
+                    break
+
+                try:
+                    block = np.loadtxt(lines, delimiter=',', usecols=range(len(SAMPLE_KEYS)),
+                                       dtype=np.float64, ndmin=2)
+                except ValueError as e:
+                    raise ValueError(f"Error en formato de datos: {str(e)}")
+
+                if progress is not None and file_size:
+                    progress(min(raw.tell() / file_size, 1.0))
+
+                yield {key: block[:, i] for i, key in enumerate(SAMPLE_KEYS)}
+        finally:
+            text.close()
+
+
+def read_csv(path, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """
+    Leer un CSV completo a columnas NumPy
+
+    Args:
+        path (str): Archivo (.csv, .csv.gz o .csv.zst)
+        chunk_rows (int): Filas por bloque
+        progress (callable): Recibe la fracción leída del archivo (0 a 1)
+
+    Returns:
+        dict: Arreglo float64 por columna ('t', 'p', 'f', 'v')
+    """
+    buffer = SampleBuffer(chunk_rows)
+    for chunk in iter_csv(path, chunk_rows, progress):
+        buffer.extend(**chunk)
+    return buffer.snapshot()
+
+
+def csv_path_with_extension(path):
+    """Agregar .csv si el archivo no termina en una extensión de CSV"""
+    return path if path.endswith(CSV_EXTENSIONS) else path + '.csv'
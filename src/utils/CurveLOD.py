@@ -0,0 +1,98 @@
+"""
+Niveles de detalle (LOD) para dibujar curvas almacenadas
+
+Dibujar cada grabación con todas sus muestras es innecesario: en pantalla
+entran a lo sumo unos pocos puntos por pixel. CurvePyramid precalcula, una vez
+por curva, una pirámide de decimación mín/máx: en el nivel k cada bloque de
+2^k muestras se reduce a su mínimo y su máximo (en orden temporal), así los
+picos (PEF, FVC) se conservan aunque se dibujen pocos puntos. Al cambiar la
+vista se elige el nivel más grueso que todavía da al menos un bloque por pixel.
+"""
+
+import numpy as np
+
+
+class CurvePyramid:
+    """Pirámide de decimación mín/máx de una curva (x, y)"""
+
+    def __init__(self, x, y, min_buckets=256):
+        """
+        Args:
+            x (numpy.ndarray): Coordenada x de cada muestra
+            y (numpy.ndarray): Coordenada y de cada muestra
+            min_buckets (int): No se generan niveles con menos bloques que esto
+        """
+        n = min(len(x), len(y))
+        self.x = np.asarray(x, dtype=np.float64)[:n]
+        self.y = np.asarray(y, dtype=np.float64)[:n]
+
+        # Nivel k: (tamaño de bloque, índices de muestra mín/máx de cada bloque)
+        self.levels = []
+
+        lowest = np.arange(n)
+        highest = np.arange(n)
+        bucket = 1
+        while len(lowest) > min_buckets:
+            if len(lowest) % 2:
+                lowest = np.append(lowest, lowest[-1])
+                highest = np.append(highest, highest[-1])
+
+            # Cada bloque nuevo une dos bloques del nivel anterior
+            pairs = lowest.reshape(-1, 2)
+            lowest = pairs[np.arange(len(pairs)), (self.y[pairs[:, 1]] < self.y[pairs[:, 0]]).astype(np.intp)]
+            pairs = highest.reshape(-1, 2)
+            highest = pairs[np.arange(len(pairs)), (self.y[pairs[:, 1]] > self.y[pairs[:, 0]]).astype(np.intp)]
+            bucket *= 2
+
+            # Dos puntos por bloque en el orden en que aparecen en la curva
+            points = np.sort(np.column_stack((lowest, highest)), axis=1).ravel()
+            self.levels.append((bucket, points))
+
+    def __len__(self):
+        return len(self.x)
+
+    def select(self, pixels, x_range=None, monotonic=True):
+        """
+        Puntos a dibujar para una vista
+
+        Args:
+            pixels (int): Ancho de la vista en pixeles
+            x_range (tuple): (x_min, x_max) visibles, None para toda la curva
+            monotonic (bool): True si x crece con las muestras (ej. tiempo);
+                              permite recortar a la vista
+
+        Returns:
+            tuple: (x, y) decimados
+        """
+        n = len(self.x)
+        start, stop = 0, n
+        visible = n
+
+        if x_range is not None and n > 0:
+            x_min, x_max = x_range
+            if monotonic:
+                # Una muestra extra a cada lado para que la línea llegue al borde
+                start = max(int(np.searchsorted(self.x, x_min, side='left')) - 1, 0)
+                stop = min(int(np.searchsorted(self.x, x_max, side='right')) + 1, n)
+                visible = stop - start
+            else:
+                # Sin orden en x: se estima la fracción de la curva que cae en
+                # la vista, así al acercar se usa un nivel más fino
+                span = np.nanmax(self.x) - np.nanmin(self.x)
+                if span > 0 and x_max > x_min:
+                    visible = int(n * min(1.0, (x_max - x_min) / span))
+
+        level = None
+        for bucket, points in self.levels:
+            if visible / bucket < max(int(pixels), 1):
+                break
+            level = (bucket, points)
+
+        if level is None:
+            return self.x[start:stop], self.y[start:stop]
+
+        bucket, points = level
+        first = start // bucket
+        last = -(-stop // bucket)
+        indices = points[2 * first:2 * last]
+        return self.x[indices], self.y[indices]
@@ -1,16 +1,28 @@
 from PySide6.QtWidgets import QFileDialog, QMessageBox
 from PySide6.QtCore import QObject, Signal
-import csv
 import json
 import os
 from datetime import datetime
 import tempfile
 
+from .CsvStream import CSV_HEADERS, csv_path_with_extension, read_csv, write_csv, write_csv_chunks
+from .StudyContainer import STUDY_EXTENSION, load_study_file, study_to_json, write_study
+from .StudyIndex import StudyIndex
+from .LazyStudy import open_study
+from .SampleBuffer import SAMPLE_KEYS
+from .StreamWindow import iter_spill, read_spill_info, spill_length
+
+CSV_FILE_FILTER = "Archivos CSV (*.csv *.csv.gz *.csv.zst)"
+SESSION_FILE_FILTER = "Sesiones continuas (*.f64)"
+
 class FileHandler(QObject):
     # Señales para notificar estados
     save_status = Signal(str)
     error_occurred = Signal(str)
     
+    # Avance (0-100) de exportaciones e importaciones de CSV
+    progress = Signal(int)
+    
     # Señal para datos CSV (legacy)
     data_loaded = Signal(dict)
     
@@ -20,59 +32,28 @@ class FileHandler(QObject):
     def __init__(self):
         super().__init__()
         self.offline_folder = os.path.expanduser("~/Documents/Spirometry_Offline")
+        self.study_index = None
         
     def save_data_to_csv(self, parent, data):
         """
         Guarda los datos en un archivo CSV (método legacy).
+
+        Se escribe por bloques; con extensión .csv.gz o .csv.zst el archivo
+        se comprime.
         
         Args:
             parent: Widget padre para el diálogo
-            data (dict): Diccionario con las listas de datos {'t': [], 'p': [], 'f': [], 'v': []}
+            data (dict): Diccionario con las columnas de datos {'t', 'p', 'f', 'v'}
         """
         try:
             # Verificar si hay datos para guardar
-            if not data['t']:
+            if len(data['t']) == 0:
                 self.save_status.emit("No hay datos para guardar")
                 return False
 
-            # Abrir diálogo para seleccionar ubicación y nombre del archivo
-            file_path, _ = QFileDialog.getSaveFileName(
-                parent,
-                "Guardar Datos",
-                os.path.expanduser("~/Documents"),
-                "Archivos CSV (*.csv)"
-            )
-
+            file_path = self.ask_csv_save_path(parent, "Guardar Datos")
             if file_path:
-                # Asegurar que el archivo termine en .csv
-                if not file_path.endswith('.csv'):
-                    file_path += '.csv'
-
-                # Crear lista de datos para escribir
-                data_to_write = []
-                
-                # Encabezados
-                headers = ['tiempo', 'presion', 'flujo', 'volumen']
-                data_to_write.append(headers)
-                
-                # Obtener la longitud de los datos
-                data_length = len(data['t'])
-                
-                # Combinar datos
-                for i in range(data_length):
-                    row = [
-                        data['t'][i],
-                        data['p'][i],
-                        data['f'][i],
-                        data['v'][i]
-                    ]
-                    data_to_write.append(row)
-
-                # Escribir al archivo CSV
-                with open(file_path, 'w', newline='') as file:
-                    writer = csv.writer(file)
-                    writer.writerows(data_to_write)
-
+                write_csv(file_path, data, progress=self.emit_progress)
                 self.save_status.emit(f"Datos guardados exitosamente en {file_path}")
                 return True
 
@@ -83,9 +64,70 @@ class FileHandler(QObject):
             self.error_occurred.emit(error_msg)
             return False
 
+    def save_session_to_csv(self, parent, spill_path):
+        """
+        Exporta a CSV una sesión de adquisición continua
+
+        Las muestras se leen del archivo de la sesión y se escriben de a
+        bloques, sin cargar la sesión completa en memoria.
+
+        Args:
+            parent: Widget padre para el diálogo
+            spill_path (str): Archivo de la sesión (GraphHandler.stop_continuous)
+        """
+        try:
+            total_rows = spill_length(spill_path)
+            if total_rows == 0:
+                self.save_status.emit("No hay datos para guardar")
+                return False
+
+            # Espirometría con los encabezados de siempre; un canal, tiempo y su nombre
+            keys = read_spill_info(spill_path)['keys']
+            headers = CSV_HEADERS if keys == SAMPLE_KEYS else (CSV_HEADERS[0],) + keys[1:]
+
+            file_path = self.ask_csv_save_path(parent, "Exportar Sesión")
+            if file_path:
+                write_csv_chunks(file_path, iter_spill(spill_path, keys=keys), total_rows,
+                                 progress=self.emit_progress, keys=keys, headers=headers)
+                self.save_status.emit(f"Sesión exportada exitosamente en {file_path}")
+                return True
+
+            return False
+
+        except Exception as e:
+            error_msg = f"Error al exportar sesión: {str(e)}"
+            self.error_occurred.emit(error_msg)
+            return False
+
+    def ask_session_path(self, parent):
+        """Diálogo para elegir una sesión continua terminada; devuelve la ruta o None"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            parent,
+            "Abrir Sesión Continua",
+            self.get_sessions_folder(),
+            SESSION_FILE_FILTER
+        )
+        return file_path or None
+
+    def ask_csv_save_path(self, parent, title):
+        """Diálogo de guardado de CSV; devuelve la ruta con extensión o None"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            parent,
+            title,
+            os.path.expanduser("~/Documents"),
+            CSV_FILE_FILTER
+        )
+        return csv_path_with_extension(file_path) if file_path else None
+
+    def emit_progress(self, fraction):
+        """Emitir el avance de una exportación o importación en porcentaje"""
+        self.progress.emit(int(fraction * 100))
+
     def open_data_file(self, parent):
         """
         Abre y carga datos desde un archivo CSV (método legacy).
+
+        Acepta CSV comprimidos con gzip (.csv.gz) o zstandard (.csv.zst).
         
         Args:
             parent: Widget padre para el diálogo
@@ -96,42 +138,14 @@ class FileHandler(QObject):
                 parent,
                 "Abrir Datos",
                 os.path.expanduser("~/Documents"),
-                "Archivos CSV (*.csv)"
+                CSV_FILE_FILTER
             )
 
             if file_path:
-                # Inicializar diccionario de datos
-                data = {
-                    't': [],
-                    'p': [],
-                    'f': [],
-                    'v': []
-                }
-                
-                # Leer archivo CSV
-                with open(file_path, 'r') as file:
-                    csv_reader = csv.reader(file)
-                    
-                    # Leer encabezados
-                    headers = next(csv_reader)
-                    # Verificar formato del archivo
-                    expected_headers = ['tiempo', 'presion', 'flujo', 'volumen']
-                    if not all(h.lower() in [eh.lower() for eh in expected_headers] for h in headers):
-                        raise ValueError("Formato de archivo incorrecto: encabezados no coinciden")
-                    
-                    # Leer datos
-                    for row in csv_reader:
-                        if len(row) >= 4:  # Verificar que la fila tenga todos los datos
-                            try:
-                                data['t'].append(float(row[0]))
-                                data['p'].append(float(row[1]))
-                                data['f'].append(float(row[2]))
-                                data['v'].append(float(row[3]))
-                            except ValueError as e:
-                                raise ValueError(f"Error en formato de datos: {str(e)}")
+                data = read_csv(file_path, progress=self.emit_progress)
                 
                 # Verificar que se hayan cargado datos
-                if not data['t']:
+                if len(data['t']) == 0:
                     raise ValueError("No se encontraron datos válidos en el archivo")
                 
                 # Emitir datos cargados
@@ -146,63 +160,88 @@ class FileHandler(QObject):
             self.error_occurred.emit(error_msg)
             return False
 
-    def generate_raw_file(self, graph_handler, metadata):
+    def build_study_data(self, graph_handler, metadata):
+        """
+        Armar el estudio completo a partir del estado del GraphHandler
+
+        Las columnas de las grabaciones quedan como arreglos NumPy (sin
+        copiarlas); generate_raw_file las pasa a listas solo para el JSON.
+
+        Args:
+            graph_handler: Instancia de GraphHandler con los datos
+            metadata (dict): Metadata con datos del paciente
+
+        Returns:
+            dict: Estudio con la estructura del RAW
+        """
+        # Las métricas de cada grabación se guardan con las líneas usadas,
+        # así al abrir el estudio no hace falta recalcularlas
+        recordings = [
+            {
+                **recording,
+                'metrics': graph_handler.get_saved_metrics(recording)
+            }
+            for recording in graph_handler.get_stored_recordings()
+        ]
+        line_positions = graph_handler.line_positions
+        
+        # Calcular calidad y promedios
+        quality = graph_handler.calculate_quality()
+        averages = graph_handler.calculate_averages()
+        
+        # Crear estructura completa
+        return {
+            "device": "fisioaccess_espiro",
+            "version": "1.0",
+            "timestamp": datetime.now().isoformat(),
+            "patient": {
+                "nombre": metadata.get('nombre', ''),
+                "rut": metadata.get('rut', ''),
+                "sexo": metadata.get('sexo', ''),
+                "fecha_nacimiento": metadata.get('fecha_nacimiento', ''),
+                "edad": metadata.get('edad', 0),
+                "etnia": metadata.get('etnia', ''),
+                "estatura_cm": metadata.get('estatura_cm', 0),
+                "peso_kg": metadata.get('peso_kg', 0.0),
+                "comments": metadata.get('comments', '')
+            },
+            "analysis": {
+                "interpretacion": metadata.get('interpretacion', ''),
+                "conclusion": metadata.get('conclusion', '')
+            },
+            "recordings": recordings,
+            "line_positions": line_positions,
+            "quality": quality,
+            "averages": averages
+        }
+
+    def generate_raw_file(self, graph_handler, metadata, study_data=None):
         """
         Generar archivo RAW con el estado completo del estudio
         
         Args:
             graph_handler: Instancia de GraphHandler con los datos
             metadata (dict): Metadata con datos del paciente
+            study_data (dict): Estudio ya armado con build_study_data (opcional)
             
         Returns:
             str: Ruta al archivo temporal creado
         """
         try:
-            # Obtener todos los datos del GraphHandler
-            recordings = graph_handler.get_stored_recordings()
-            line_positions = graph_handler.line_positions
-            
-            # Calcular calidad y promedios
-            quality = graph_handler.calculate_quality()
-            averages = graph_handler.calculate_averages()
-            
-            # Crear estructura completa
-            study_data = {
-                "device": "fisioaccess_espiro",
-                "version": "1.0",
-                "timestamp": datetime.now().isoformat(),
-                "patient": {
-                    "nombre": metadata.get('nombre', ''),
-                    "rut": metadata.get('rut', ''),
-                    "sexo": metadata.get('sexo', ''),
-                    "fecha_nacimiento": metadata.get('fecha_nacimiento', ''),
-                    "edad": metadata.get('edad', 0),
-                    "etnia": metadata.get('etnia', ''),
-                    "estatura_cm": metadata.get('estatura_cm', 0),
-                    "peso_kg": metadata.get('peso_kg', 0.0),
-                    "comments": metadata.get('comments', '')
-                },
-                "analysis": {
-                    "interpretacion": metadata.get('interpretacion', ''),
-                    "conclusion": metadata.get('conclusion', '')
-                },
-                "recordings": recordings,
-                "line_positions": line_positions,
-                "quality": quality,
-                "averages": averages
-            }
-            
+            if study_data is None:
+                study_data = self.build_study_data(graph_handler, metadata)
+
             # Crear archivo temporal
             temp_file = tempfile.NamedTemporaryFile(
                 mode='w',
                 suffix='.json',
                 delete=False
             )
-            
-            # Guardar como JSON
-            json.dump(study_data, temp_file, indent=2)
             temp_file.close()
             
+            # Guardar como JSON (las columnas pasan a listas)
+            study_to_json(study_data, temp_file.name)
+            
             return temp_file.name
             
         except Exception as e:
@@ -210,12 +249,13 @@ class FileHandler(QObject):
             self.error_occurred.emit(error_msg)
             return None
         
-    def save_study_offline(self, raw_path, pdf_path, metadata):
+    def save_study_offline(self, study, pdf_path, metadata):
         """
         Guardar estudio en carpeta offline local (RAW y PDF)
         
         Args:
-            raw_path (str): Ruta al archivo RAW temporal
+            study (dict | str): Estudio armado con build_study_data (se escribe
+                                directo, sin pasar por JSON) o ruta a un RAW
             pdf_path (str): Ruta al archivo PDF temporal
             metadata (dict): Metadata del estudio con datos del paciente
             
@@ -234,16 +274,20 @@ class FileHandler(QObject):
             
             base_filename = f"{timestamp}_{nombre_clean}_{rut_clean}_espiro"
             
-            # Guardar archivo RAW (JSON)
-            raw_destination = os.path.join(self.offline_folder, f"{base_filename}.json")
-            with open(raw_path, 'r') as src, open(raw_destination, 'w') as dst:
-                dst.write(src.read())
+            # Guardar el estudio en el contenedor binario (el JSON para subir
+            # al servidor se vuelve a generar al sincronizar)
+            raw_destination = os.path.join(self.offline_folder, f"{base_filename}{STUDY_EXTENSION}")
+            study_data = load_study_file(study) if isinstance(study, str) else study
+            write_study(raw_destination, study_data)
             
             # Guardar archivo PDF
             pdf_destination = os.path.join(self.offline_folder, f"{base_filename}.pdf")
             with open(pdf_path, 'rb') as src, open(pdf_destination, 'wb') as dst:
                 dst.write(src.read())
             
+            # Registrar en el índice para listarlo sin volver a leerlo
+            self.get_study_index().add(raw_destination, study_data)
+
             self.save_status.emit(f"Estudio guardado offline:\n{raw_destination}\n{pdf_destination}")
             
             return raw_destination
@@ -255,7 +299,7 @@ class FileHandler(QObject):
 
     def open_complete_study(self, parent):
         """
-        Abrir y cargar un estudio completo desde archivo JSON
+        Abrir y cargar un estudio completo desde archivo binario o JSON
         
         Args:
             parent: Widget padre para el diálogo
@@ -269,15 +313,14 @@ class FileHandler(QObject):
                 parent,
                 "Abrir Estudio Completo",
                 os.path.expanduser("~/Documents"),
-                "Archivos de Estudio (*.json);;Todos los archivos (*.*)"
+                f"Archivos de Estudio (*{STUDY_EXTENSION} *.json);;Todos los archivos (*.*)"
             )
             
             if not file_path:
                 return False
             
-            # Leer archivo JSON
-            with open(file_path, 'r') as file:
-                study_data = json.load(file)
+            # Leer encabezado (contenedor binario o JSON); las muestras se leen al usarlas
+            study_data = open_study(file_path)
             
             # ========== MIGRACIÓN AUTOMÁTICA ==========
             # Convertir "comentarios" → "comments" si existe versión antigua
@@ -333,3 +376,26 @@ class FileHandler(QObject):
     def set_offline_folder(self, folder_path):
         """Cambiar la ruta de la carpeta offline"""
         self.offline_folder = folder_path
+        self.study_index = None
+
+    def get_journal_folder(self):
+        """Carpeta de los diarios de sesión (dentro de la carpeta offline)"""
+        return os.path.join(self.offline_folder, "sesiones")
+
+    def is_offline_file(self, path):
+        """True si el archivo está dentro de la carpeta offline (no es temporal)"""
+        folder = os.path.realpath(self.offline_folder)
+        try:
+            return os.path.commonpath([folder, os.path.realpath(path)]) == folder
+        except ValueError:
+            return False
+
+    def get_sessions_folder(self):
+        """Carpeta de las sesiones de adquisición continua (dentro de la carpeta offline)"""
+        return os.path.join(self.offline_folder, "continuo")
+
+    def get_study_index(self):
+        """Índice de estudios de la carpeta offline (se crea al primer uso)"""
+        if self.study_index is None or self.study_index.folder != self.offline_folder:
+            self.study_index = StudyIndex(self.offline_folder)
+        return self.study_index
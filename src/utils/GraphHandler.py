@@ -1,9 +1,18 @@
 import pyqtgraph as pg
 from PySide6.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QListWidget, QLabel, QFrame
-from PySide6.QtCore import Slot, Signal, Qt
+from PySide6.QtCore import Slot, Signal, Qt, QTimer
 from PySide6.QtGui import QFont
 import numpy as np
 
+from . import SpirometryMetrics
+from .SpirometryLandmarks import DEFAULT_LINE_POSITIONS, auto_line_positions
+from .MetricsWorker import MetricsWorker
+from .CurveLOD import CurvePyramid
+from .LazyStudy import LazyColumns
+from .SampleBuffer import SAMPLE_KEYS, SampleBuffer
+from .StreamWindow import ChunkSpiller, RollingWindow
+from .VolumeIndex import VolumeIndex
+
 class GraphHandler(QWidget):
     # Señal para notificar nueva grabación
     new_recording_created = Signal(int, dict)
@@ -22,28 +31,55 @@ class GraphHandler(QWidget):
         self.setup_graphs_section()
         self.setup_results_section()
 
-        # Datos para visualización actual
-        self.display_data = {
-            't': [],
-            'p': [],
-            'f': [],
-            'v': []
-        }
-
         # Variables de grabación
         self.recording_started = False
         self.start_time = None
         self.recording_count = 0
         self.max_recordings = 9
         self.recording_duration = 6.0
+        self.sample_rate = 500.0  # Hz, para preasignar el buffer de grabación
         self.ready_for_new_recording = False
+
+        # Buffer de la captura en vivo y datos en pantalla: display_data es el
+        # buffer durante la captura o el dict de arreglos de la grabación
+        # almacenada seleccionada (de solo lectura). Las muestras siempre se
+        # escriben en capture_buffer
+        self.capture_buffer = self.new_sample_buffer()
+        self.display_data = self.capture_buffer
         
         # Almacenar todas las grabaciones
         self.stored_recordings = []
         self.recording_colors = ['b', 'r', 'g', 'm', 'c', 'y', 'orange', 'purple', 'brown', 'pink']
         
-        # Curvas para grabaciones almacenadas
-        self.stored_curves = []
+        # Curvas de grabaciones almacenadas por número de grabación; las recién
+        # agregadas esperan en unstyled_curves hasta el próximo cambio de estilo
+        self.stored_curves = {}
+        self.unstyled_curves = set()
+        self.styled_active_recording = None
+
+        # Lápices de curvas almacenadas, creados una vez: líneas sólidas de
+        # ancho 1 (las punteadas y anchas son las más lentas de dibujar en Qt)
+        self.curve_pens = {}
+        self.lod_dirty = False
+
+        # Curvas de estudios abiertos que se pidieron mostrar y cuyas muestras
+        # aún no se leyeron: se completan de a pocas por tick del timer de dibujo
+        self.pending_curves = []
+        self.curves_per_tick = 2
+
+        # Modo continuo: ventana deslizante en memoria, el resto a disco
+        self.continuous_mode = False
+        self.stream_window = None
+        self.stream_spiller = None
+        self.stream_window_seconds = 10.0
+        self.stream_start = None
+        # Canal del dispositivo (ChannelBuffer) que alimenta la ventana en
+        # ECG/EMG; None para la respiración (bloques t/p/f/v del pipeline)
+        self.stream_channel = None
+
+        # Diario de sesión (SessionJournal): cada cambio de las grabaciones se
+        # agrega al diario
+        self.journal = None
         
         # Curva activa
         self.active_recording_number = None
@@ -51,6 +87,20 @@ class GraphHandler(QWidget):
         # Diccionario para guardar posiciones de líneas por grabación
         self.line_positions = {}
 
+        # Métricas cacheadas: por grabación {número: (datos, líneas, métricas)}
+        # y de la curva actual; se recalculan solo si cambian datos o líneas
+        self.metrics_cache = {}
+        self.current_metrics_cache = None
+        self.last_quality_info = None
+
+        # Índices de volumen por curva {id(datos): (datos, n_muestras, VolumeIndex)}
+        self.volume_indexes = {}
+
+        # Cálculo de métricas de grabaciones en segundo plano
+        self.metrics_worker = None
+        # Curva actual enviada al worker: (datos, clave de líneas y muestras)
+        self.current_metrics_job = None
+
         # Configurar estilos de las curvas
         self.setup_curve_styles()
         
@@ -58,6 +108,19 @@ class GraphHandler(QWidget):
         self.setup_vertical_lines()
 
         self.graph_record = True
+
+        # Refresco de gráficos a FPS limitado: las muestras solo marcan los
+        # gráficos como pendientes y el timer redibuja (se detiene sin cambios)
+        self.render_fps = 30
+        self.plots_dirty = False
+        self.render_timer = QTimer(self)
+        self.render_timer.setInterval(int(1000 / self.render_fps))
+        self.render_timer.timeout.connect(self.render_tick)
+
+        # Las curvas almacenadas se vuelven a decimar al cambiar la vista o su tamaño
+        for plot in (self.flow_time_plot, self.flow_pressure_plot):
+            plot.getViewBox().sigXRangeChanged.connect(self.schedule_lod_update)
+            plot.getViewBox().sigResized.connect(self.schedule_lod_update)
     
     def setup_graphs_section(self):
         """Configurar sección de gráficos (centro)"""
@@ -266,13 +329,27 @@ class GraphHandler(QWidget):
         self.v_line_pef.sigPositionChanged.connect(self.update_fef_lines)
         self.v_line_fvc.sigPositionChanged.connect(self.update_fef_lines)
 
+    def new_sample_buffer(self):
+        """Buffer preasignado para una grabación (duración × frecuencia de muestreo)"""
+        return SampleBuffer(int(self.recording_duration * self.sample_rate * 1.25) + 1)
+
+    def set_sample_rate(self, sample_rate):
+        """
+        Ajustar la frecuencia de muestreo usada para preasignar grabaciones
+
+        Args:
+            sample_rate (float): Frecuencia de muestreo en Hz
+        """
+        if sample_rate and sample_rate > 0:
+            self.sample_rate = float(sample_rate)
+
     def get_flow_at_volume(self, volume_pos):
         """Obtener el valor de flujo en una posición de volumen específica"""
-        if not self.display_data['v'] or not self.display_data['f']:
+        if len(self.display_data['v']) == 0 or len(self.display_data['f']) == 0:
             return None
 
-        v_data = np.array(self.display_data['v'])
-        f_data = np.array(self.display_data['f'])
+        v_data = np.asarray(self.display_data['v'], dtype=np.float64)
+        f_data = np.asarray(self.display_data['f'], dtype=np.float64)
 
         if volume_pos < v_data.min() or volume_pos > v_data.max():
             return None
@@ -295,37 +372,29 @@ class GraphHandler(QWidget):
         Obtener ambas intersecciones de flujo (positiva y negativa) en una posición de volumen.
         Retorna (flujo_positivo, flujo_negativo) o (None, None) si no hay datos
         """
-        if not self.display_data['v'] or not self.display_data['f']:
+        if len(self.display_data['v']) == 0 or len(self.display_data['f']) == 0:
             return None, None
 
-        v_data = np.array(self.display_data['v'])
-        f_data = np.array(self.display_data['f'])
+        return self.get_volume_index(self.display_data).intersections(volume_pos)
 
-        # Encontrar todas las intersecciones cercanas a este volumen
-        intersections = []
-        tolerance = 0.05  # Tolerancia para considerar el mismo volumen
-        
-        for i in range(1, len(v_data)):
-            # Si el volumen está entre v[i-1] y v[i]
-            if min(v_data[i-1], v_data[i]) <= volume_pos <= max(v_data[i-1], v_data[i]):
-                # Interpolar el flujo
-                if v_data[i] != v_data[i-1]:
-                    t = (volume_pos - v_data[i-1]) / (v_data[i] - v_data[i-1])
-                    flow_interp = f_data[i-1] + t * (f_data[i] - f_data[i-1])
-                    intersections.append(flow_interp)
-        
-        if not intersections:
-            return None, None
-        
-        # Separar en positivos y negativos
-        positive_flows = [f for f in intersections if f > 0]
-        negative_flows = [f for f in intersections if f < 0]
-        
-        # Tomar el máximo positivo y el mínimo negativo (más negativo)
-        flow_positive = max(positive_flows) if positive_flows else None
-        flow_negative = min(negative_flows) if negative_flows else None
-        
-        return flow_positive, flow_negative
+    def get_volume_index(self, data):
+        """
+        Índice de volumen de una curva, construido una vez por datos
+
+        Args:
+            data (dict): Columnas de la curva (grabación almacenada o display_data)
+
+        Returns:
+            VolumeIndex: Índice para consultar flujos por volumen
+        """
+        n = len(data['v'])
+        cached = self.volume_indexes.get(id(data))
+        if cached is not None and cached[0] is data and cached[1] == n:
+            return cached[2]
+
+        index = VolumeIndex(data['v'], data['f'])
+        self.volume_indexes[id(data)] = (data, n, index)
+        return index
 
     def setup_curve_styles(self):
         """Configurar las curvas de los gráficos"""
@@ -340,27 +409,11 @@ class GraphHandler(QWidget):
 
     def get_y_value_at_x(self, x_pos):
         """Obtener el valor Y en la posición X de la curva"""
-        if not self.display_data['t'] or not self.display_data['v']:
-            return None
-
-        x_data = np.array(self.display_data['t'])
-        y_data = np.array(self.display_data['v'])
-
-        if x_pos < x_data[0] or x_pos > x_data[-1]:
-            return None
-
-        idx = np.searchsorted(x_data, x_pos)
-        if idx > 0 and idx < len(x_data):
-            x0, x1 = x_data[idx-1], x_data[idx]
-            y0, y1 = y_data[idx-1], y_data[idx]
-            
-            if x1 == x0:
-                return y0
-                
-            y_interp = y0 + (y1 - y0) * (x_pos - x0) / (x1 - x0)
-            return y_interp
-
-        return None
+        return SpirometryMetrics.value_at_time(
+            np.asarray(self.display_data['t'], dtype=np.float64),
+            np.asarray(self.display_data['v'], dtype=np.float64),
+            x_pos
+        )
 
     def update_fef_lines(self):
         """Actualizar las líneas FEF cuando cambian PEF o FVC"""
@@ -386,34 +439,81 @@ class GraphHandler(QWidget):
         if recording_number is None:
             return
             
-        self.line_positions[recording_number] = {
+        positions = {
             'vLine1': self.vLine1.value(),
             'vLine2': self.vLine2.value(),
             'v_line_pef': self.v_line_pef.value(),
             'v_line_fvc': self.v_line_fvc.value()
         }
+        if self.line_positions.get(recording_number) != positions:
+            self.log_to_journal('record_lines', recording_number, positions)
+        self.line_positions[recording_number] = positions
 
     def restore_line_positions(self, recording_number):
         """Restaurar las posiciones de las líneas para una grabación"""
         if recording_number not in self.line_positions:
-            # Posiciones por defecto si no hay guardadas
-            self.vLine1.setValue(0.5)
-            self.vLine2.setValue(1.5)
-            self.v_line_pef.setValue(0)
-            self.v_line_fvc.setValue(4)
-            return
-            
-        positions = self.line_positions[recording_number]
-        self.vLine1.setValue(positions['vLine1'])
-        self.vLine2.setValue(positions['vLine2'])
-        self.v_line_pef.setValue(positions['v_line_pef'])
-        self.v_line_fvc.setValue(positions['v_line_fvc'])
-        
-        # Esto actualizará automáticamente las líneas dependientes
+            # Sin posiciones guardadas: ubicarlas sobre los puntos de referencia de la curva
+            for rec in self.stored_recordings:
+                if rec['recording_number'] == recording_number:
+                    self.line_positions[recording_number] = auto_line_positions(rec['data'])
+                    break
+            else:
+                # Posiciones por defecto si la grabación no existe
+                self.apply_line_positions(DEFAULT_LINE_POSITIONS)
+                return
+
+        self.apply_line_positions(self.line_positions[recording_number])
+
+    def apply_line_positions(self, positions):
+        """
+        Mover las líneas de análisis a unas posiciones
+
+        Las señales de las líneas se bloquean mientras se mueven, así el panel
+        de resultados se recalcula una sola vez al final.
+
+        Args:
+            positions (dict): vLine1, vLine2, v_line_pef, v_line_fvc
+        """
+        for name in ('vLine1', 'vLine2', 'v_line_pef', 'v_line_fvc'):
+            line = getattr(self, name)
+            line.blockSignals(True)
+            line.setValue(positions[name])
+            line.blockSignals(False)
+
+        # Esto actualizará las líneas dependientes y los resultados
         self.update_fef_lines()
 
+    def place_missing_lines(self):
+        """
+        Completar las líneas faltantes con las guardadas junto a las métricas
+
+        Sin leer muestras: las grabaciones que no tienen ni líneas ni métricas
+        guardadas se ubican automáticamente en el worker (refresh_metrics_async)
+        o al seleccionarlas (restore_line_positions).
+        """
+        for rec in self.stored_recordings:
+            saved = rec.get('metrics')
+            if rec['recording_number'] in self.line_positions or not saved or not saved.get('lines'):
+                continue
+            vline1, vline2, pef, fvc = saved['lines']
+            self.line_positions[rec['recording_number']] = {
+                'vLine1': vline1, 'vLine2': vline2, 'v_line_pef': pef, 'v_line_fvc': fvc
+            }
+
+    def is_capturing(self):
+        """True si hay una maniobra armada o grabándose"""
+        return self.recording_started or self.ready_for_new_recording
+
     def set_active_recording(self, recording_number):
-        """Establecer una grabación como activa y actualizar visualización"""
+        """
+        Establecer una grabación como activa y actualizar visualización
+
+        Returns:
+            bool: False si hay una captura en curso (la pantalla es de la captura)
+        """
+        if self.is_capturing():
+            return False
+
         # Guardar posiciones de la grabación anterior
         if self.active_recording_number is not None:
             self.save_line_positions(self.active_recording_number)
@@ -429,15 +529,15 @@ class GraphHandler(QWidget):
                 break
         
         if recording_data is None:
-            return
+            return True
         
-        # Cargar datos en display_data
-        self.display_data = {
-            't': recording_data['data']['t'].copy(),
-            'p': recording_data['data']['p'].copy(),
-            'f': recording_data['data']['f'].copy(),
-            'v': recording_data['data']['v'].copy()
-        }
+        # Cargar datos en display_data (solo lectura: sin copiar)
+        self.display_data = recording_data['data']
+
+        # Curva de un estudio abierto sin leer todavía: se dibuja ahora
+        curve_data = self.stored_curves.get(recording_number)
+        if curve_data is not None and curve_data['lod_time'] is None:
+            self.load_pending_curve(recording_number)
         
         # Restaurar posiciones de líneas
         self.restore_line_positions(recording_number)
@@ -447,61 +547,350 @@ class GraphHandler(QWidget):
         
         # Actualizar gráficos
         self.update_plots()
+        return True
 
     def update_curve_styles(self):
-        """Actualizar el estilo visual de las curvas según cuál está activa"""
-        for curve_data in self.stored_curves:
-            recording_num = curve_data['recording_number']
-            
-            if recording_num == self.active_recording_number:
-                # Curva activa: color original, opaca
-                color_idx = (recording_num - 1) % len(self.recording_colors)
-                color = self.recording_colors[color_idx]
-                pen = pg.mkPen(color, width=3)
-                
-                curve_data['curve_time'].setPen(pen)
-                if curve_data['curve_pressure']:
-                    curve_data['curve_pressure'].setPen(pen)
-            else:
-                # Curvas inactivas: grises, semi-transparentes
-                pen = pg.mkPen((150, 150, 150, 100), width=2, style=pg.QtCore.Qt.DashLine)
-                
-                curve_data['curve_time'].setPen(pen)
-                if curve_data['curve_pressure']:
-                    curve_data['curve_pressure'].setPen(pen)
+        """
+        Actualizar el estilo visual de las curvas según cuál está activa
+
+        Solo se cambia el estilo de las curvas afectadas: la activa anterior,
+        la nueva y las agregadas desde el último cambio.
+        """
+        changed = self.unstyled_curves | {self.styled_active_recording, self.active_recording_number}
+        for recording_num in changed:
+            if recording_num in self.stored_curves:
+                self.set_curve_style(recording_num, recording_num == self.active_recording_number)
+
+        self.unstyled_curves = set()
+        self.styled_active_recording = self.active_recording_number
+
+    def set_curve_style(self, recording_num, active):
+        """Aplicar el estilo de curva activa o inactiva a una grabación"""
+        curve_data = self.stored_curves[recording_num]
+
+        if active:
+            # Curva activa: color original, opaca
+            color_idx = (recording_num - 1) % len(self.recording_colors)
+            color = self.recording_colors[color_idx]
+            pen = self.get_curve_pen(color, width=3)
+        else:
+            # Curvas inactivas: gris claro opaco, sin transparencia ni trazos
+            pen = self.get_curve_pen((200, 200, 200))
+
+        curve_data['curve_time'].setPen(pen)
+        if curve_data['curve_pressure']:
+            curve_data['curve_pressure'].setPen(pen)
+
+    def get_curve_pen(self, color, width=1):
+        """Lápiz sólido cacheado por color y ancho"""
+        key = (color, width)
+        if key not in self.curve_pens:
+            self.curve_pens[key] = pg.mkPen(color, width=width)
+        return self.curve_pens[key]
+
+    def get_view_lod(self, plot):
+        """Rango x visible y ancho en pixeles de un gráfico"""
+        view_box = plot.getViewBox()
+        x_range = tuple(view_box.viewRange()[0])
+        return x_range, max(int(view_box.width()), 1)
+
+    def update_curve_lod(self, recording_num):
+        """Dibujar las curvas de una grabación con el nivel de detalle de la vista"""
+        curve_data = self.stored_curves.get(recording_num)
+        if curve_data is None or curve_data['lod_time'] is None:
+            return
+
+        x_range, pixels = self.get_view_lod(self.flow_time_plot)
+        x, y = curve_data['lod_time'].select(pixels, x_range)
+        curve_data['curve_time'].setData(x=x, y=y)
+
+        if curve_data['curve_pressure']:
+            x_range, pixels = self.get_view_lod(self.flow_pressure_plot)
+            x, y = curve_data['lod_pressure'].select(pixels, x_range, monotonic=False)
+            curve_data['curve_pressure'].setData(x=x, y=y)
+
+    @Slot()
+    def schedule_lod_update(self, *args):
+        """Marcar las curvas almacenadas para re-decimar en el próximo tick"""
+        # En modo continuo el eje se desplaza en cada cuadro: las curvas
+        # almacenadas se actualizan al volver al modo por maniobras
+        if not self.stored_curves or self.continuous_mode:
+            return
+        self.lod_dirty = True
+        if not self.render_timer.isActive():
+            self.render_timer.start()
+
+    def set_curve_visible(self, recording_num, visible):
+        """
+        Mostrar u ocultar las curvas de una grabación
+
+        Args:
+            recording_num (int): Número de grabación
+            visible (bool): True para mostrar
+        """
+        curve_data = self.stored_curves.get(recording_num)
+        if curve_data is None:
+            return
+
+        if visible and curve_data['lod_time'] is None:
+            # Curva diferida: se lee y se muestra en el próximo tick del timer
+            if recording_num not in self.pending_curves:
+                self.pending_curves.append(recording_num)
+            if not self.render_timer.isActive():
+                self.render_timer.start()
+            return
+        if not visible and recording_num in self.pending_curves:
+            self.pending_curves.remove(recording_num)
+
+        curve_data['curve_time'].setVisible(visible)
+        if curve_data['curve_pressure']:
+            curve_data['curve_pressure'].setVisible(visible)
+
+    def compute_curve_metrics(self, positions):
+        """
+        Calcular FEV1, PEF, FEF/FIF y FVC de display_data para unas posiciones de líneas
+
+        Args:
+            positions (dict): Posiciones 'vLine1', 'vLine2', 'v_line_pef', 'v_line_fvc'
+
+        Returns:
+            dict: Métricas (None donde la curva no tiene datos)
+        """
+        return self.compute_metrics_for(self.display_data, positions)
+
+    def compute_metrics_for(self, data, positions):
+        """Métricas de una curva cualquiera reutilizando su índice de volumen"""
+        index = None
+        if len(data['v']) > 0 and len(data['f']) > 0:
+            index = self.get_volume_index(data)
+        return SpirometryMetrics.curve_metrics(data, positions, index)
+
+    def get_recording_metrics(self, recording, stale_ok=False):
+        """
+        Métricas de una grabación almacenada con sus líneas guardadas (cacheadas)
+
+        Args:
+            recording (dict): Grabación de stored_recordings
+            stale_ok (bool): True para usar la caché aunque las líneas hayan
+                             cambiado (el worker ya está recalculándola)
+
+        Returns:
+            dict: Métricas o None si la grabación no tiene líneas guardadas
+        """
+        recording_number = recording['recording_number']
+        positions = self.line_positions.get(recording_number)
+        if positions is None:
+            return None
+
+        key = SpirometryMetrics.positions_key(positions)
+        cached = self.metrics_cache.get(recording_number)
+        if cached is not None and cached[0] is recording['data'] and (stale_ok or cached[1] == key):
+            return cached[2]
+
+        metrics = self.compute_metrics_for(recording['data'], positions)
+        self.metrics_cache[recording_number] = (recording['data'], key, metrics)
+        return metrics
+
+    def get_saved_metrics(self, recording):
+        """
+        Métricas de una grabación para guardar en el estudio
+
+        Returns:
+            dict: 'lines' (posiciones usadas) y 'values', o None sin líneas
+        """
+        metrics = self.get_recording_metrics(recording)
+        if metrics is None:
+            return None
+
+        positions = self.line_positions[recording['recording_number']]
+        return {
+            'lines': list(SpirometryMetrics.positions_key(positions)),
+            'values': {key: None if value is None else float(value) for key, value in metrics.items()}
+        }
+
+    def seed_saved_metrics(self):
+        """
+        Cargar en caché las métricas guardadas en un estudio abierto
+
+        Solo se usan si las líneas guardadas con ellas coinciden con las
+        actuales; las demás grabaciones se calculan como siempre.
+        """
+        for rec in self.stored_recordings:
+            saved = rec.get('metrics')
+            positions = self.line_positions.get(rec['recording_number'])
+            if not saved or positions is None:
+                continue
+
+            key = SpirometryMetrics.positions_key(positions)
+            if tuple(saved.get('lines', ())) != key:
+                continue
+
+            values = {metric: saved['values'].get(metric) for metric in SpirometryMetrics.METRIC_KEYS}
+            self.metrics_cache[rec['recording_number']] = (rec['data'], key, values)
+
+    def get_current_positions(self):
+        """Posiciones actuales de las líneas de medición"""
+        return {
+            'vLine1': self.vLine1.value(),
+            'vLine2': self.vLine2.value(),
+            'v_line_pef': self.v_line_pef.value(),
+            'v_line_fvc': self.v_line_fvc.value()
+        }
+
+    def current_metrics_key(self, positions):
+        """Clave de caché de la curva actual: líneas y cantidad de muestras"""
+        return (tuple(positions.values()), len(self.display_data['t']))
+
+    def current_metrics_valid(self, key):
+        cached = self.current_metrics_cache
+        return cached is not None and cached[0] is self.display_data and cached[1] == key
+
+    def get_current_metrics(self, stale_ok=False):
+        """
+        Métricas de la curva en pantalla con las líneas actuales (cacheadas)
+
+        Args:
+            stale_ok (bool): True para usar la caché de esta curva aunque
+                             cambiaran las líneas o las muestras
+        """
+        positions = self.get_current_positions()
+        key = self.current_metrics_key(positions)
+
+        cached = self.current_metrics_cache
+        if self.current_metrics_valid(key) or (stale_ok and cached is not None and cached[0] is self.display_data):
+            return cached[2]
+
+        metrics = self.compute_curve_metrics(positions)
+        metrics.update(positions)
+        self.current_metrics_cache = (self.display_data, key, metrics)
+        return metrics
+
+    def invalidate_metrics(self, recording_number=None):
+        """
+        Descartar métricas cacheadas
+
+        Args:
+            recording_number (int): Grabación a invalidar, None para todas
+        """
+        if recording_number is None:
+            self.metrics_cache.clear()
+        else:
+            self.metrics_cache.pop(recording_number, None)
+        self.current_metrics_cache = None
+
+        # Quitar índices de curvas que ya no están en uso
+        in_use = {id(rec['data']) for rec in self.stored_recordings}
+        in_use.add(id(self.display_data))
+        self.volume_indexes = {key: value for key, value in self.volume_indexes.items() if key in in_use}
+
+    def metrics_available(self):
+        """True si hay métricas cacheadas (aunque sean de líneas anteriores) para armar el panel"""
+        cached = self.current_metrics_cache
+        if cached is None or cached[0] is not self.display_data:
+            return False
+
+        for rec in self.stored_recordings:
+            if self.line_positions.get(rec['recording_number']) is None:
+                continue
+            cached = self.metrics_cache.get(rec['recording_number'])
+            if cached is None or cached[0] is not rec['data']:
+                return False
+        return True
+
+    def refresh_metrics_async(self):
+        """
+        Calcular en un thread las métricas sin caché vigente (grabaciones y curva actual)
+
+        Returns:
+            bool: True si hay métricas en cálculo (el worker ya corría o se lanzó)
+        """
+        if self.metrics_worker is not None and self.metrics_worker.isRunning():
+            # Se vuelve a revisar al terminar el worker actual (on_metrics_ready)
+            return True
+
+        jobs = []
+        for rec in self.stored_recordings:
+            rec_num = rec['recording_number']
+            positions = self.line_positions.get(rec_num)
+            if positions is None:
+                # Sin líneas ni métricas guardadas: el worker las ubica (una
+                # vez por datos, aunque falle)
+                cached = self.metrics_cache.get(rec_num)
+                if cached is None or cached[0] is not rec['data']:
+                    jobs.append((rec_num, rec['data'], None))
+                continue
+            cached = self.metrics_cache.get(rec_num)
+            if cached is not None and cached[0] is rec['data'] and cached[1] == SpirometryMetrics.positions_key(positions):
+                continue
+            jobs.append((rec_num, rec['data'], dict(positions)))
+
+        positions = self.get_current_positions()
+        key = self.current_metrics_key(positions)
+        self.current_metrics_job = None
+        if not self.current_metrics_valid(key):
+            data = self.display_data
+            if isinstance(data, SampleBuffer):
+                # Vistas del largo actual: la captura sigue escribiendo más allá
+                data = {column: data[column] for column in data}
+            jobs.append((None, data, positions))
+            self.current_metrics_job = (self.display_data, key)
+
+        if not jobs:
+            return False
+
+        self.metrics_worker = MetricsWorker(jobs)
+        self.metrics_worker.metrics_ready.connect(self.on_metrics_ready)
+        self.metrics_worker.start()
+        return True
+
+    @Slot(object)
+    def on_metrics_ready(self, results):
+        """Guardar en caché las métricas calculadas en segundo plano"""
+        recordings = {rec['recording_number']: rec for rec in self.stored_recordings}
+
+        for result in results:
+            rec_num = result['recording_number']
+
+            if rec_num is None:
+                # Curva actual: se guarda con la clave con que se pidió; si las
+                # líneas o las muestras cambiaron queda vencida y se vuelve a pedir
+                job = self.current_metrics_job
+                if job is not None and job[0] is self.display_data:
+                    metrics = result['metrics']
+                    if metrics is not None:
+                        metrics = dict(metrics, **result['positions'])
+                    self.current_metrics_cache = (self.display_data, job[1], metrics)
+                continue
+
+            # Descartar resultados de grabaciones borradas o reemplazadas; si
+            # solo cambiaron las líneas, la entrada queda vencida por su clave
+            rec = recordings.get(rec_num)
+            if rec is None or rec['data'] is not result['data']:
+                continue
+            if rec_num not in self.line_positions and result['positions'] is not None:
+                self.line_positions[rec_num] = result['positions']
+
+            self.metrics_cache[rec_num] = (result['data'], result['key'], result['metrics'])
+            if result['index'] is not None:
+                self.volume_indexes[id(result['data'])] = (result['data'], len(result['data']['v']), result['index'])
+
+        self.update_results_display()
 
     def get_pef_for_recording(self, recording_number):
         """Obtener el PEF de una grabación específica"""
-        if recording_number not in self.line_positions:
-            return None
-        
-        # Guardar datos actuales
-        temp_display = self.display_data.copy()
-        
-        # Cargar datos de la grabación
         for rec in self.stored_recordings:
             if rec['recording_number'] == recording_number:
-                self.display_data = rec['data'].copy()
-                break
-        else:
-            self.display_data = temp_display
-            return None
-        
-        # Obtener PEF
-        pef_vol = self.line_positions[recording_number]['v_line_pef']
-        pef_flow, _ = self.get_flow_intersections_at_volume(pef_vol)
-        
-        # Restaurar datos originales
-        self.display_data = temp_display
-        
-        return pef_flow
+                metrics = self.get_recording_metrics(rec)
+                return metrics['pef'] if metrics is not None else None
+        return None
 
-    def calculate_quality(self, filter_status=None):
+    def calculate_quality(self, filter_status=None, stale_ok=False):
         """
         Calcular la calidad de las maniobras según criterios ATS/ERS
         
         Args:
             filter_status (str): 'PRE', 'POST' o None para todas
+            stale_ok (bool): Usar métricas cacheadas aunque estén recalculándose
             
         Returns:
             dict: grade, n_maneuvers, repeatability_ml, suggestions
@@ -522,129 +911,39 @@ class GraphHandler(QWidget):
                 'repeatability_ml': None,
                 'pef_values': [],
                 'suggestions': [],
+                'best_subset': None,
                 'filter_status': filter_status
             }
         
         # Obtener PEF de cada maniobra
         pef_values = []
         for rec in filtered_recordings:
-            pef = self.get_pef_for_recording(rec['recording_number'])
-            if pef is not None:
+            metrics = self.get_recording_metrics(rec, stale_ok)
+            if metrics is not None and metrics['pef'] is not None:
                 pef_values.append({
                     'recording_number': rec['recording_number'],
-                    'pef': pef
+                    'pef': metrics['pef']
                 })
-        
-        if len(pef_values) < 2:
-            return {
-                'grade': None,
-                'n_maneuvers': n_maneuvers,
-                'repeatability_ml': None,
-                'pef_values': pef_values,
-                'suggestions': [],
-                'filter_status': filter_status
-            }
-        
-        # Calcular repetibilidad (diferencia max - min en ml)
-        pef_only = [p['pef'] for p in pef_values]
-        repeatability_l = max(pef_only) - min(pef_only)
-        repeatability_ml = repeatability_l * 1000  # Convertir a ml
-        
-        # Determinar grado
-        grade = None
-        if n_maneuvers >= 3:
-            if repeatability_ml < 150:
-                grade = 'A'
-            elif repeatability_ml < 200:
-                grade = 'B'
-        
-        if n_maneuvers >= 2:
-            if grade is None:
-                if repeatability_ml < 200:
-                    grade = 'C'
-                else:
-                    grade = 'D'
-        
-        # Calcular sugerencias de eliminación
-        suggestions = self.calculate_removal_suggestions(pef_values, n_maneuvers, repeatability_ml)
-        
-        return {
-            'grade': grade,
-            'n_maneuvers': n_maneuvers,
-            'repeatability_ml': repeatability_ml,
-            'pef_values': pef_values,
-            'suggestions': suggestions,
-            'filter_status': filter_status
-        }
+
+        return SpirometryMetrics.quality(pef_values, n_maneuvers, filter_status)
 
     def calculate_removal_suggestions(self, pef_values, current_n, current_repeatability):
         """
         Calcular qué maniobras, si se eliminan, mejorarían el grado
         """
-        suggestions = []
-        
-        if len(pef_values) < 3:
-            return suggestions
-        
-        # Probar eliminar cada maniobra
-        for i, pef_data in enumerate(pef_values):
-            # Crear lista sin esta maniobra
-            remaining = [p for j, p in enumerate(pef_values) if j != i]
-            remaining_pefs = [p['pef'] for p in remaining]
-            
-            new_n = len(remaining)
-            new_repeatability = (max(remaining_pefs) - min(remaining_pefs)) * 1000
-            
-            # Determinar nuevo grado
-            new_grade = None
-            if new_n >= 3:
-                if new_repeatability < 150:
-                    new_grade = 'A'
-                elif new_repeatability < 200:
-                    new_grade = 'B'
-            
-            if new_n >= 2 and new_grade is None:
-                if new_repeatability < 200:
-                    new_grade = 'C'
-                else:
-                    new_grade = 'D'
-            
-            # Si mejora el grado, agregar sugerencia
-            grade_order = {'A': 4, 'B': 3, 'C': 2, 'D': 1, None: 0}
-            current_grade_value = grade_order.get(self.get_current_grade(current_n, current_repeatability), 0)
-            new_grade_value = grade_order.get(new_grade, 0)
-            
-            if new_grade_value > current_grade_value:
-                suggestions.append({
-                    'recording_number': pef_data['recording_number'],
-                    'new_grade': new_grade,
-                    'new_repeatability': new_repeatability
-                })
-        
-        return suggestions
+        return SpirometryMetrics.removal_suggestions(pef_values, current_n, current_repeatability)
 
     def get_current_grade(self, n_maneuvers, repeatability_ml):
         """Obtener grado basado en n y repetibilidad"""
-        if n_maneuvers >= 3:
-            if repeatability_ml < 150:
-                return 'A'
-            elif repeatability_ml < 200:
-                return 'B'
-        
-        if n_maneuvers >= 2:
-            if repeatability_ml < 200:
-                return 'C'
-            else:
-                return 'D'
-        
-        return None
+        return SpirometryMetrics.grade_for(n_maneuvers, repeatability_ml)
 
-    def calculate_averages(self, filter_status=None):
+    def calculate_averages(self, filter_status=None, stale_ok=False):
         """
         Calcular promedios de las grabaciones almacenadas
         
         Args:
             filter_status (str): 'PRE', 'POST' o None para todas
+            stale_ok (bool): Usar métricas cacheadas aunque estén recalculándose
             
         Returns:
             dict: Diccionario con promedios de métricas
@@ -659,96 +958,14 @@ class GraphHandler(QWidget):
         if not recordings_to_average:
             return None
         
-        metrics = {
-            'fev1': [],
-            'pef': [],
-            'fef25': [],
-            'fef50': [],
-            'fef75': [],
-            'fvc': [],
-            'fif25': [],
-            'fif50': [],
-            'fif75': [],
-            'fev1_fvc_ratio': []
-        }
-        
-        # Calcular métricas para cada grabación
+        # Métricas de cada grabación (cacheadas por datos y líneas)
+        metrics_list = []
         for rec in recordings_to_average:
-            rec_num = rec['recording_number']
-            
-            # Cargar datos temporalmente
-            temp_display = self.display_data.copy()
-            self.display_data = rec['data'].copy()
-            
-            # Restaurar posiciones de líneas para esta grabación
-            if rec_num in self.line_positions:
-                positions = self.line_positions[rec_num]
-                
-                # FEV1
-                x1 = positions['vLine1']
-                x2 = positions['vLine2']
-                y1 = self.get_y_value_at_x(x1)
-                y2 = self.get_y_value_at_x(x2)
-                if y1 is not None and y2 is not None:
-                    metrics['fev1'].append(abs(y2 - y1))
-                
-                # PEF y FVC
-                pef_vol = positions['v_line_pef']
-                fvc_vol = positions['v_line_fvc']
-                
-                pef_flow, _ = self.get_flow_intersections_at_volume(pef_vol)
-                if pef_flow is not None:
-                    metrics['pef'].append(pef_flow)
-                
-                metrics['fvc'].append(fvc_vol)
-                
-                # Calcular posiciones FEF/FIF
-                diff = (fvc_vol - pef_vol) / 4
-                fef25_vol = pef_vol + diff
-                fef50_vol = pef_vol + diff * 2
-                fef75_vol = pef_vol + diff * 3
-                
-                # FEF25/FIF25
-                fef25_flow, fif25_flow = self.get_flow_intersections_at_volume(fef25_vol)
-                if fef25_flow is not None:
-                    metrics['fef25'].append(fef25_flow)
-                if fif25_flow is not None:
-                    metrics['fif25'].append(abs(fif25_flow))
-                
-                # FEF50/FIF50
-                fef50_flow, fif50_flow = self.get_flow_intersections_at_volume(fef50_vol)
-                if fef50_flow is not None:
-                    metrics['fef50'].append(fef50_flow)
-                if fif50_flow is not None:
-                    metrics['fif50'].append(abs(fif50_flow))
-                
-                # FEF75/FIF75
-                fef75_flow, fif75_flow = self.get_flow_intersections_at_volume(fef75_vol)
-                if fef75_flow is not None:
-                    metrics['fef75'].append(fef75_flow)
-                if fif75_flow is not None:
-                    metrics['fif75'].append(abs(fif75_flow))
-                
-                # FEV1/FVC ratio
-                if metrics['fev1'] and metrics['fvc'][-1] > 0:
-                    ratio = (metrics['fev1'][-1] / metrics['fvc'][-1]) * 100
-                    metrics['fev1_fvc_ratio'].append(ratio)
-            
-            # Restaurar datos originales
-            self.display_data = temp_display
-        
-        # Calcular promedios
-        averages = {}
-        for key, values in metrics.items():
-            if values:
-                averages[key] = np.mean(values)
-            else:
-                averages[key] = None
-        
-        averages['n_recordings'] = len(recordings_to_average)
-        averages['filter_status'] = filter_status
-        
-        return averages
+            rec_metrics = self.get_recording_metrics(rec, stale_ok)
+            if rec_metrics is not None:
+                metrics_list.append(rec_metrics)
+
+        return SpirometryMetrics.averages(metrics_list, len(recordings_to_average), filter_status)
 
     def set_bronchodilator_status(self, recording_number, status):
         """
@@ -764,6 +981,7 @@ class GraphHandler(QWidget):
         for rec in self.stored_recordings:
             if rec['recording_number'] == recording_number:
                 rec['bronchodilator_status'] = status
+                self.log_to_journal('record_status', recording_number, status)
                 return True
         return False
 
@@ -782,214 +1000,170 @@ class GraphHandler(QWidget):
                 return rec.get('bronchodilator_status', 'PRE')
         return None
 
+    def build_average_rows(self, title, averages, n_recordings):
+        """Filas de la sección de promedios PRE o POST"""
+        rows = [f"=== PROMEDIOS {title} ==="]
+        if not averages:
+            return rows
+
+        if averages['fev1'] is not None:
+            rows.append(f"FEV1: {averages['fev1']:.3f} L")
+        if averages['pef'] is not None:
+            rows.append(f"PEF: {averages['pef']:.3f} L/s")
+
+        for percent in (25, 50, 75):
+            if averages[f'fef{percent}'] is not None:
+                rows.append(f"FEF{percent}: {averages[f'fef{percent}']:.3f} L/s")
+            if averages[f'fif{percent}'] is not None:
+                rows.append(f"FIF{percent}: {averages[f'fif{percent}']:.3f} L/s")
+
+        if averages['fvc'] is not None:
+            rows.append(f"FVC: {averages['fvc']:.3f} L")
+
+        rows.append("")
+
+        if averages['fev1_fvc_ratio'] is not None:
+            rows.append(f"FEV1/FVC: {averages['fev1_fvc_ratio']:.1f}%")
+
+        rows.append(f"(n={n_recordings})")
+        rows.append("")
+        return rows
+
+    def build_quality_rows(self, title, quality):
+        """Filas de la sección de calidad PRE o POST"""
+        rows = [f"=== CALIDAD {title} ==="]
+        if not quality['grade']:
+            return rows
+
+        rows.append(f"Grado: {quality['grade']}")
+        rows.append(f"Maniobras: {quality['n_maneuvers']}")
+        rows.append(f"Repetibilidad: {quality['repeatability_ml']:.0f} ml")
+        rows.append("")
+
+        # Mostrar sugerencias si existen
+        if quality['suggestions']:
+            rows.append("--- Sugerencia ---")
+            for suggestion in quality['suggestions']:
+                rows.append(f"Eliminar Prueba {suggestion['recording_number']}")
+                rows.append(f"→ Grado: {suggestion['new_grade']}")
+                rows.append(f"→ Rep: {suggestion['new_repeatability']:.0f} ml")
+                rows.append("")
+        elif quality.get('best_subset') and len(quality['best_subset']['remove']) > 1:
+            # Ninguna eliminación individual mejora: sugerir el mejor subconjunto
+            subset = quality['best_subset']
+            rows.append("--- Sugerencia ---")
+            removed = ", ".join(str(number) for number in subset['remove'])
+            rows.append(f"Eliminar Pruebas {removed}")
+            rows.append(f"→ Grado: {subset['grade']}")
+            rows.append(f"→ Rep: {subset['repeatability_ml']:.0f} ml")
+            rows.append("")
+        return rows
+
+    def build_results_rows(self, stale_ok=False):
+        """
+        Construir las filas del panel de resultados
+
+        Args:
+            stale_ok (bool): Mostrar las últimas métricas cacheadas mientras el
+                             worker calcula las nuevas
+
+        Returns:
+            tuple: (lista de textos, dict de calidad por estado)
+        """
+        rows = []
+
+        # Resultados de curva actual
+        if self.active_recording_number is not None:
+            status = self.get_bronchodilator_status(self.active_recording_number)
+            rows.append(f"=== Prueba {self.active_recording_number} [{status}] ===")
+        else:
+            rows.append("=== Curva Actual ===")
+
+        current = self.get_current_metrics(stale_ok)
+        if current is None:
+            rows.append("Error calculando métricas")
+            current = dict.fromkeys(SpirometryMetrics.METRIC_KEYS)
+            current['fvc'] = self.v_line_fvc.value()
+
+        # Gráfico izquierdo (Volumen vs Tiempo)
+        rows.append("--- FEV1 ---")
+        if current['fev1'] is not None:
+            rows.append(f"Línea 1: {current['vLine1']:.2f} s")
+            rows.append(f"Línea 2: {current['vLine2']:.2f} s")
+            rows.append(f"FEV1: {current['fev1']:.3f} L")
+            rows.append("")
+
+        # Gráfico derecho (Flujo vs Volumen)
+        rows.append("--- Espirometría ---")
+        if current['pef'] is not None:
+            rows.append(f"PEF: {current['pef']:.3f} L/s")
+
+        for percent in (25, 50, 75):
+            if current[f'fef{percent}'] is not None:
+                rows.append(f"FEF{percent}: {current[f'fef{percent}']:.3f} L/s")
+            if current[f'fif{percent}'] is not None:
+                rows.append(f"FIF{percent}: {current[f'fif{percent}']:.3f} L/s")
+
+        rows.append(f"FVC: {current['fvc']:.3f} L")
+        rows.append("")
+
+        if current['fev1_fvc_ratio'] is not None:
+            rows.append(f"FEV1/FVC: {current['fev1_fvc_ratio']:.1f}%")
+            rows.append("")
+
+        # Promedios PRE/POST
+        counts = {}
+        for status in ('PRE', 'POST'):
+            counts[status] = sum(1 for r in self.stored_recordings
+                                 if r.get('bronchodilator_status') == status)
+            if counts[status] > 1:
+                rows.extend(self.build_average_rows(
+                    status, self.calculate_averages(status, stale_ok), counts[status]
+                ))
+
+        # Calidad PRE/POST
+        quality_info = {}
+        for status in ('PRE', 'POST'):
+            if counts[status] >= 2:
+                quality_info[status] = self.calculate_quality(status, stale_ok)
+                rows.extend(self.build_quality_rows(status, quality_info[status]))
+
+        return rows, quality_info
+
+    def set_results_rows(self, rows):
+        """Actualizar solo las filas del panel cuyo texto cambió"""
+        count = self.results_list.count()
+
+        for i, text in enumerate(rows):
+            if i < count:
+                item = self.results_list.item(i)
+                if item.text() != text:
+                    item.setText(text)
+            else:
+                self.results_list.addItem(text)
+
+        # Quitar las filas sobrantes desde el final
+        for i in range(count - 1, len(rows) - 1, -1):
+            self.results_list.takeItem(i)
+
     def update_results_display(self):
         """Actualizar la lista de resultados"""
-        self.results_list.clear()
-        
         try:
-            # Resultados de curva actual
-            if self.active_recording_number is not None:
-                status = self.get_bronchodilator_status(self.active_recording_number)
-                self.results_list.addItem(f"=== Prueba {self.active_recording_number} [{status}] ===")
-            else:
-                self.results_list.addItem("=== Curva Actual ===")
-            
-            # Gráfico izquierdo (Volumen vs Tiempo)
-            self.results_list.addItem("--- FEV1 ---")
-            
-            x1 = self.vLine1.value()
-            x2 = self.vLine2.value()
-            y1 = self.get_y_value_at_x(x1)
-            y2 = self.get_y_value_at_x(x2)
-            
-            if y1 is not None and y2 is not None:
-                fev1 = abs(y2 - y1)
-                self.results_list.addItem(f"Línea 1: {x1:.2f} s")
-                self.results_list.addItem(f"Línea 2: {x2:.2f} s")
-                self.results_list.addItem(f"FEV1: {fev1:.3f} L")
-                self.results_list.addItem("")
-            
-            # Gráfico derecho (Flujo vs Volumen)
-            self.results_list.addItem("--- Espirometría ---")
-            
-            # PEF
-            pef_vol = self.v_line_pef.value()
-            pef_flow, _ = self.get_flow_intersections_at_volume(pef_vol)
-            if pef_flow is not None:
-                self.results_list.addItem(f"PEF: {pef_flow:.3f} L/s")
-            
-            # FEF25/FIF25
-            fef25_vol = self.v_line_fef25.value()
-            fef25_flow, fif25_flow = self.get_flow_intersections_at_volume(fef25_vol)
-            if fef25_flow is not None:
-                self.results_list.addItem(f"FEF25: {fef25_flow:.3f} L/s")
-            if fif25_flow is not None:
-                self.results_list.addItem(f"FIF25: {abs(fif25_flow):.3f} L/s")
-            
-            # FEF50/FIF50
-            fef50_vol = self.v_line_fef50.value()
-            fef50_flow, fif50_flow = self.get_flow_intersections_at_volume(fef50_vol)
-            if fef50_flow is not None:
-                self.results_list.addItem(f"FEF50: {fef50_flow:.3f} L/s")
-            if fif50_flow is not None:
-                self.results_list.addItem(f"FIF50: {abs(fif50_flow):.3f} L/s")
-            
-            # FEF75/FIF75
-            fef75_vol = self.v_line_fef75.value()
-            fef75_flow, fif75_flow = self.get_flow_intersections_at_volume(fef75_vol)
-            if fef75_flow is not None:
-                self.results_list.addItem(f"FEF75: {fef75_flow:.3f} L/s")
-            if fif75_flow is not None:
-                self.results_list.addItem(f"FIF75: {abs(fif75_flow):.3f} L/s")
-            
-            # FVC
-            fvc_vol = self.v_line_fvc.value()
-            self.results_list.addItem(f"FVC: {fvc_vol:.3f} L")
-            self.results_list.addItem("")
-            
-            # Calcular FEV1/FVC si hay datos
-            if y1 is not None and y2 is not None and fvc_vol > 0:
-                fev1 = abs(y2 - y1)
-                ratio = (fev1 / fvc_vol) * 100
-                self.results_list.addItem(f"FEV1/FVC: {ratio:.1f}%")
-                self.results_list.addItem("")
-            
-            # Promedios PRE
-            pre_recordings = [r for r in self.stored_recordings 
-                            if r.get('bronchodilator_status') == 'PRE']
-            if len(pre_recordings) > 1:
-                self.results_list.addItem("=== PROMEDIOS PRE ===")
-                averages_pre = self.calculate_averages('PRE')
-                
-                if averages_pre:
-                    if averages_pre['fev1'] is not None:
-                        self.results_list.addItem(f"FEV1: {averages_pre['fev1']:.3f} L")
-                    if averages_pre['pef'] is not None:
-                        self.results_list.addItem(f"PEF: {averages_pre['pef']:.3f} L/s")
-                    
-                    if averages_pre['fef25'] is not None:
-                        self.results_list.addItem(f"FEF25: {averages_pre['fef25']:.3f} L/s")
-                    if averages_pre['fif25'] is not None:
-                        self.results_list.addItem(f"FIF25: {averages_pre['fif25']:.3f} L/s")
-                    
-                    if averages_pre['fef50'] is not None:
-                        self.results_list.addItem(f"FEF50: {averages_pre['fef50']:.3f} L/s")
-                    if averages_pre['fif50'] is not None:
-                        self.results_list.addItem(f"FIF50: {averages_pre['fif50']:.3f} L/s")
-                    
-                    if averages_pre['fef75'] is not None:
-                        self.results_list.addItem(f"FEF75: {averages_pre['fef75']:.3f} L/s")
-                    if averages_pre['fif75'] is not None:
-                        self.results_list.addItem(f"FIF75: {averages_pre['fif75']:.3f} L/s")
-                    
-                    if averages_pre['fvc'] is not None:
-                        self.results_list.addItem(f"FVC: {averages_pre['fvc']:.3f} L")
-                    
-                    self.results_list.addItem("")
-                    
-                    if averages_pre['fev1_fvc_ratio'] is not None:
-                        self.results_list.addItem(f"FEV1/FVC: {averages_pre['fev1_fvc_ratio']:.1f}%")
-                    
-                    self.results_list.addItem(f"(n={len(pre_recordings)})")
-                    self.results_list.addItem("")
-            
-            # Promedios POST
-            post_recordings = [r for r in self.stored_recordings 
-                             if r.get('bronchodilator_status') == 'POST']
-            if len(post_recordings) > 1:
-                self.results_list.addItem("=== PROMEDIOS POST ===")
-                averages_post = self.calculate_averages('POST')
-                
-                if averages_post:
-                    if averages_post['fev1'] is not None:
-                        self.results_list.addItem(f"FEV1: {averages_post['fev1']:.3f} L")
-                    if averages_post['pef'] is not None:
-                        self.results_list.addItem(f"PEF: {averages_post['pef']:.3f} L/s")
-                    
-                    if averages_post['fef25'] is not None:
-                        self.results_list.addItem(f"FEF25: {averages_post['fef25']:.3f} L/s")
-                    if averages_post['fif25'] is not None:
-                        self.results_list.addItem(f"FIF25: {averages_post['fif25']:.3f} L/s")
-                    
-                    if averages_post['fef50'] is not None:
-                        self.results_list.addItem(f"FEF50: {averages_post['fef50']:.3f} L/s")
-                    if averages_post['fif50'] is not None:
-                        self.results_list.addItem(f"FIF50: {averages_post['fif50']:.3f} L/s")
-                    
-                    if averages_post['fef75'] is not None:
-                        self.results_list.addItem(f"FEF75: {averages_post['fef75']:.3f} L/s")
-                    if averages_post['fif75'] is not None:
-                        self.results_list.addItem(f"FIF75: {averages_post['fif75']:.3f} L/s")
-                    
-                    if averages_post['fvc'] is not None:
-                        self.results_list.addItem(f"FVC: {averages_post['fvc']:.3f} L")
-                    
-                    self.results_list.addItem("")
-                    
-                    if averages_post['fev1_fvc_ratio'] is not None:
-                        self.results_list.addItem(f"FEV1/FVC: {averages_post['fev1_fvc_ratio']:.1f}%")
-                    
-                    self.results_list.addItem(f"(n={len(post_recordings)})")
-                    self.results_list.addItem("")
-            
-            # Sección de calidad PRE
-            if len(pre_recordings) >= 2:
-                quality_pre = self.calculate_quality('PRE')
-                
-                self.results_list.addItem("=== CALIDAD PRE ===")
-                
-                if quality_pre['grade']:
-                    self.results_list.addItem(f"Grado: {quality_pre['grade']}")
-                    self.results_list.addItem(f"Maniobras: {quality_pre['n_maneuvers']}")
-                    self.results_list.addItem(f"Repetibilidad: {quality_pre['repeatability_ml']:.0f} ml")
-                    self.results_list.addItem("")
-                    
-                    # Mostrar sugerencias si existen
-                    if quality_pre['suggestions']:
-                        self.results_list.addItem("--- Sugerencia ---")
-                        for suggestion in quality_pre['suggestions']:
-                            rec_num = suggestion['recording_number']
-                            new_grade = suggestion['new_grade']
-                            new_rep = suggestion['new_repeatability']
-                            self.results_list.addItem(f"Eliminar Prueba {rec_num}")
-                            self.results_list.addItem(f"→ Grado: {new_grade}")
-                            self.results_list.addItem(f"→ Rep: {new_rep:.0f} ml")
-                            self.results_list.addItem("")
-            
-            # Sección de calidad POST
-            if len(post_recordings) >= 2:
-                quality_post = self.calculate_quality('POST')
-                
-                self.results_list.addItem("=== CALIDAD POST ===")
-                
-                if quality_post['grade']:
-                    self.results_list.addItem(f"Grado: {quality_post['grade']}")
-                    self.results_list.addItem(f"Maniobras: {quality_post['n_maneuvers']}")
-                    self.results_list.addItem(f"Repetibilidad: {quality_post['repeatability_ml']:.0f} ml")
-                    self.results_list.addItem("")
-                    
-                    # Mostrar sugerencias si existen
-                    if quality_post['suggestions']:
-                        self.results_list.addItem("--- Sugerencia ---")
-                        for suggestion in quality_post['suggestions']:
-                            rec_num = suggestion['recording_number']
-                            new_grade = suggestion['new_grade']
-                            new_rep = suggestion['new_repeatability']
-                            self.results_list.addItem(f"Eliminar Prueba {rec_num}")
-                            self.results_list.addItem(f"→ Grado: {new_grade}")
-                            self.results_list.addItem(f"→ Rep: {new_rep:.0f} ml")
-                            self.results_list.addItem("")
-            
-            # Emitir señal con información de calidad (ambas si existen)
-            quality_info = {}
-            if len(pre_recordings) >= 2:
-                quality_info['PRE'] = self.calculate_quality('PRE')
-            if len(post_recordings) >= 2:
-                quality_info['POST'] = self.calculate_quality('POST')
-            
-            if quality_info:
+            # Las métricas que falten se calculan en el worker y el panel se
+            # vuelve a armar cuando llegan (on_metrics_ready). Mientras tanto
+            # se muestran las últimas cacheadas, si las hay
+            busy = self.refresh_metrics_async()
+            if busy and not self.metrics_available():
+                return
+
+            rows, quality_info = self.build_results_rows(stale_ok=busy)
+            self.set_results_rows(rows)
+
+            # Emitir señal con información de calidad solo si cambió
+            if quality_info and quality_info != self.last_quality_info:
                 self.quality_changed.emit(quality_info)
-                
+            self.last_quality_info = quality_info
+
         except Exception as e:
             print(f"Error actualizando resultados: {e}")
 
@@ -1001,7 +1175,8 @@ class GraphHandler(QWidget):
         if self.recording_started:
             return False
         
-        self.display_data = {'t': [], 'p': [], 'f': [], 'v': []}
+        self.capture_buffer = self.new_sample_buffer()
+        self.display_data = self.capture_buffer
         self.recording_started = False
         self.start_time = None
         self.ready_for_new_recording = True
@@ -1011,24 +1186,40 @@ class GraphHandler(QWidget):
         
         return True
 
+    def next_recording_number(self):
+        """
+        Número para una grabación nueva
+
+        Siempre mayor que los de las grabaciones existentes: después de un
+        borrado no se reutiliza un número que sigue en uso.
+        """
+        return max((rec['recording_number'] for rec in self.stored_recordings), default=0) + 1
+
     def store_current_recording(self):
         """Almacenar la grabación actual"""
-        if self.display_data['t']:
+        if len(self.capture_buffer) > 0:
+            # El buffer entrega sus arreglos y la grabación sigue en pantalla
+            data = self.capture_buffer.snapshot()
+            self.display_data = data
+
             recording_data = {
-                'recording_number': len(self.stored_recordings) + 1,
+                'recording_number': self.next_recording_number(),
                 'bronchodilator_status': 'PRE',  # Por defecto es PRE
-                'data': {
-                    't': self.display_data['t'].copy(),
-                    'p': self.display_data['p'].copy(),
-                    'f': self.display_data['f'].copy(),
-                    'v': self.display_data['v'].copy()
-                }
+                'data': data
             }
             self.stored_recordings.append(recording_data)
+            self.get_volume_index(data)
             self.add_permanent_curve(recording_data)
             
-            # Guardar posiciones de líneas para esta grabación
-            self.save_line_positions(recording_data['recording_number'])
+            # Ubicar las líneas en los puntos de referencia de la maniobra
+            self.line_positions[recording_data['recording_number']] = auto_line_positions(data)
+            if self.active_recording_number is None:
+                self.apply_line_positions(self.line_positions[recording_data['recording_number']])
+
+            # La maniobra queda en disco antes de seguir
+            self.log_to_journal('record_recording', recording_data)
+            self.log_to_journal('record_lines', recording_data['recording_number'],
+                                self.line_positions[recording_data['recording_number']])
             
             self.flow_time_plot.autoRange()
             self.flow_pressure_plot.autoRange()
@@ -1039,42 +1230,97 @@ class GraphHandler(QWidget):
             )
 
     def add_permanent_curve(self, recording_data):
-        """Agregar curva permanente de la grabación al gráfico"""
+        """
+        Agregar curva permanente de la grabación al gráfico
+
+        Returns:
+            bool: False si ya hay una curva con ese número de grabación
+        """
+        if recording_data['recording_number'] in self.stored_curves:
+            print(f"Error: ya existe una curva para la grabación {recording_data['recording_number']}")
+            return False
+
         color_idx = (recording_data['recording_number'] - 1) % len(self.recording_colors)
         color = self.recording_colors[color_idx]
-        
-        curve_time = self.flow_time_plot.plot(
-            x=recording_data['data']['t'],
-            y=recording_data['data']['v'],
-            pen=pg.mkPen(color, width=2, style=pg.QtCore.Qt.DashLine),
-            name=f'Grabación {recording_data["recording_number"]}'
-        )
-        
-        curve_pressure = None
-        if recording_data['data']['f']:
-            curve_pressure = self.flow_pressure_plot.plot(
-                x=recording_data['data']['v'],
-                y=recording_data['data']['f'],
-                pen=pg.mkPen(color, width=2, style=pg.QtCore.Qt.DashLine),
-                name=f'Grabación {recording_data["recording_number"]}'
-            )
-        
-        self.stored_curves.append({
-            'recording_number': recording_data['recording_number'],
+        pen = self.get_curve_pen(color)
+        number = recording_data['recording_number']
+        data = recording_data['data']
+
+        curve_time = self.flow_time_plot.plot(pen=pen, name=f'Grabación {number}')
+        curve_pressure = self.flow_pressure_plot.plot(pen=pen, name=f'Grabación {number}')
+
+        self.stored_curves[number] = {
+            'recording_number': number,
             'curve_time': curve_time,
-            'curve_pressure': curve_pressure
-        })
+            'curve_pressure': curve_pressure,
+            'lod_time': None,
+            'lod_pressure': None,
+            'data': data
+        }
+        self.unstyled_curves.add(number)
+
+        # Grabaciones de un estudio abierto sin leer todavía: la curva queda
+        # oculta y sus muestras se leen recién al seleccionarla o mostrarla
+        # (set_active_recording, set_curve_visible)
+        if isinstance(data, LazyColumns) and not data.loaded:
+            curve_time.setVisible(False)
+            curve_pressure.setVisible(False)
+            return True
+
+        self.fill_permanent_curve(number)
+        return True
+
+    def fill_permanent_curve(self, recording_number):
+        """Calcular las pirámides de decimación de una curva y dibujarla"""
+        curve_data = self.stored_curves.get(recording_number)
+        if curve_data is None or curve_data['lod_time'] is not None:
+            return
+
+        # Pirámides de decimación: se calculan una vez por grabación y se
+        # dibuja la curva completa a la resolución de la vista
+        data = curve_data['data']
+        curve_data['lod_time'] = CurvePyramid(data['t'], data['v'])
+        if len(data['f']) > 0:
+            curve_data['lod_pressure'] = CurvePyramid(data['v'], data['f'])
+        else:
+            self.flow_pressure_plot.removeItem(curve_data['curve_pressure'])
+            curve_data['curve_pressure'] = None
+
+        self.update_curve_lod(recording_number)
+
+    def load_pending_curve(self, recording_number):
+        """Leer las muestras de una curva diferida, dibujarla y mostrarla"""
+        if recording_number in self.pending_curves:
+            self.pending_curves.remove(recording_number)
+        try:
+            self.fill_permanent_curve(recording_number)
+        except Exception as e:
+            print(f"Error cargando grabación {recording_number}: {e}")
+            return
+        self.set_curve_visible(recording_number, True)
+
+    def remove_permanent_curve(self, recording_number):
+        """Quitar de los gráficos solo las curvas de una grabación"""
+        curve_data = self.stored_curves.pop(recording_number, None)
+        self.unstyled_curves.discard(recording_number)
+        if curve_data is None:
+            return
+
+        self.flow_time_plot.removeItem(curve_data['curve_time'])
+        if curve_data['curve_pressure']:
+            self.flow_pressure_plot.removeItem(curve_data['curve_pressure'])
 
     def delete_recording(self, recording_number):
         """Eliminar grabación específica por número"""
         # Eliminar posiciones de líneas guardadas
         if recording_number in self.line_positions:
             del self.line_positions[recording_number]
+        self.invalidate_metrics(recording_number)
         
         # Si se elimina la curva activa, desactivar
         if self.active_recording_number == recording_number:
             self.active_recording_number = None
-            self.display_data = {'t': [], 'p': [], 'f': [], 'v': []}
+            self.display_data = self.capture_buffer
         
         # Eliminar de stored_recordings
         for i, recording in enumerate(self.stored_recordings):
@@ -1084,23 +1330,70 @@ class GraphHandler(QWidget):
         else:
             return False
 
-        # Limpiar gráficos
-        self.flow_time_plot.clear()
-        self.flow_pressure_plot.clear()
-        self.stored_curves = []
+        self.log_to_journal('record_delete', recording_number)
 
-        # Re-agregar curvas restantes
-        for recording in self.stored_recordings:
-            self.add_permanent_curve(recording)
-        
-        # Restaurar estilos
-        self.setup_curve_styles()
-        self.setup_vertical_lines()
+        # Quitar solo sus curvas; las demás y las líneas quedan como están
+        self.remove_permanent_curve(recording_number)
         self.update_curve_styles()
         self.update_plots()
 
         return True
 
+    def set_journal(self, journal):
+        """
+        Asignar el diario de sesión donde se registran los cambios
+
+        Args:
+            journal (SessionJournal): Diario abierto (None para no registrar)
+        """
+        self.journal = journal
+
+    def log_to_journal(self, method, *args):
+        """
+        Registrar un cambio en el diario de sesión
+
+        Un error de disco no debe interrumpir la adquisición: se informa y
+        se sigue.
+
+        Args:
+            method (str): Método de SessionJournal (ej. 'record_recording')
+            *args: Argumentos del método
+
+        Returns:
+            bool: True si el cambio quedó registrado
+        """
+        if self.journal is None or self.journal.closed:
+            return False
+
+        try:
+            getattr(self.journal, method)(*args)
+            return True
+        except Exception as e:
+            print(f"Error escribiendo el diario de sesión: {e}")
+            return False
+
+    def journal_loaded_study(self, source_path=None):
+        """
+        Registrar en el diario un estudio recién cargado
+
+        Un estudio abierto desde un archivo durable (carpeta offline) se
+        referencia por su ruta; los demás (sesión recuperada, estudio
+        descargado a un archivo temporal) se copian al diario.
+
+        Args:
+            source_path (str): Archivo durable del estudio (None para copiarlo)
+
+        Returns:
+            bool: True si todo quedó registrado en el diario
+        """
+        if source_path:
+            return self.log_to_journal('record_study', source_path)
+
+        logged = all([self.log_to_journal('record_recording', rec) for rec in self.stored_recordings])
+        for recording_number, positions in self.line_positions.items():
+            logged = self.log_to_journal('record_lines', recording_number, positions) and logged
+        return logged
+
     def get_recording_list(self):
         """Obtener lista de números de grabaciones almacenadas"""
         return [rec['recording_number'] for rec in self.stored_recordings]
@@ -1109,60 +1402,327 @@ class GraphHandler(QWidget):
         """Obtener todas las grabaciones almacenadas"""
         return self.stored_recordings
 
+    def cancel_capture(self):
+        """Descartar una maniobra armada o a medio grabar (ej. al desconectar)"""
+        if not self.is_capturing():
+            return
+
+        self.capture_buffer = self.new_sample_buffer()
+        self.display_data = self.capture_buffer
+        self.recording_started = False
+        self.start_time = None
+        self.ready_for_new_recording = False
+        self.schedule_update()
+
     def reset_data(self):
         """Reset manual - usado después de calibración"""
-        self.display_data = {'t': [], 'p': [], 'f': [], 'v': []}
+        self.capture_buffer = self.new_sample_buffer()
+        self.display_data = self.capture_buffer
         self.recording_started = False
         self.start_time = None
         self.ready_for_new_recording = False
         self.active_recording_number = None
 
+    def set_render_fps(self, fps):
+        """
+        Configurar la frecuencia máxima de refresco de los gráficos
+
+        Args:
+            fps (float): Cuadros por segundo
+        """
+        if fps > 0:
+            self.render_fps = fps
+            self.render_timer.setInterval(max(1, int(1000 / fps)))
+
+    def schedule_update(self):
+        """Marcar los gráficos como pendientes; se redibujan en el próximo tick"""
+        self.plots_dirty = True
+        if not self.render_timer.isActive():
+            self.render_timer.start()
+
+    @Slot()
+    def render_tick(self):
+        """Redibujar si hubo datos nuevos o cambios de vista desde el último tick"""
+        if self.stream_channel is not None:
+            # El canal de la sesión continua se lee a la frecuencia de dibujo
+            if self.graph_record:
+                self.poll_stream_channel()
+        elif not self.plots_dirty and not self.lod_dirty and not self.pending_curves:
+            self.render_timer.stop()
+            return
+
+        # Leer y dibujar algunas curvas pendientes de un estudio abierto
+        for _ in range(min(self.curves_per_tick, len(self.pending_curves))):
+            self.load_pending_curve(self.pending_curves.pop(0))
+
+        if self.lod_dirty:
+            self.lod_dirty = False
+            for recording_num in self.stored_curves:
+                self.update_curve_lod(recording_num)
+
+        if self.plots_dirty:
+            self.plots_dirty = False
+            self.update_plots()
+
+    def start_continuous(self, spill_path, window_seconds=10.0, channel=None):
+        """
+        Iniciar la adquisición continua (sin disparo ni duración máxima)
+
+        Se conservan en memoria los últimos window_seconds, el gráfico se
+        desplaza con las muestras y lo que sale de la ventana se escribe a
+        spill_path por bloques.
+
+        Args:
+            spill_path (str): Archivo donde se vuelca la sesión
+            window_seconds (float): Segundos visibles y en memoria
+            channel (ChannelBuffer): Canal a adquirir (ECG, EMG...); None
+                                     para la respiración (volumen, presión y flujo)
+        """
+        if self.continuous_mode:
+            self.stop_continuous()
+
+        if channel is None:
+            keys, info = SAMPLE_KEYS, None
+        else:
+            keys, info = ('t', channel.name), {'channel': channel.name, 'unit': channel.unit}
+            # Descartar lo acumulado en el canal antes de empezar la sesión
+            channel.take()
+
+        self.stream_window_seconds = window_seconds
+        self.stream_window = RollingWindow(int(window_seconds * self.sample_rate * 1.25) + 1, keys)
+        self.stream_spiller = ChunkSpiller(spill_path, keys=keys, info=info)
+        self.stream_channel = channel
+        self.stream_start = None
+        self.continuous_mode = True
+
+        # Sin señales del canal: el timer de dibujo lo lee en cada tick
+        if channel is not None and not self.render_timer.isActive():
+            self.render_timer.start()
+
+        # El eje de tiempo deja de estar limitado a la duración de una maniobra
+        self.flow_time_plot.getViewBox().setLimits(xMin=None, xMax=None)
+        self.flow_time_plot.setXRange(0, window_seconds, padding=0)
+
+    def stop_continuous(self):
+        """
+        Terminar la adquisición continua y completar el archivo de la sesión
+
+        Returns:
+            str: Ruta del archivo con todas las muestras de la sesión (o None)
+        """
+        if not self.continuous_mode:
+            return None
+
+        self.continuous_mode = False
+        path = self.stream_spiller.path
+        try:
+            self.stream_spiller.write(self.stream_window.take_all())
+            self.stream_spiller.close()
+        except Exception as e:
+            print(f"Error cerrando la sesión continua: {e}")
+
+        self.stream_window = None
+        self.stream_spiller = None
+        self.stream_channel = None
+        self.stream_start = None
+
+        # Volver a los límites del modo por maniobras
+        self.flow_time_plot.getViewBox().setLimits(xMin=0, xMax=17)
+        self.flow_time_plot.setXRange(0, 17, padding=0)
+        self.flow_time_curve.setData([], [])
+        self.flow_pressure_curve.setData([], [])
+        return path
+
+    def process_stream_block(self, t, volume=None, pressure=None, flow=None, **channel_values):
+        """
+        Agregar un bloque a la ventana continua y volcar lo que sale de ella
+
+        Args:
+            t (numpy.ndarray): Tiempos en segundos de la base de tiempo
+            volume, pressure, flow (numpy.ndarray): Columnas del bloque (o None)
+            **channel_values: Columna del canal adquirido, por su nombre
+        """
+        if len(t) == 0:
+            return
+
+        if self.stream_start is None:
+            self.stream_start = float(t[0])
+
+        evicted = self.stream_window.extend(
+            t=np.asarray(t, dtype=np.float64) - self.stream_start,
+            **({'v': volume, 'p': pressure, 'f': flow} if self.stream_channel is None else channel_values)
+        )
+        self.stream_spiller.write(evicted)
+        self.schedule_update()
+
+    def poll_stream_channel(self):
+        """Pasar a la ventana continua las muestras nuevas del canal adquirido"""
+        t, values = self.stream_channel.take()
+        if len(t):
+            self.process_stream_block(t, **{self.stream_channel.name: values})
+
     @Slot(dict)
     def update_data(self, new_data):
         try:
             if not self.graph_record:
                 return
 
+            if self.continuous_mode:
+                if self.stream_channel is not None:
+                    return
+                self.process_stream_block(
+                    [new_data.get('t', 0)],
+                    [new_data.get('v', 0)],
+                    [new_data.get('p', np.nan)],
+                    [new_data.get('f', np.nan)]
+                )
+                return
+
             if self.recording_count >= self.max_recordings:
                 return
 
-            volume = new_data.get('v', 0)
-            t_raw = new_data.get('t', 0)
-            self.last_timestamp = t_raw
+            if self.process_sample(
+                new_data.get('t', 0),
+                new_data.get('v', 0),
+                new_data.get('p'),
+                new_data.get('f')
+            ):
+                self.schedule_update()
 
-            if not self.recording_started:
-                if volume > 0.01 and self.ready_for_new_recording:
-                    self.recording_started = True
-                    self.start_time = t_raw
-                return
+        except Exception as e:
+            print(f"Error en update_data: {e}")
 
-            t_rel = (t_raw - self.start_time) / 1000.0
+    @Slot(object)
+    def update_data_block(self, block):
+        """
+        Agregar un bloque de muestras y programar un redibujado
 
-            if t_rel < 0:
+        Args:
+            block (dict): Arreglos NumPy con keys 't', 'p', 'f', 'v'
+        """
+        try:
+            if not self.graph_record:
                 return
 
-            if t_rel >= self.recording_duration:
-                self.store_current_recording()
-                self.recording_started = False
-                self.start_time = None
-                self.ready_for_new_recording = False
-                self.recording_count += 1
+            if self.continuous_mode:
+                if self.stream_channel is None:
+                    self.process_stream_block(block['t'], block['v'], block['p'], block['f'])
                 return
 
-            self.display_data['t'].append(t_rel)
-            self.display_data['v'].append(volume)
-
-            for key in ['p', 'f']:
-                if key in new_data:
-                    self.display_data[key].append(new_data[key])
+            if self.recording_count >= self.max_recordings:
+                return
 
-            self.update_plots()
+            if self.process_block(block['t'], block['v'], block['p'], block['f']):
+                self.schedule_update()
 
         except Exception as e:
-            print(f"Error en update_data: {e}")
+            print(f"Error en update_data_block: {e}")
+
+    def process_block(self, t, volume, pressure=None, flow=None):
+        """
+        Aplicar la lógica de disparo/grabación a un bloque de muestras
+
+        Equivale a process_sample muestra por muestra, pero el disparo y el
+        fin de la maniobra se ubican con NumPy y las muestras se agregan en
+        un solo tramo.
+
+        Args:
+            t (numpy.ndarray): Tiempos en segundos de la base de tiempo (monótonos)
+            volume, pressure, flow (numpy.ndarray): Columnas del bloque
+
+        Returns:
+            bool: True si se agregaron muestras a display_data
+        """
+        t = np.asarray(t, dtype=np.float64)
+        if len(t) == 0:
+            return False
+        volume = np.asarray(volume, dtype=np.float64)
+        self.last_timestamp = float(t[-1])
+
+        start = 0
+        if not self.recording_started:
+            if not self.ready_for_new_recording:
+                return False
+
+            # Disparo: primera muestra sobre el umbral (no se agrega)
+            triggered = volume > 0.01
+            if not triggered.any():
+                return False
+            start = int(np.argmax(triggered))
+            self.recording_started = True
+            self.start_time = float(t[start])
+            start += 1
+
+        # Fin de la maniobra: primera muestra que alcanza la duración (no se agrega)
+        t_rel = t[start:] - self.start_time
+        finished = t_rel >= self.recording_duration
+        end = int(np.argmax(finished)) if finished.any() else len(t_rel)
+
+        keep = slice(start, start + end)
+        t_rel = t_rel[:end]
+        valid = t_rel >= 0
+
+        added = bool(valid.any())
+        if added:
+            self.capture_buffer.extend(
+                t=t_rel[valid],
+                p=None if pressure is None else np.asarray(pressure, dtype=np.float64)[keep][valid],
+                f=None if flow is None else np.asarray(flow, dtype=np.float64)[keep][valid],
+                v=volume[keep][valid]
+            )
+            self.display_data = self.capture_buffer
+
+        if finished.any():
+            self.store_current_recording()
+            self.recording_started = False
+            self.start_time = None
+            self.ready_for_new_recording = False
+            self.recording_count += 1
+
+        return added
+
+    def process_sample(self, t, volume, pressure=None, flow=None):
+        """
+        Aplicar la lógica de disparo/grabación a una muestra
+
+        Args:
+            t (float): Tiempo en segundos de la base de tiempo (monótono)
+
+        Returns:
+            bool: True si la muestra se agregó a display_data
+        """
+        self.last_timestamp = t
+
+        if not self.recording_started:
+            if volume > 0.01 and self.ready_for_new_recording:
+                self.recording_started = True
+                self.start_time = t
+            return False
+
+        t_rel = t - self.start_time
+
+        if t_rel < 0:
+            return False
+
+        if t_rel >= self.recording_duration:
+            self.store_current_recording()
+            self.recording_started = False
+            self.start_time = None
+            self.ready_for_new_recording = False
+            self.recording_count += 1
+            return False
+
+        self.capture_buffer.append(t=t_rel, p=pressure, f=flow, v=volume)
+        self.display_data = self.capture_buffer
+
+        return True
 
     def update_plots(self):
         """Actualizar ambos gráficos"""
+        if self.continuous_mode:
+            self.update_stream_plots()
+            return
+
         if len(self.display_data['t']) > 0:
             self.flow_time_curve.setData(
                 x=self.display_data['t'],
@@ -1175,24 +1735,42 @@ class GraphHandler(QWidget):
                 )
             self.update_results_display()
 
+    def update_stream_plots(self):
+        """Dibujar la ventana continua y desplazar el eje de tiempo"""
+        window = self.stream_window
+        if len(window) == 0:
+            return
+
+        t = window['t']
+        if self.stream_channel is not None:
+            # Un canal solo tiene sentido contra el tiempo
+            self.flow_time_curve.setData(x=t, y=window[self.stream_channel.name])
+        else:
+            self.flow_time_curve.setData(x=t, y=window['v'])
+            self.flow_pressure_curve.setData(x=window['v'], y=window['f'])
+
+        end = max(t[-1], self.stream_window_seconds)
+        self.flow_time_plot.setXRange(end - self.stream_window_seconds, end, padding=0)
+
     def clear_data(self):
         """Limpiar todo - datos actuales y grabaciones"""
-        for key in self.display_data:
-            self.display_data[key] = []
+        self.capture_buffer = self.new_sample_buffer()
+        self.display_data = self.capture_buffer
 
-        for curve_data in self.stored_curves:
-            self.flow_time_plot.removeItem(curve_data['curve_time'])
-            if curve_data['curve_pressure']:
-                self.flow_pressure_plot.removeItem(curve_data['curve_pressure'])
+        self.pending_curves = []
+        for recording_number in list(self.stored_curves):
+            self.remove_permanent_curve(recording_number)
 
         self.start_time = None
         self.recording_started = False
         self.recording_count = 0
         self.ready_for_new_recording = False
         self.stored_recordings = []
-        self.stored_curves = []
         self.active_recording_number = None
+        self.styled_active_recording = None
         self.line_positions = {}
+        self.invalidate_metrics()
+        self.log_to_journal('record_clear')
 
         self.update_plots()
 
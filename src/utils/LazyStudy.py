@@ -0,0 +1,108 @@
+"""
+Apertura diferida de estudios
+
+Al abrir un estudio se cargan de inmediato el encabezado (paciente, líneas,
+calidad y métricas guardadas) y cada grabación recibe un LazyColumns en lugar
+de sus arreglos: las muestras se leen (mapeadas en memoria en el contenedor
+binario) recién cuando se dibuja la curva o hay que recalcular una métrica.
+Abrir un estudio grande cuesta lo mismo que abrir uno chico.
+"""
+
+import json
+import threading
+from collections.abc import Mapping
+from functools import partial
+
+from .SampleBuffer import columns_to_arrays
+from .StudyContainer import is_study_container, read_columns, read_study_layout
+
+
+class LazyColumns(Mapping):
+    """
+    Columnas de una grabación que se leen al primer acceso
+
+    Se comporta como el dict de arreglos float64 de una grabación; la lectura
+    ocurre una sola vez (protegida por un lock, MetricsWorker puede pedirla
+    desde otro thread).
+    """
+
+    def __init__(self, loader, keys):
+        """
+        Args:
+            loader (callable): Devuelve el dict de columnas (arreglos o listas)
+            keys (iterable): Nombres de las columnas
+        """
+        self._loader = loader
+        self._keys = tuple(keys)
+        self._columns = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        """True si las muestras ya se leyeron"""
+        return self._columns is not None
+
+    def load(self):
+        """Leer las muestras (si hace falta) y devolver el dict de arreglos"""
+        if self._columns is None:
+            with self._lock:
+                if self._columns is None:
+                    self._columns = columns_to_arrays(self._loader())
+                    self._loader = None
+        return self._columns
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def lazy_columns(data):
+    """
+    Envolver las columnas de una grabación para convertirlas al primer acceso
+
+    Args:
+        data (dict): Columnas como listas o arreglos (o un LazyColumns)
+
+    Returns:
+        LazyColumns: Columnas diferidas
+    """
+    if isinstance(data, LazyColumns):
+        return data
+    return LazyColumns(lambda: data, data.keys())
+
+
+def open_study(path):
+    """
+    Abrir un estudio sin leer las muestras de las grabaciones
+
+    En el contenedor binario solo se lee el encabezado y cada grabación
+    mapea sus columnas al primer acceso. Un RAW JSON se parsea completo
+    (el formato no permite otra cosa), pero la conversión a arreglos también
+    se difiere.
+
+    Args:
+        path (str): Archivo del estudio (.espb o .json)
+
+    Returns:
+        dict: Estudio con un LazyColumns en 'data' de cada grabación
+    """
+    if not is_study_container(path):
+        with open(path, 'r') as file:
+            study_data = json.load(file)
+        for recording in study_data.get('recordings', []):
+            recording['data'] = lazy_columns(recording.get('data', {}))
+        return study_data
+
+    study_data, data_offset = read_study_layout(path)
+    for recording in study_data.get('recordings', []):
+        columns = recording.pop('columns', {})
+        recording['data'] = LazyColumns(partial(read_columns, path, data_offset, columns), columns.keys())
+    return study_data
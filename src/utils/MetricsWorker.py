@@ -0,0 +1,52 @@
+from PySide6.QtCore import QThread, Signal
+
+from .SpirometryLandmarks import auto_line_positions
+from .SpirometryMetrics import curve_metrics, positions_key
+from .VolumeIndex import VolumeIndex
+
+
+class MetricsWorker(QThread):
+    """
+    Calcula las métricas de varias grabaciones fuera del thread de la GUI
+
+    Recibe una copia de la lista de trabajos (los arreglos de las grabaciones
+    almacenadas no se modifican; de la curva en captura, vistas del largo que
+    tenía al pedirse) y emite los resultados al terminar.
+    """
+    # Lista de dicts: recording_number, data, key, positions, metrics, index
+    metrics_ready = Signal(object)
+
+    def __init__(self, jobs):
+        """
+        Args:
+            jobs (list): Tuplas (recording_number, data, positions); número
+                         None para la curva en pantalla, posiciones None para
+                         ubicar las líneas automáticamente
+        """
+        super().__init__()
+        self.jobs = list(jobs)
+
+    def run(self):
+        results = []
+        for recording_number, data, positions in self.jobs:
+            # Si falla se entrega igual (métricas None) para no volver a pedirla
+            index = metrics = None
+            try:
+                if positions is None:
+                    positions = auto_line_positions(data)
+                if len(data['v']) > 0 and len(data['f']) > 0:
+                    index = VolumeIndex(data['v'], data['f'])
+                metrics = curve_metrics(data, positions, index)
+            except Exception as e:
+                print(f"Error calculando métricas de la grabación {recording_number}: {e}")
+
+            results.append({
+                'recording_number': recording_number,
+                'data': data,
+                'key': None if positions is None else positions_key(positions),
+                'positions': positions,
+                'metrics': metrics,
+                'index': index
+            })
+
+        self.metrics_ready.emit(results)
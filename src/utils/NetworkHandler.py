@@ -2,6 +2,9 @@ from PySide6.QtCore import QObject, Signal
 import requests
 import os
 import json  
+import tempfile
+
+from .StudyContainer import STUDY_EXTENSION, read_study, study_to_json
 class NetworkHandler(QObject):
     """Manejador de operaciones de red"""
     
@@ -210,17 +213,19 @@ class NetworkHandler(QObject):
                 if DEBUG: print(f"DEBUG SYNC: Carpeta offline no existe: {offline_folder}")
                 return stats
             
-            # Buscar archivos JSON (RAW)
-            json_files = [f for f in os.listdir(offline_folder) if f.endswith('.json')]
+            # Estudios pendientes de subir según el índice (RAW JSON o contenedor binario)
+            study_index = file_handler.get_study_index()
+            study_index.refresh()
+            json_files = [row['filename'] for row in study_index.list(synced=False)]
             
-            if DEBUG: print(f"DEBUG SYNC: Encontrados {len(json_files)} archivos offline")
+            if DEBUG: print(f"DEBUG SYNC: Encontrados {len(json_files)} archivos offline pendientes")
             
             for json_filename in json_files:
                 try:
                     json_path = os.path.join(offline_folder, json_filename)
                     
                     # Buscar PDF correspondiente
-                    pdf_filename = json_filename.replace('.json', '.pdf')
+                    pdf_filename = os.path.splitext(json_filename)[0] + '.pdf'
                     pdf_path = os.path.join(offline_folder, pdf_filename)
                     
                     if not os.path.exists(pdf_path):
@@ -230,9 +235,13 @@ class NetworkHandler(QObject):
                     
                     if DEBUG: print(f"DEBUG SYNC: Procesando {json_filename}...")
                     
-                    # Leer y migrar JSON si es necesario
-                    with open(json_path, 'r') as f:
-                        study_data = json.load(f)
+                    is_container = json_filename.endswith(STUDY_EXTENSION)
+                    if is_container:
+                        study_data = read_study(json_path)
+                    else:
+                        # Leer y migrar JSON si es necesario
+                        with open(json_path, 'r') as f:
+                            study_data = json.load(f)
                     
                     migrated = False
                     
@@ -250,7 +259,7 @@ class NetworkHandler(QObject):
                         if DEBUG: print(f"DEBUG SYNC: Migrado campo 'comentarios' en analysis")
                     
                     # Si se migró, guardar cambios
-                    if migrated:
+                    if migrated and not is_container:
                         with open(json_path, 'w') as f:
                             json.dump(study_data, f, indent=2)
                         stats['migrated'] += 1
@@ -270,8 +279,20 @@ class NetworkHandler(QObject):
                     
                     if DEBUG: print(f"DEBUG SYNC: Subiendo {json_filename}...")
                     
+                    # El servidor solo acepta JSON: exportar el contenedor a un temporal
+                    upload_path = json_path
+                    if is_container:
+                        temp_file = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+                        temp_file.close()
+                        upload_path = temp_file.name
+                        study_to_json(study_data, upload_path)
+
                     # Intentar subir
-                    response = self.upload_files(pdf_path, json_path, metadata)
+                    try:
+                        response = self.upload_files(pdf_path, upload_path, metadata)
+                    finally:
+                        if upload_path != json_path:
+                            os.remove(upload_path)
                     
                     if response:
                         stats['uploaded'] += 1
@@ -281,6 +302,7 @@ class NetworkHandler(QObject):
                             'url': response.get('url', response.get('link', ''))
                         })
                         if DEBUG: print(f"DEBUG SYNC: ✓ {json_filename} subido exitosamente")
+                        study_index.mark_synced(json_filename)
                         
                         # Opcional: Eliminar archivos locales después de subir
                         # os.remove(json_path)
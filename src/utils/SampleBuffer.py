@@ -0,0 +1,129 @@
+"""
+Buffer columnar preasignado para la grabación en curso
+
+Reemplaza las listas de display_data: cada columna ('t', 'p', 'f', 'v') es un
+arreglo float64 preasignado con un cursor de escritura común. Leer una columna
+(buffer['v']) devuelve una vista de las muestras escritas, sin copiar, que se
+puede pasar directo a setData o a las búsquedas de métricas.
+"""
+
+import numpy as np
+
+SAMPLE_KEYS = ('t', 'p', 'f', 'v')
+
+
+class SampleBuffer:
+    """Columnas float64 preasignadas con cursor de escritura"""
+
+    def __init__(self, capacity=4096, keys=SAMPLE_KEYS):
+        """
+        Args:
+            capacity (int): Muestras preasignadas (se duplica si se excede)
+            keys (tuple): Nombres de las columnas
+        """
+        self.keys = tuple(keys)
+        self._columns = {key: np.empty(max(1, int(capacity)), dtype=np.float64) for key in self.keys}
+        self._size = 0
+
+    @property
+    def capacity(self):
+        return len(self._columns[self.keys[0]])
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, key):
+        """Vista (sin copia) de las muestras escritas de una columna"""
+        return self._columns[key][:self._size]
+
+    def __contains__(self, key):
+        return key in self._columns
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def _reserve(self, n):
+        """Asegura espacio para n muestras más, duplicando la capacidad si hace falta"""
+        needed = self._size + n
+        if needed <= self.capacity:
+            return
+
+        new_capacity = max(needed, 2 * self.capacity)
+        for key, column in self._columns.items():
+            grown = np.empty(new_capacity, dtype=np.float64)
+            grown[:self._size] = column[:self._size]
+            self._columns[key] = grown
+
+    def append(self, **values):
+        """
+        Agrega una muestra; las columnas no indicadas quedan en NaN
+
+        Args:
+            **values: Valor de cada columna (ej. t=0.1, v=0.5)
+        """
+        self._reserve(1)
+        i = self._size
+        for key, column in self._columns.items():
+            value = values.get(key)
+            column[i] = np.nan if value is None else value
+        self._size += 1
+
+    def extend(self, **columns):
+        """
+        Agrega un bloque de muestras; las columnas no indicadas quedan en NaN
+
+        Args:
+            **columns: Arreglo de cada columna, todos del mismo largo
+        """
+        n = max((len(values) for values in columns.values()), default=0)
+        if n == 0:
+            return
+
+        self._reserve(n)
+        start = self._size
+        for key, column in self._columns.items():
+            values = columns.get(key)
+            column[start:start + n] = np.nan if values is None else values
+        self._size += n
+
+    def snapshot(self):
+        """
+        Entrega las columnas escritas y suelta el almacenamiento
+
+        Las vistas entregadas no se vuelven a escribir: el buffer pasa a usar
+        arreglos nuevos, así que guardar una grabación no copia los datos.
+
+        Returns:
+            dict: Arreglos float64 por columna
+        """
+        data = {key: column[:self._size] for key, column in self._columns.items()}
+        capacity = self.capacity
+        self._columns = {key: np.empty(capacity, dtype=np.float64) for key in self.keys}
+        self._size = 0
+        return data
+
+
+def columns_to_arrays(data):
+    """
+    Convierte las columnas de una grabación (listas del JSON) a arreglos float64
+
+    Args:
+        data (dict): Columnas 't', 'p', 'f', 'v'
+
+    Returns:
+        dict: Las mismas columnas como numpy.ndarray
+    """
+    return {key: np.asarray(values, dtype=np.float64) for key, values in data.items()}
+
+
+def columns_to_lists(data):
+    """
+    Convierte las columnas de una grabación a listas para serializar en JSON
+
+    Args:
+        data (dict): Columnas 't', 'p', 'f', 'v' (arreglos o listas)
+
+    Returns:
+        dict: Las mismas columnas como listas de float
+    """
+    return {key: np.asarray(values, dtype=np.float64).tolist() for key, values in data.items()}
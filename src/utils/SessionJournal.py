@@ -0,0 +1,330 @@
+"""
+Diario de sesión a prueba de cortes
+
+Mientras se adquiere, cada cambio del estudio (maniobra terminada, borrado,
+cambio PRE/POST, posiciones de líneas) se agrega al final de un archivo de
+diario. Si el programa se cierra de golpe o se desconecta el equipo, al volver a
+abrirlo se puede reconstruir la sesión con replay_journal.
+
+    [MAGIC 8 bytes][versión u16][reservado u16]
+    registros: [largo meta u32][largo datos u32][crc32 u32][meta JSON][datos]
+
+La meta lleva el tipo de registro; los datos, si hay, son columnas float64
+contiguas en el orden de SAMPLE_KEYS. Un registro cortado a la mitad o con
+CRC inválido marca el final del diario: lo anterior se recupera entero.
+
+Las maniobras se escriben con fsync inmediato. El resto de los registros se
+pasan al sistema operativo al escribirlos (sobreviven
+a un cierre abrupto del programa) y se sincronizan a disco por lotes, con un
+fsync cada sync_interval segundos como mucho (sync_pending).
+"""
+
+import json
+import os
+import struct
+import time
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from .LazyStudy import open_study
+from .SampleBuffer import SAMPLE_KEYS
+
+JOURNAL_EXTENSION = '.esj'
+JOURNAL_MAGIC = b'FAESPJR\x00'
+JOURNAL_VERSION = 1
+
+_PREAMBLE = struct.Struct('<8sHH')
+_RECORD = struct.Struct('<III')
+
+
+class SessionJournal:
+    """Diario de sesión de solo agregado"""
+
+    def __init__(self, path, sync_interval=2.0):
+        """
+        Args:
+            path (str): Archivo del diario (se crea o se trunca)
+            sync_interval (float): Segundos máximos entre fsync por lotes
+        """
+        self.path = path
+        self.sync_interval = sync_interval
+        self.unsaved = False
+        self._last_sync = time.monotonic()
+        self._needs_sync = False
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self._file = open(path, 'wb')
+        self._file.write(_PREAMBLE.pack(JOURNAL_MAGIC, JOURNAL_VERSION, 0))
+        self.sync()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def append(self, record_type, meta=None, columns=None, sync=False):
+        """
+        Agregar un registro al diario
+
+        Args:
+            record_type (str): Tipo de registro ('recording', 'delete', ...)
+            meta (dict): Datos del registro (serializables a JSON)
+            columns (dict): Columnas de muestras a guardar (opcional)
+            sync (bool): True para hacer fsync de inmediato
+        """
+        meta = dict(meta or {})
+        meta['type'] = record_type
+
+        payload = b''
+        if columns is not None:
+            arrays = [np.ascontiguousarray(columns[key], dtype='<f8') for key in SAMPLE_KEYS]
+            meta['samples'] = len(arrays[0])
+            payload = b''.join(array.tobytes() for array in arrays)
+
+        meta_bytes = json.dumps(meta).encode('utf-8')
+        crc = zlib.crc32(payload, zlib.crc32(meta_bytes))
+        self._file.write(_RECORD.pack(len(meta_bytes), len(payload), crc) + meta_bytes + payload)
+        self._file.flush()
+        self._needs_sync = True
+
+        if sync or time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """Forzar a disco lo escrito (fsync)"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+        self._needs_sync = False
+
+    def sync_pending(self):
+        """fsync por lotes: sincronizar si hay registros sin sincronizar"""
+        if self._needs_sync and not self._file.closed:
+            self.sync()
+
+    def record_session(self, info):
+        """Datos de la sesión (actividad, paciente) para identificarla al recuperar"""
+        self.append('session', {'info': info, 'started': datetime.now().isoformat()}, sync=True)
+
+    def record_study(self, path):
+        """
+        Se abrió un estudio guardado: el diario lo referencia en lugar de
+        copiar sus grabaciones (los cambios siguientes se agregan encima)
+        """
+        self.append('study', {'path': path}, sync=True)
+        self.unsaved = False
+
+    def record_recording(self, recording):
+        """Maniobra terminada: se escribe con fsync inmediato"""
+        meta = {key: value for key, value in recording.items() if key != 'data'}
+        self.append('recording', {'recording': meta}, recording['data'], sync=True)
+        self.unsaved = True
+
+    def record_delete(self, recording_number):
+        self.append('delete', {'recording_number': recording_number})
+        self.unsaved = True
+
+    def record_status(self, recording_number, status):
+        self.append('status', {'recording_number': recording_number, 'status': status})
+        self.unsaved = True
+
+    def record_lines(self, recording_number, positions):
+        self.append('lines', {'recording_number': recording_number, 'positions': positions})
+        self.unsaved = True
+
+    def record_clear(self):
+        """Se descartaron todas las grabaciones de la sesión"""
+        self.append('clear', sync=True)
+        self.unsaved = False
+
+    def record_saved(self, path):
+        """El estudio se guardó: lo anterior ya no hace falta recuperarlo"""
+        self.append('saved', {'path': path}, sync=True)
+        self.unsaved = False
+
+    def close(self):
+        """Escribir lo pendiente, sincronizar y cerrar"""
+        if self._file.closed:
+            return
+        if self._needs_sync:
+            self.sync()
+        self._file.close()
+
+    def discard(self):
+        """Cerrar y borrar el diario (la sesión ya no hace falta recuperarla)"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            print(f"Error borrando diario de sesión {self.path}: {e}")
+
+
+def _read_records(file):
+    """Recorrer los registros válidos; se detiene en el primero cortado o corrupto"""
+    while True:
+        header = file.read(_RECORD.size)
+        if len(header) < _RECORD.size:
+            return
+
+        meta_length, payload_length, crc = _RECORD.unpack(header)
+        meta_bytes = file.read(meta_length)
+        payload = file.read(payload_length)
+        if len(meta_bytes) < meta_length or len(payload) < payload_length:
+            return
+        if zlib.crc32(payload, zlib.crc32(meta_bytes)) != crc:
+            return
+
+        try:
+            meta = json.loads(meta_bytes.decode('utf-8'))
+        except ValueError:
+            return
+        yield meta, payload
+
+
+def _payload_columns(meta, payload):
+    columns = np.frombuffer(payload, dtype='<f8').reshape(len(SAMPLE_KEYS), meta['samples'])
+    return {key: columns[i].astype(np.float64) for i, key in enumerate(SAMPLE_KEYS)}
+
+
+def replay_journal(path):
+    """
+    Reconstruir el estado de una sesión a partir de su diario
+
+    Args:
+        path (str): Archivo del diario
+
+    Returns:
+        dict: 'info' (datos de la sesión), 'started', 'recordings' (lista con
+              la estructura del RAW, columnas como arreglos o LazyColumns),
+              'line_positions' {número: posiciones}, 'unsaved' (True si hay
+              cambios posteriores al último guardado)
+    """
+    state = {
+        'info': {},
+        'started': None,
+        'recordings': [],
+        'line_positions': {},
+        'unsaved': False
+    }
+
+    with open(path, 'rb') as file:
+        preamble = file.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ValueError("Diario de sesión vacío")
+        magic, version, _ = _PREAMBLE.unpack(preamble)
+        if magic != JOURNAL_MAGIC:
+            raise ValueError("Archivo inválido: no es un diario de sesión")
+        if version > JOURNAL_VERSION:
+            raise ValueError(f"Versión de diario no soportada: {version}")
+
+        for meta, payload in _read_records(file):
+            record_type = meta['type']
+            number = meta.get('recording_number')
+
+            if record_type == 'session':
+                state['info'] = meta.get('info', {})
+                state['started'] = meta.get('started')
+            elif record_type == 'study':
+                study = open_study(meta['path'])
+                state['info'] = {**state['info'], 'patient': study.get('patient', {})}
+                state['recordings'] = study.get('recordings', [])
+                state['line_positions'] = {
+                    int(k): v for k, v in study.get('line_positions', {}).items()
+                }
+                state['unsaved'] = False
+            elif record_type == 'recording':
+                recording = dict(meta['recording'])
+                recording['data'] = _payload_columns(meta, payload)
+                state['recordings'].append(recording)
+                state['unsaved'] = True
+            elif record_type == 'delete':
+                state['recordings'] = [rec for rec in state['recordings'] if rec['recording_number'] != number]
+                state['line_positions'].pop(number, None)
+                state['unsaved'] = True
+            elif record_type == 'status':
+                for rec in state['recordings']:
+                    if rec['recording_number'] == number:
+                        rec['bronchodilator_status'] = meta['status']
+                state['unsaved'] = True
+            elif record_type == 'lines':
+                state['line_positions'][number] = meta['positions']
+                state['unsaved'] = True
+            elif record_type == 'clear':
+                state['recordings'] = []
+                state['line_positions'] = {}
+                state['unsaved'] = False
+            elif record_type == 'saved':
+                state['unsaved'] = False
+
+    return state
+
+
+def journal_to_study(state):
+    """
+    Estudio (estructura del RAW) a partir de un diario reconstruido
+
+    Args:
+        state (dict): Resultado de replay_journal
+
+    Returns:
+        dict: Estudio listo para cargar o guardar
+    """
+    info = state.get('info', {})
+    return {
+        'device': 'fisioaccess_espiro',
+        'version': '1.0',
+        'timestamp': state.get('started') or datetime.now().isoformat(),
+        'patient': info.get('patient') or {},
+        'recordings': state['recordings'],
+        'line_positions': {str(number): positions for number, positions in state['line_positions'].items()}
+    }
+
+
+def new_journal_path(folder):
+    """Ruta para el diario de una sesión nueva"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return os.path.join(folder, f"sesion_{timestamp}{JOURNAL_EXTENSION}")
+
+
+def find_recoverable_journals(folder, exclude=None):
+    """
+    Diarios de sesiones con grabaciones sin guardar
+
+    Los diarios sin nada que recuperar (sin grabaciones o ya guardados) se
+    borran.
+
+    Args:
+        folder (str): Carpeta de diarios
+        exclude (str): Diario de la sesión actual, que no se toca
+
+    Returns:
+        list: Tuplas (ruta, estado de replay_journal), la más reciente primero
+    """
+    if not os.path.exists(folder):
+        return []
+
+    found = []
+    for filename in sorted(os.listdir(folder), reverse=True):
+        path = os.path.join(folder, filename)
+        if not filename.endswith(JOURNAL_EXTENSION) or path == exclude:
+            continue
+
+        try:
+            state = replay_journal(path)
+        except Exception as e:
+            print(f"Error leyendo diario de sesión {filename}: {e}")
+            continue
+
+        if state['unsaved'] and state['recordings']:
+            found.append((path, state))
+            continue
+
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Error borrando diario de sesión {filename}: {e}")
+
+    return found
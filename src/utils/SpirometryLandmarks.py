@@ -0,0 +1,129 @@
+"""
+Detección automática de puntos de referencia de una maniobra
+
+Ubica sobre los arreglos de una grabación (t, v, f) los puntos que marcan las
+líneas de análisis, para no tener que arrastrarlas a mano en cada maniobra:
+
+- Inicio de la prueba (t0) por extrapolación retrógrada: la tangente a la
+  curva volumen-tiempo en el PEF (pendiente = flujo pico) se prolonga hasta
+  el volumen de inicio del soplido.
+- FEV1: t0 + 1 s.
+- PEF: volumen donde el flujo espiratorio es máximo.
+- FVC: volumen máximo espirado, con el fin de la prueba en el inicio de la
+  meseta (menos de 25 ml en 1 s).
+
+Todo se calcula con operaciones vectorizadas de NumPy sobre la curva completa;
+no depende de GraphHandler ni de Qt.
+"""
+
+import numpy as np
+
+# Posiciones de las líneas cuando no se puede detectar la maniobra
+DEFAULT_LINE_POSITIONS = {
+    'vLine1': 0.5,
+    'vLine2': 1.5,
+    'v_line_pef': 0.0,
+    'v_line_fvc': 4.0
+}
+
+FEV1_SECONDS = 1.0
+
+# Criterio de fin de prueba: menos de 25 ml en 1 s
+PLATEAU_VOLUME = 0.025
+PLATEAU_SECONDS = 1.0
+
+
+def detect_landmarks(data, min_volume=0.1):
+    """
+    Puntos de referencia de la espiración forzada de una curva
+
+    Args:
+        data (dict): Columnas 't' (s), 'v' (L) y 'f' (L/s) de la curva
+        min_volume (float): Volumen espirado mínimo en L para considerar la maniobra
+
+    Returns:
+        dict: t0, t_fev1, t_end (s), pef (L/s), pef_volume, fvc_volume y
+              back_extrapolated_volume (L), o None si no hay espiración
+    """
+    t = np.asarray(data['t'], dtype=np.float64)
+    v = np.asarray(data['v'], dtype=np.float64)
+    f = np.asarray(data['f'], dtype=np.float64)
+
+    n = min(len(t), len(v), len(f))
+    valid = np.isfinite(t[:n]) & np.isfinite(v[:n]) & np.isfinite(f[:n])
+    t, v, f = t[:n][valid], v[:n][valid], f[:n][valid]
+    if len(t) < 3:
+        return None
+
+    # PEF: la espiración forzada es la que tiene el flujo máximo
+    i_pef = int(np.argmax(f))
+    pef = f[i_pef]
+    if pef <= 0:
+        return None
+
+    # Inicio del soplido: volumen mínimo antes del PEF (fin de la inspiración previa)
+    i_start = int(np.argmin(v[:i_pef + 1]))
+    v_start = v[i_start]
+
+    # Espiración: desde el PEF hasta que el volumen vuelve a bajar (inspiración)
+    expired = np.maximum.accumulate(v[i_pef:])
+    drop_tolerance = max(PLATEAU_VOLUME, 0.05 * (expired[-1] - v_start))
+    falling = np.flatnonzero(expired - v[i_pef:] > drop_tolerance)
+    end = i_pef + (int(falling[0]) if len(falling) else len(expired))
+    expired = expired[:end - i_pef]
+
+    fvc_volume = expired[-1]
+    if fvc_volume - v_start < min_volume:
+        return None
+
+    # Fin de la prueba: primera muestra desde la que el volumen sube menos de
+    # PLATEAU_VOLUME en el siguiente PLATEAU_SECONDS (o el fin de la espiración)
+    t_exp = t[i_pef:end]
+    ahead = np.minimum(np.searchsorted(t_exp, t_exp + PLATEAU_SECONDS), len(t_exp) - 1)
+    plateau = np.flatnonzero(expired[ahead] - expired < PLATEAU_VOLUME)
+    t_end = t_exp[plateau[0]] if len(plateau) else t_exp[-1]
+
+    # Extrapolación retrógrada: la tangente en el PEF corta v_start en t0
+    t0 = t[i_pef] - (v[i_pef] - v_start) / pef
+    t0 = float(np.clip(t0, t[0], t[i_pef]))
+    back_extrapolated = np.interp(t0, t, v) - v_start
+
+    return {
+        't0': t0,
+        't_fev1': min(t0 + FEV1_SECONDS, float(t[-1])),
+        't_end': float(t_end),
+        'pef': float(pef),
+        'pef_volume': float(v[i_pef]),
+        'fvc_volume': float(fvc_volume),
+        'back_extrapolated_volume': float(back_extrapolated)
+    }
+
+
+def landmark_line_positions(landmarks):
+    """
+    Posiciones de las líneas de análisis a partir de los puntos de referencia
+
+    Args:
+        landmarks (dict): Resultado de detect_landmarks (o None)
+
+    Returns:
+        dict: vLine1, vLine2, v_line_pef, v_line_fvc (por defecto si no hay puntos)
+    """
+    if landmarks is None:
+        return dict(DEFAULT_LINE_POSITIONS)
+
+    return {
+        'vLine1': landmarks['t0'],
+        'vLine2': landmarks['t_fev1'],
+        'v_line_pef': landmarks['pef_volume'],
+        'v_line_fvc': landmarks['fvc_volume']
+    }
+
+
+def auto_line_positions(data):
+    """Posiciones de las líneas detectadas sobre una curva (por defecto si falla)"""
+    try:
+        return landmark_line_positions(detect_landmarks(data))
+    except Exception as e:
+        print(f"Error detectando puntos de referencia: {e}")
+        return dict(DEFAULT_LINE_POSITIONS)
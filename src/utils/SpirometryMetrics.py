@@ -0,0 +1,357 @@
+"""
+Motor de métricas de espirometría
+
+Funciones puras sobre los arreglos de una grabación (t, v, f) y las posiciones
+de sus líneas: no leen ni modifican el estado de GraphHandler, por lo que se
+pueden llamar desde cualquier thread (MetricsWorker) y sobre varias
+grabaciones a la vez sin intercambiar display_data.
+
+Las posiciones de líneas son el dict que guarda GraphHandler.line_positions:
+'vLine1', 'vLine2' (tiempo, FEV1), 'v_line_pef' y 'v_line_fvc' (volumen).
+"""
+
+import numpy as np
+
+from .VolumeIndex import VolumeIndex
+
+METRIC_KEYS = ('fev1', 'pef', 'fef25', 'fef50', 'fef75', 'fvc',
+               'fif25', 'fif50', 'fif75', 'fev1_fvc_ratio')
+
+GRADE_ORDER = {'A': 4, 'B': 3, 'C': 2, 'D': 1, None: 0}
+
+
+def positions_key(positions):
+    """Tupla de posiciones de líneas, usada como clave de caché"""
+    return (positions['vLine1'], positions['vLine2'], positions['v_line_pef'], positions['v_line_fvc'])
+
+
+def value_at_time(t, v, x_pos):
+    """
+    Volumen interpolado en un tiempo
+
+    Args:
+        t (numpy.ndarray): Tiempos en s (crecientes)
+        v (numpy.ndarray): Volúmenes en L
+        x_pos (float): Tiempo buscado
+
+    Returns:
+        float: Volumen o None fuera de la curva
+    """
+    if len(t) == 0 or len(v) == 0:
+        return None
+
+    if x_pos < t[0] or x_pos > t[-1]:
+        return None
+
+    idx = np.searchsorted(t, x_pos)
+    if 0 < idx < len(t):
+        x0, x1 = t[idx - 1], t[idx]
+        y0, y1 = v[idx - 1], v[idx]
+
+        if x1 == x0:
+            return y0
+
+        return y0 + (y1 - y0) * (x_pos - x0) / (x1 - x0)
+
+    return None
+
+
+def curve_metrics(data, positions, index=None):
+    """
+    FEV1, PEF, FEF/FIF 25-50-75 y FVC de una curva
+
+    Args:
+        data (dict): Columnas 't', 'v', 'f' de la curva
+        positions (dict): Posiciones de las líneas
+        index (VolumeIndex): Índice de volumen ya construido (opcional)
+
+    Returns:
+        dict: Métricas con las claves de METRIC_KEYS (None donde no hay datos)
+    """
+    t = np.asarray(data['t'], dtype=np.float64)
+    v = np.asarray(data['v'], dtype=np.float64)
+    f = np.asarray(data['f'], dtype=np.float64)
+
+    y1 = value_at_time(t, v, positions['vLine1'])
+    y2 = value_at_time(t, v, positions['vLine2'])
+    fev1 = abs(y2 - y1) if y1 is not None and y2 is not None else None
+
+    pef_vol = positions['v_line_pef']
+    fvc_vol = positions['v_line_fvc']
+
+    # PEF y FEF/FIF 25, 50 y 75% entre PEF y FVC en una sola consulta
+    diff = (fvc_vol - pef_vol) / 4
+    volumes = pef_vol + diff * np.arange(4)
+    if len(v) == 0 or len(f) == 0:
+        positive = negative = np.full(4, np.nan)
+    else:
+        if index is None:
+            index = VolumeIndex(v, f)
+        positive, negative = index.intersections_batch(volumes)
+
+    metrics = {
+        'fev1': fev1,
+        'pef': None if np.isnan(positive[0]) else float(positive[0]),
+        'fvc': fvc_vol,
+        'fev1_fvc_ratio': (fev1 / fvc_vol) * 100 if fev1 is not None and fvc_vol > 0 else None
+    }
+
+    for step, percent in enumerate((25, 50, 75), start=1):
+        metrics[f'fef{percent}'] = None if np.isnan(positive[step]) else float(positive[step])
+        metrics[f'fif{percent}'] = None if np.isnan(negative[step]) else abs(float(negative[step]))
+
+    return metrics
+
+
+def grade_for(n_maneuvers, repeatability_ml):
+    """Grado ATS/ERS según cantidad de maniobras y repetibilidad en ml"""
+    if n_maneuvers >= 3:
+        if repeatability_ml < 150:
+            return 'A'
+        elif repeatability_ml < 200:
+            return 'B'
+
+    if n_maneuvers >= 2:
+        if repeatability_ml < 200:
+            return 'C'
+        else:
+            return 'D'
+
+    return None
+
+
+GRADE_THRESHOLDS_ML = (('A', 150), ('B', 200))
+
+
+def _pef_array(pef_values):
+    return np.asarray([p['pef'] for p in pef_values], dtype=np.float64)
+
+
+def leave_out_repeatability(pef_values, k=1):
+    """
+    Repetibilidad al eliminar cada combinación de k maniobras (k = 1 o 2)
+
+    Con los PEF ordenados, el mínimo y el máximo de lo que queda son los
+    primeros y últimos elementos que no se eliminaron (extremos de prefijo y
+    sufijo), así que cada combinación se resuelve sin reconstruir listas.
+
+    Args:
+        pef_values (list): Dicts con 'recording_number' y 'pef'
+        k (int): Cantidad de maniobras eliminadas
+
+    Returns:
+        tuple: (índices eliminados en pef_values, forma (m, k), repetibilidad en ml, forma (m,))
+    """
+    if k not in (1, 2):
+        raise ValueError(f"Solo se evalúan combinaciones de 1 o 2 maniobras: {k}")
+
+    pefs = _pef_array(pef_values)
+    n = len(pefs)
+    if n - k < 1:
+        return np.empty((0, k), dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    order = np.argsort(pefs, kind='stable')
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n)
+    s = pefs[order]
+
+    if k == 1:
+        removed = np.arange(n)[:, None]
+        r = rank
+        new_min = np.where(r == 0, s[min(1, n - 1)], s[0])
+        new_max = np.where(r == n - 1, s[max(n - 2, 0)], s[-1])
+    else:
+        i, j = np.triu_indices(n, 1)
+        removed = np.column_stack((i, j))
+        lo = np.minimum(rank[i], rank[j])
+        hi = np.maximum(rank[i], rank[j])
+        # El menor que queda es s[0], s[1] o s[2] según cuántos de los primeros se quitaron
+        new_min = s[np.where(lo > 0, 0, np.where(hi > 1, 1, 2))]
+        new_max = s[np.where(hi < n - 1, n - 1, np.where(lo < n - 2, n - 2, n - 3))]
+
+    return removed, (new_max - new_min) * 1000
+
+
+def removal_suggestions(pef_values, current_n, current_repeatability):
+    """
+    Maniobras que, al eliminarlas, mejorarían el grado
+
+    Args:
+        pef_values (list): Dicts con 'recording_number' y 'pef'
+        current_n (int): Cantidad de maniobras actual
+        current_repeatability (float): Repetibilidad actual en ml
+
+    Returns:
+        list: Dicts con 'recording_number', 'new_grade', 'new_repeatability'
+    """
+    suggestions = []
+
+    if len(pef_values) < 3:
+        return suggestions
+
+    current_grade_value = GRADE_ORDER.get(grade_for(current_n, current_repeatability), 0)
+
+    removed, repeatability = leave_out_repeatability(pef_values, 1)
+    new_n = len(pef_values) - 1
+
+    # Con 2 o más maniobras, 200 ml o más siempre es grado D: solo se evalúan
+    # las eliminaciones por debajo de ese umbral
+    for i in np.flatnonzero(repeatability < 200):
+        new_grade = grade_for(new_n, repeatability[i])
+        if GRADE_ORDER.get(new_grade, 0) > current_grade_value:
+            suggestions.append({
+                'recording_number': pef_values[removed[i, 0]]['recording_number'],
+                'new_grade': new_grade,
+                'new_repeatability': float(repeatability[i])
+            })
+
+    return suggestions
+
+
+def _window_ends(s, threshold_ml):
+    """
+    Para cada PEF ordenado s[i], fin de la ventana [i, end) con repetibilidad < umbral
+
+    La búsqueda binaria compara contra s[i] + umbral; luego se ajusta el borde
+    para que coincida con (max - min) * 1000 < umbral, el cálculo de grade_for.
+    """
+    n = len(s)
+    start = np.arange(n)
+    end = np.searchsorted(s, s + threshold_ml / 1000, side='left')
+
+    while True:
+        shrink = (end > start + 1) & ((s[end - 1] - s) * 1000 >= threshold_ml)
+        grow = (end < n) & ((s[np.minimum(end, n - 1)] - s) * 1000 < threshold_ml)
+        if not shrink.any() and not grow.any():
+            return end
+        end = end - shrink + grow
+
+
+def best_subset(pef_values, min_maneuvers=3):
+    """
+    Subconjunto más grande de maniobras que alcanza el mejor grado posible (A o B)
+
+    El rango de cualquier subconjunto de m maniobras es al menos el de alguna
+    ventana de m PEF consecutivos ordenados, así que basta con recorrer las
+    ventanas: para cada PEF se busca (np.searchsorted) el último que queda por
+    debajo del umbral del grado.
+
+    Args:
+        pef_values (list): Dicts con 'recording_number' y 'pef'
+        min_maneuvers (int): Maniobras mínimas para los grados A y B
+
+    Returns:
+        dict: 'grade', 'keep' y 'remove' (números de grabación), 'repeatability_ml',
+              o None si ningún subconjunto alcanza A o B
+    """
+    pefs = _pef_array(pef_values)
+    n = len(pefs)
+    if n < min_maneuvers:
+        return None
+
+    order = np.argsort(pefs, kind='stable')
+    s = pefs[order]
+
+    for grade, threshold_ml in GRADE_THRESHOLDS_ML:
+        end = _window_ends(s, threshold_ml)
+        sizes = end - np.arange(n)
+        best_size = int(sizes.max())
+        if best_size < min_maneuvers:
+            continue
+
+        # Entre las ventanas más grandes, la de menor repetibilidad
+        starts = np.flatnonzero(sizes == best_size)
+        spans = (s[starts + best_size - 1] - s[starts]) * 1000
+        start = int(starts[np.argmin(spans)])
+
+        keep = np.sort(order[start:start + best_size])
+        remove = np.setdiff1d(np.arange(n), keep)
+        return {
+            'grade': grade,
+            'keep': [pef_values[i]['recording_number'] for i in keep],
+            'remove': [pef_values[i]['recording_number'] for i in remove],
+            'repeatability_ml': float(spans.min())
+        }
+
+    return None
+
+
+def quality(pef_values, n_maneuvers, filter_status=None):
+    """
+    Calidad de las maniobras según criterios ATS/ERS
+
+    Args:
+        pef_values (list): Dicts con 'recording_number' y 'pef' (PEF válidos)
+        n_maneuvers (int): Cantidad de maniobras consideradas
+        filter_status (str): 'PRE', 'POST' o None
+
+    Returns:
+        dict: grade, n_maneuvers, repeatability_ml, pef_values, suggestions,
+              best_subset, filter_status
+    """
+    result = {
+        'grade': None,
+        'n_maneuvers': n_maneuvers,
+        'repeatability_ml': None,
+        'pef_values': pef_values if n_maneuvers >= 2 else [],
+        'suggestions': [],
+        'best_subset': None,
+        'filter_status': filter_status
+    }
+
+    if n_maneuvers < 2 or len(pef_values) < 2:
+        return result
+
+    # Repetibilidad (diferencia max - min en ml)
+    pef_only = [p['pef'] for p in pef_values]
+    repeatability_ml = (max(pef_only) - min(pef_only)) * 1000
+
+    result['grade'] = grade_for(n_maneuvers, repeatability_ml)
+    result['repeatability_ml'] = repeatability_ml
+    result['suggestions'] = removal_suggestions(pef_values, n_maneuvers, repeatability_ml)
+
+    # Mejor subconjunto solo si mejora el grado actual
+    subset = best_subset(pef_values)
+    if subset is not None and GRADE_ORDER[subset['grade']] > GRADE_ORDER.get(result['grade'], 0):
+        result['best_subset'] = subset
+    return result
+
+
+def averages(metrics_list, n_recordings, filter_status=None):
+    """
+    Promedio de cada métrica sobre varias grabaciones
+
+    Args:
+        metrics_list (list): Métricas de cada grabación (curve_metrics)
+        n_recordings (int): Cantidad de grabaciones del grupo
+        filter_status (str): 'PRE', 'POST' o None
+
+    Returns:
+        dict: Promedio por métrica (None si ninguna grabación la tiene)
+    """
+    result = {}
+    for key in METRIC_KEYS:
+        values = [metrics[key] for metrics in metrics_list if metrics[key] is not None]
+        result[key] = np.mean(values) if values else None
+
+    result['n_recordings'] = n_recordings
+    result['filter_status'] = filter_status
+    return result
+
+
+def study_metrics(recordings, line_positions):
+    """
+    Métricas de todas las grabaciones de un estudio
+
+    Args:
+        recordings (list): Grabaciones con 'recording_number' y 'data'
+        line_positions (dict): Posiciones de líneas por número de grabación
+
+    Returns:
+        dict: {número de grabación: métricas} (solo grabaciones con líneas)
+    """
+    return {
+        rec['recording_number']: curve_metrics(rec['data'], line_positions[rec['recording_number']])
+        for rec in recordings
+        if rec['recording_number'] in line_positions
+    }
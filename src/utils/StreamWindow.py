@@ -0,0 +1,256 @@
+"""
+Ventana deslizante y volcado a disco para la adquisición continua
+
+En el modo continuo (ECG/EMG, respiración a volumen corriente) la sesión no
+tiene duración fija, así que en memoria solo se guarda una ventana de las
+últimas muestras (RollingWindow) y las que salen de ella se escriben a disco
+por bloques (ChunkSpiller). La memoria y el costo de redibujar quedan
+constantes sin importar cuánto dure la sesión.
+
+Junto al archivo de muestras se escribe un .json con sus columnas (la
+espirometría usa 't', 'p', 'f', 'v'; un canal del dispositivo, 't' y el
+nombre del canal), así las funciones de lectura no necesitan que se las
+indiquen.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from .SampleBuffer import SAMPLE_KEYS
+
+
+class RollingWindow:
+    """
+    Columnas float64 de capacidad fija que conservan las últimas muestras
+
+    Cada muestra se escribe dos veces (en i y en i + capacidad), así las
+    muestras en orden siempre forman un tramo contiguo y leer una columna
+    devuelve una vista sin copia aunque el buffer haya dado la vuelta.
+    """
+
+    def __init__(self, capacity, keys=SAMPLE_KEYS):
+        """
+        Args:
+            capacity (int): Muestras que conserva la ventana
+            keys (tuple): Nombres de las columnas
+        """
+        self.capacity = max(1, int(capacity))
+        self.keys = tuple(keys)
+        self._columns = {key: np.empty(2 * self.capacity, dtype=np.float64) for key in self.keys}
+        self._head = 0  # Posición de la próxima escritura
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, key):
+        """Vista (sin copia) de la columna en orden cronológico"""
+        start = (self._head - self._size) % self.capacity
+        return self._columns[key][start:start + self._size]
+
+    def __contains__(self, key):
+        return key in self._columns
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def extend(self, **columns):
+        """
+        Agrega un bloque de muestras
+
+        Args:
+            **columns: Arreglo de cada columna, todos del mismo largo; las
+                       columnas no indicadas quedan en NaN
+
+        Returns:
+            dict: Muestras que salieron de la ventana (arreglos por columna)
+        """
+        n = max((len(values) for values in columns.values()), default=0)
+        evicted_count = max(self._size + n - self.capacity, 0)
+
+        # Copias de lo que se pierde antes de sobrescribirlo
+        evicted = {}
+        if evicted_count:
+            overwritten = min(evicted_count, self._size)
+            for key in self.keys:
+                old = self[key][:overwritten]
+                values = columns.get(key)
+                # Si el bloque es más grande que la ventana, su comienzo también sale
+                dropped_new = evicted_count - overwritten
+                if values is None:
+                    new = np.full(dropped_new, np.nan)
+                else:
+                    new = np.asarray(values, dtype=np.float64)[:dropped_new]
+                evicted[key] = np.concatenate((old, new))
+
+        # Solo las últimas `capacity` muestras del bloque pueden quedar
+        skip = max(n - self.capacity, 0)
+        m = n - skip
+        if m:
+            positions = (self._head + np.arange(m)) % self.capacity
+            for key, column in self._columns.items():
+                values = columns.get(key)
+                block = np.nan if values is None else np.asarray(values, dtype=np.float64)[skip:]
+                column[positions] = block
+                column[positions + self.capacity] = block
+
+        self._head = (self._head + m) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+        return evicted
+
+    def take_all(self):
+        """
+        Vacía la ventana
+
+        Returns:
+            dict: Copias de las muestras que había, en orden
+        """
+        data = {key: self[key].copy() for key in self.keys}
+        self._head = 0
+        self._size = 0
+        return data
+
+
+class ChunkSpiller:
+    """
+    Escribe muestras a disco en bloques de tamaño fijo
+
+    El archivo es una secuencia de filas float64 (little-endian) con las
+    columnas en el orden de `keys`; load_spill lo vuelve a leer.
+    """
+
+    def __init__(self, path, chunk_size=16384, keys=SAMPLE_KEYS, info=None):
+        """
+        Args:
+            path (str): Archivo de destino (se crea o se trunca)
+            chunk_size (int): Muestras acumuladas antes de escribir
+            keys (tuple): Columnas a escribir
+            info (dict): Datos extra para el .json de la sesión (canal, unidad)
+        """
+        self.path = path
+        self.chunk_size = max(1, int(chunk_size))
+        self.keys = tuple(keys)
+        self._pending = []
+        self._pending_count = 0
+        self.samples_written = 0
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(spill_info_path(path), 'w') as file:
+            json.dump({**(info or {}), 'keys': list(self.keys)}, file)
+        self._file = open(path, 'wb')
+
+    def write(self, columns):
+        """
+        Encola muestras y escribe los bloques completos
+
+        Args:
+            columns (dict): Arreglo de cada columna, todos del mismo largo
+        """
+        n = max((len(values) for values in columns.values()), default=0)
+        if n == 0:
+            return
+
+        rows = np.empty((n, len(self.keys)), dtype='<f8')
+        for i, key in enumerate(self.keys):
+            values = columns.get(key)
+            rows[:, i] = np.nan if values is None else values
+
+        self._pending.append(rows)
+        self._pending_count += n
+        if self._pending_count >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Escribir lo pendiente aunque no complete un bloque"""
+        if not self._pending:
+            return
+
+        block = np.concatenate(self._pending)
+        block.tofile(self._file)
+        self._file.flush()
+        self.samples_written += len(block)
+        self._pending = []
+        self._pending_count = 0
+
+    def close(self):
+        """Escribir lo pendiente y cerrar el archivo"""
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+
+def spill_info_path(path):
+    """Archivo .json con las columnas de una sesión volcada"""
+    return path + '.json'
+
+
+def read_spill_info(path):
+    """
+    Datos de una sesión volcada por ChunkSpiller
+
+    Args:
+        path (str): Archivo de muestras
+
+    Returns:
+        dict: 'keys' (columnas en orden) y los datos extra guardados; sesiones
+              sin .json se toman como espirometría
+    """
+    try:
+        with open(spill_info_path(path), 'r') as file:
+            info = json.load(file)
+    except (OSError, ValueError):
+        info = {}
+    info['keys'] = tuple(info.get('keys', SAMPLE_KEYS))
+    return info
+
+
+def load_spill(path, keys=None):
+    """
+    Leer un archivo escrito por ChunkSpiller
+
+    Args:
+        path (str): Archivo de muestras
+        keys (tuple): Columnas, en el orden en que se escribieron (None para
+                      tomarlas del .json de la sesión)
+
+    Returns:
+        dict: Arreglo float64 por columna
+    """
+    keys = keys or read_spill_info(path)['keys']
+    rows = np.fromfile(path, dtype='<f8')
+    rows = rows[:len(rows) - len(rows) % len(keys)].reshape(-1, len(keys))
+    return {key: rows[:, i].astype(np.float64) for i, key in enumerate(keys)}
+
+
+def iter_spill(path, chunk_size=65536, keys=None):
+    """
+    Leer un archivo escrito por ChunkSpiller de a bloques
+
+    Args:
+        path (str): Archivo de muestras
+        chunk_size (int): Muestras por bloque
+        keys (tuple): Columnas, en el orden en que se escribieron (None para
+                      tomarlas del .json de la sesión)
+
+    Yields:
+        dict: Arreglo float64 por columna
+    """
+    keys = keys or read_spill_info(path)['keys']
+    with open(path, 'rb') as file:
+        while True:
+            rows = np.fromfile(file, dtype='<f8', count=chunk_size * len(keys))
+            rows = rows[:len(rows) - len(rows) % len(keys)].reshape(-1, len(keys))
+            if len(rows) == 0:
+                break
+            yield {key: rows[:, i].astype(np.float64) for i, key in enumerate(keys)}
+
+
+def spill_length(path, keys=None):
+    """Cantidad de muestras completas en un archivo de ChunkSpiller"""
+    keys = keys or read_spill_info(path)['keys']
+    return os.path.getsize(path) // (8 * len(keys))
@@ -0,0 +1,237 @@
+"""
+Contenedor binario de estudios
+
+Formato compacto para guardar estudios (la exportación JSON sigue
+disponible y es la que se sube al servidor):
+
+    [MAGIC 8 bytes][versión u16][reservado u16][largo del encabezado u32]
+    [encabezado JSON utf-8, relleno hasta múltiplo de 8]
+    [bloques de columnas, cada uno alineado a 8 bytes]
+
+El encabezado lleva todo el estudio (paciente, análisis, posiciones de líneas,
+calidad, promedios y grabaciones) salvo las muestras: en cada grabación,
+'data' se reemplaza por 'columns' con el offset (desde el inicio de los
+bloques), la cantidad de muestras y el dtype de cada columna. Así listar
+estudios solo lee el encabezado y abrir uno mapea las columnas en memoria
+(np.memmap) sin parsear texto.
+"""
+
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from .SampleBuffer import columns_to_lists
+
+STUDY_EXTENSION = '.espb'
+STUDY_MAGIC = b'FAESPRB\x00'
+STUDY_VERSION = 1
+
+# Magia, versión, reservado y largo del encabezado
+_PREAMBLE = struct.Struct('<8sHHI')
+_ALIGNMENT = 8
+
+# float64 por defecto: el contenedor guarda exactamente lo mismo que el RAW
+# JSON. dtypes/default_dtype permiten pedir '<f4' explícitamente para archivos
+# más chicos (p, f y v lo toleran; t en float32 pierde resolución pasados
+# unos segundos)
+DEFAULT_DTYPES = {}
+DEFAULT_DTYPE = '<f8'
+
+
+def _padding(size):
+    return -size % _ALIGNMENT
+
+
+def is_study_container(path):
+    """True si el archivo empieza con la magia del contenedor binario"""
+    try:
+        with open(path, 'rb') as file:
+            return file.read(len(STUDY_MAGIC)) == STUDY_MAGIC
+    except OSError:
+        return False
+
+
+def write_study(path, study_data, dtypes=None, default_dtype=DEFAULT_DTYPE):
+    """
+    Guardar un estudio en el contenedor binario
+
+    Args:
+        path (str): Archivo de destino
+        study_data (dict): Estudio con la misma estructura que el RAW JSON
+        dtypes (dict): dtype por columna (ej. {'t': '<f8'}); el resto usa default_dtype
+        default_dtype (str): dtype de las columnas no indicadas
+    """
+    dtypes = dict(DEFAULT_DTYPES if dtypes is None else dtypes)
+
+    header = {key: value for key, value in study_data.items() if key != 'recordings'}
+    header['recordings'] = []
+    blocks = []
+    offset = 0
+
+    for recording in study_data.get('recordings', []):
+        entry = {key: value for key, value in recording.items() if key != 'data'}
+        entry['columns'] = {}
+        for key, values in recording.get('data', {}).items():
+            dtype = dtypes.get(key, default_dtype)
+            array = np.ascontiguousarray(values, dtype=dtype)
+            entry['columns'][key] = {'offset': offset, 'length': len(array), 'dtype': dtype}
+            blocks.append(array)
+            offset += array.nbytes + _padding(array.nbytes)
+        header['recordings'].append(entry)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    # Se escribe a un temporal en la misma carpeta y se reemplaza al final:
+    # un corte o un disco lleno no dejan a medias un estudio existente
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(_PREAMBLE.pack(STUDY_MAGIC, STUDY_VERSION, 0, len(header_bytes)))
+            file.write(header_bytes)
+            file.write(b'\x00' * _padding(_PREAMBLE.size + len(header_bytes)))
+            for array in blocks:
+                file.write(array.tobytes())
+                file.write(b'\x00' * _padding(array.nbytes))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _read_preamble(file):
+    magic, version, _, header_length = _PREAMBLE.unpack(file.read(_PREAMBLE.size))
+    if magic != STUDY_MAGIC:
+        raise ValueError("Archivo inválido: no es un contenedor de estudio")
+    if version > STUDY_VERSION:
+        raise ValueError(f"Versión de contenedor no soportada: {version}")
+
+    header = json.loads(file.read(header_length).decode('utf-8'))
+    data_offset = _PREAMBLE.size + header_length
+    data_offset += _padding(data_offset)
+    return header, data_offset
+
+
+def read_study_header(path):
+    """
+    Leer solo el encabezado de un estudio (sin muestras)
+
+    Args:
+        path (str): Archivo del contenedor
+
+    Returns:
+        dict: Estudio con 'columns' en lugar de 'data' en cada grabación
+    """
+    with open(path, 'rb') as file:
+        header, _ = _read_preamble(file)
+    return header
+
+
+def read_study_layout(path):
+    """
+    Leer el encabezado y la posición de los bloques de columnas
+
+    Args:
+        path (str): Archivo del contenedor
+
+    Returns:
+        tuple: (encabezado, offset de los bloques de columnas en el archivo)
+    """
+    with open(path, 'rb') as file:
+        return _read_preamble(file)
+
+
+def read_columns(path, data_offset, columns, mmap=True):
+    """
+    Leer las columnas de una grabación
+
+    Args:
+        path (str): Archivo del contenedor
+        data_offset (int): Offset de los bloques (read_study_layout)
+        columns (dict): 'columns' de la grabación en el encabezado
+        mmap (bool): True para mapear en memoria (solo lectura)
+
+    Returns:
+        dict: Arreglo NumPy por columna
+    """
+    data = {}
+    with open(path, 'rb') as file:
+        for key, column in columns.items():
+            dtype = np.dtype(column['dtype'])
+            if column['length'] == 0:
+                data[key] = np.empty(0, dtype=dtype)
+            elif mmap:
+                data[key] = np.memmap(path, dtype=dtype, mode='r',
+                                      offset=data_offset + column['offset'],
+                                      shape=(column['length'],))
+            else:
+                file.seek(data_offset + column['offset'])
+                data[key] = np.fromfile(file, dtype=dtype, count=column['length'])
+    return data
+
+
+def read_study(path, mmap=True):
+    """
+    Leer un estudio del contenedor binario
+
+    Args:
+        path (str): Archivo del contenedor
+        mmap (bool): True para mapear las columnas en memoria (solo lectura),
+                     False para leerlas a arreglos en memoria
+
+    Returns:
+        dict: Estudio con la misma estructura que el RAW JSON; las columnas
+              de cada grabación son arreglos NumPy
+    """
+    study_data, data_offset = read_study_layout(path)
+    for recording in study_data.get('recordings', []):
+        recording['data'] = read_columns(path, data_offset, recording.pop('columns', {}), mmap)
+    return study_data
+
+
+def load_study_file(path):
+    """
+    Leer un estudio en cualquiera de los dos formatos (contenedor o JSON)
+
+    Args:
+        path (str): Archivo del estudio
+
+    Returns:
+        dict: Estudio completo
+    """
+    if is_study_container(path):
+        return read_study(path)
+
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def study_to_json(study_data, path):
+    """
+    Exportar un estudio a JSON (formato RAW que acepta el servidor)
+
+    Args:
+        study_data (dict): Estudio con columnas como arreglos o listas
+        path (str): Archivo JSON de destino
+    """
+    exported = dict(study_data)
+    exported['recordings'] = [
+        {**recording, 'data': columns_to_lists(recording.get('data', {}))}
+        for recording in study_data.get('recordings', [])
+    ]
+
+    with open(path, 'w') as file:
+        json.dump(exported, file, indent=2)
+
+
+def study_path_stem(path):
+    """Ruta sin la extensión de estudio (.espb o .json)"""
+    root, extension = os.path.splitext(path)
+    return root if extension in (STUDY_EXTENSION, '.json') else path
@@ -0,0 +1,200 @@
+"""
+Índice de la carpeta offline de estudios
+
+Base SQLite (estudios.sqlite, junto a los estudios) con una fila por archivo:
+paciente, fecha, cantidad de grabaciones y estado de sincronización. El
+diálogo de apertura y la sincronización leen el índice en lugar de abrir cada
+estudio; los archivos solo se leen una vez, al agregarlos al índice.
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+from .StudyContainer import STUDY_EXTENSION, read_study_header
+
+INDEX_FILENAME = 'estudios.sqlite'
+
+STUDY_FILE_EXTENSIONS = ('.json', STUDY_EXTENSION)
+
+_COLUMNS = ('filename', 'nombre', 'rut', 'timestamp', 'n_recordings',
+            'synced', 'file_size', 'mtime')
+
+# Campos por los que se puede ordenar el listado
+SORT_FIELDS = ('timestamp', 'nombre', 'rut', 'n_recordings', 'synced')
+
+
+class StudyIndex:
+    """Índice SQLite de los estudios de una carpeta offline"""
+
+    def __init__(self, folder):
+        """
+        Args:
+            folder (str): Carpeta offline de estudios
+        """
+        self.folder = folder
+        self.path = os.path.join(folder, INDEX_FILENAME)
+
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS studies ("
+                " filename TEXT PRIMARY KEY,"
+                " nombre TEXT,"
+                " rut TEXT,"
+                " timestamp TEXT,"
+                " n_recordings INTEGER,"
+                " synced INTEGER NOT NULL DEFAULT 0,"
+                " file_size INTEGER,"
+                " mtime REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS studies_timestamp ON studies (timestamp)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def add(self, path, study_data, synced=False):
+        """
+        Agregar o actualizar un estudio en el índice
+
+        Args:
+            path (str): Archivo del estudio (dentro de la carpeta)
+            study_data (dict): Estudio o su encabezado (patient, timestamp, recordings)
+            synced (bool): True si ya se subió al servidor
+        """
+        self._store([self._row(path, study_data, synced)])
+
+    def _row(self, path, study_data, synced):
+        stat = os.stat(path)
+        patient = study_data.get('patient', {})
+        return (
+            os.path.basename(path),
+            patient.get('nombre', ''),
+            patient.get('rut', ''),
+            study_data.get('timestamp', ''),
+            len(study_data.get('recordings', [])),
+            int(synced),
+            stat.st_size,
+            stat.st_mtime
+        )
+
+    def _store(self, rows):
+        """Insertar o reemplazar filas en una sola transacción"""
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO studies ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                rows
+            )
+
+    def mark_synced(self, filename, synced=True):
+        """Marcar un estudio como subido (o pendiente) al servidor"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE studies SET synced = ? WHERE filename = ?",
+                         (int(synced), os.path.basename(filename)))
+
+    def remove(self, filename):
+        """Quitar un estudio del índice"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM studies WHERE filename = ?", (os.path.basename(filename),))
+
+    def refresh(self):
+        """
+        Sincronizar el índice con los archivos de la carpeta
+
+        Agrega los estudios nuevos o modificados (leyendo solo el encabezado
+        de los contenedores binarios) y quita los que ya no existen. Los
+        estudios sin cambios no se leen.
+
+        Returns:
+            int: Cantidad de estudios agregados o actualizados
+        """
+        with closing(self._connect()) as conn:
+            known = {row['filename']: (row['file_size'], row['mtime'], row['synced'])
+                     for row in conn.execute("SELECT filename, file_size, mtime, synced FROM studies")}
+
+        present = set()
+        rows = []
+        for filename in os.listdir(self.folder):
+            if not filename.endswith(STUDY_FILE_EXTENSIONS):
+                continue
+
+            present.add(filename)
+            path = os.path.join(self.folder, filename)
+            stat = os.stat(path)
+            previous = known.get(filename)
+            if previous is not None and previous[0] == stat.st_size and previous[1] == stat.st_mtime:
+                continue
+
+            try:
+                if filename.endswith(STUDY_EXTENSION):
+                    study_data = read_study_header(path)
+                else:
+                    with open(path, 'r') as file:
+                        study_data = json.load(file)
+                rows.append(self._row(path, study_data, synced=bool(previous[2]) if previous else False))
+            except Exception as e:
+                print(f"Error indexando estudio {filename}: {e}")
+
+        if rows:
+            self._store(rows)
+
+        missing = set(known) - present
+        if missing:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany("DELETE FROM studies WHERE filename = ?", [(name,) for name in missing])
+
+        return len(rows)
+
+    def list(self, search=None, sort_by='timestamp', descending=True, synced=None, limit=None):
+        """
+        Listar estudios del índice
+
+        Args:
+            search (str): Texto a buscar en nombre o RUT (None para todos)
+            sort_by (str): Campo de orden (uno de SORT_FIELDS)
+            descending (bool): True para orden descendente
+            synced (bool): Filtrar por estado de sincronización (None para todos)
+            limit (int): Máximo de filas (None para todas)
+
+        Returns:
+            list: Dicts con filename, path, nombre, rut, timestamp, n_recordings, synced
+        """
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"Campo de orden desconocido: {sort_by}")
+
+        query = "SELECT * FROM studies"
+        conditions = []
+        params = []
+        if search:
+            conditions.append("(nombre LIKE ? OR rut LIKE ?)")
+            params += [f"%{search}%", f"%{search}%"]
+        if synced is not None:
+            conditions.append("synced = ?")
+            params.append(int(synced))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {sort_by} {'DESC' if descending else 'ASC'}, filename DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        return [
+            {**dict(row), 'synced': bool(row['synced']), 'path': os.path.join(self.folder, row['filename'])}
+            for row in rows
+        ]
+
+    def is_synced(self, filename):
+        """True si el estudio está marcado como subido"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT synced FROM studies WHERE filename = ?",
+                               (os.path.basename(filename),)).fetchone()
+        return bool(row and row['synced'])
@@ -0,0 +1,218 @@
+"""
+Índice de volumen de una curva flujo-volumen
+
+Para ubicar el flujo en un volumen dado hay que encontrar todos los segmentos
+(v[i-1], v[i]) de la curva que cruzan ese volumen. VolumeIndex divide la curva
+en tramos monótonos: dentro de cada uno los volúmenes están ordenados, así
+que los segmentos que cruzan un volumen se obtienen por búsqueda binaria
+(np.searchsorted) en lugar de recorrer toda la curva. Los tramos cuyo rango
+contiene el volumen se ubican con un árbol de segmentos sobre los límites
+ordenados de los tramos: una búsqueda binaria y un recorrido hoja-raíz por
+consulta. El índice se construye una vez por grabación y resuelve muchas
+consultas juntas en intersections_batch.
+"""
+
+import numpy as np
+
+
+class VolumeIndex:
+    """Tramos monótonos de una curva para consultar flujos por volumen"""
+
+    def __init__(self, v, f):
+        """
+        Args:
+            v (numpy.ndarray): Volumen de cada muestra en L
+            f (numpy.ndarray): Flujo de cada muestra en L/s
+        """
+        self.v = np.asarray(v, dtype=np.float64)
+        self.f = np.asarray(f, dtype=np.float64)
+
+        n_segments = max(len(self.v) - 1, 0)
+        if n_segments == 0:
+            self.run_start = np.empty(0, dtype=np.int64)
+            self.run_sign = np.empty(0, dtype=np.float64)
+            self.run_lo = np.empty(0, dtype=np.float64)
+            self.run_hi = np.empty(0, dtype=np.float64)
+            self._build_run_tree()
+            return
+
+        # Dirección de cada segmento; los planos continúan el tramo anterior
+        direction = np.sign(np.diff(self.v))
+        nonzero = np.flatnonzero(direction)
+        if len(nonzero):
+            carried = np.maximum.accumulate(np.where(direction != 0, np.arange(n_segments), -1))
+            direction = np.where(carried >= 0, direction[np.maximum(carried, 0)], direction[nonzero[0]])
+        else:
+            direction = np.ones(n_segments)
+
+        # Un tramo nuevo empieza donde cambia la dirección; el tramo k abarca
+        # los segmentos [run_start[k], run_end[k]) y sus vértices hasta run_end[k]
+        self.run_start = np.concatenate(([0], np.flatnonzero(np.diff(direction)) + 1))
+        self.run_end = np.concatenate((self.run_start[1:], [n_segments]))
+        self.run_sign = direction[self.run_start]
+
+        first_v = self.v[self.run_start]
+        last_v = self.v[self.run_end]
+        self.run_lo = np.minimum(first_v, last_v)
+        self.run_hi = np.maximum(first_v, last_v)
+        self._build_run_tree()
+
+        # Vértices de todos los tramos en un solo arreglo ordenado: dentro de
+        # cada tramo se orienta el volumen para que crezca y se desplaza a una
+        # banda propia [k * width, k * width + rango), así una búsqueda binaria
+        # global responde dentro del tramo k
+        lengths = self.run_end - self.run_start + 1
+        self.key_start = np.cumsum(lengths) - lengths
+        run_of_vertex = np.repeat(np.arange(len(self.run_start)), lengths)
+        vertex = np.arange(lengths.sum()) - np.repeat(self.key_start, lengths) + self.run_start[run_of_vertex]
+
+        self.run_base = self.run_sign * first_v
+        self.band_width = float((self.run_hi - self.run_lo).max()) + 1.0
+        self.keys = self._band_keys(run_of_vertex, self.v[vertex])
+
+    def _build_run_tree(self):
+        """
+        Árbol de segmentos de los rangos de volumen de los tramos
+
+        Las hojas son los límites ordenados de los tramos y los intervalos
+        abiertos entre ellos (posiciones 2i y 2i + 1). Cada tramo se guarda en
+        los nodos que cubren exactamente su rango, a lo sumo dos por nivel; los
+        tramos que contienen un volumen son los guardados en el camino de su
+        hoja a la raíz.
+        """
+        self.bounds = np.unique(np.concatenate((self.run_lo, self.run_hi)))
+        self.n_slots = max(2 * len(self.bounds) - 1, 0)
+        self.tree_size = 1 << max(self.n_slots - 1, 0).bit_length()
+
+        # Descomposición canónica de [hoja del mínimo, hoja del máximo], de abajo hacia arriba
+        left = 2 * np.searchsorted(self.bounds, self.run_lo) + self.tree_size
+        right = 2 * np.searchsorted(self.bounds, self.run_hi) + 1 + self.tree_size
+        runs = np.arange(len(self.run_lo))
+        nodes, owners = [], []
+        while len(runs):
+            take = (left & 1).astype(bool)
+            nodes.append(left[take])
+            owners.append(runs[take])
+            left = left + take
+
+            take = (right & 1).astype(bool)
+            right = right - take
+            nodes.append(right[take])
+            owners.append(runs[take])
+
+            left >>= 1
+            right >>= 1
+            keep = left < right
+            left, right, runs = left[keep], right[keep], runs[keep]
+
+        nodes = np.concatenate(nodes) if nodes else np.empty(0, dtype=np.int64)
+        owners = np.concatenate(owners) if owners else np.empty(0, dtype=np.int64)
+        order = np.argsort(nodes, kind='stable')
+        self.node_runs = owners[order]
+        self.node_start = np.searchsorted(nodes[order], np.arange(2 * self.tree_size + 1))
+
+    def _runs_containing(self, x):
+        """
+        Pares (tramo, consulta) cuyo rango de volumen contiene el valor
+
+        Args:
+            x (numpy.ndarray): Volúmenes consultados
+
+        Returns:
+            tuple: (índices de tramo, índices de consulta)
+        """
+        if self.n_slots == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+
+        # Hoja de cada consulta: un límite exacto o el intervalo entre dos
+        i = np.searchsorted(self.bounds, x, side='left')
+        exact = self.bounds[np.minimum(i, len(self.bounds) - 1)] == x
+        slot = np.where(exact, 2 * i, 2 * i - 1)
+        queries = np.flatnonzero((slot >= 0) & (slot < self.n_slots))
+
+        # Nodos del camino hoja-raíz y tramos guardados en cada uno
+        levels = self.tree_size.bit_length()
+        path = ((slot[queries, None] + self.tree_size) >> np.arange(levels)).ravel()
+        start = self.node_start[path]
+        counts = self.node_start[path + 1] - start
+        total = int(counts.sum())
+
+        offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        runs = self.node_runs[np.repeat(start, counts) + offset]
+        return runs, np.repeat(np.repeat(queries, levels), counts)
+
+    def _band_keys(self, runs, volumes):
+        """Posición de cada volumen en la banda de su tramo"""
+        return (self.run_sign[runs] * volumes - self.run_base[runs]) + runs * self.band_width
+
+    def intersections_batch(self, volumes):
+        """
+        Flujos máximo positivo y mínimo negativo donde la curva cruza cada volumen
+
+        Args:
+            volumes (numpy.ndarray): Volúmenes a consultar en L
+
+        Returns:
+            tuple: (flujos positivos, flujos negativos) como arreglos, NaN donde no hay cruce
+        """
+        x = np.atleast_1d(np.asarray(volumes, dtype=np.float64))
+        positive = np.full(len(x), -np.inf)
+        negative = np.full(len(x), np.inf)
+
+        runs, queries = self._runs_containing(x)
+
+        if len(runs):
+            target = self._band_keys(runs, x[queries])
+
+            # Vértices del tramo menores (o iguales) al valor buscado
+            below = np.searchsorted(self.keys, target, side='left') - self.key_start[runs]
+            below_or_equal = np.searchsorted(self.keys, target, side='right') - self.key_start[runs]
+            at_end = below_or_equal > self.run_end[runs] - self.run_start[runs]
+
+            # Segmentos j del tramo con key[j] <= valor <= key[j + 1]
+            first = np.maximum(below - 1, 0)
+            last = below_or_equal - at_end
+            counts = np.maximum(last - first, 0)
+            total = int(counts.sum())
+
+            query_of = np.repeat(queries, counts)
+            offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            seg = np.repeat(self.run_start[runs] + first, counts) + offset
+
+            # Verificación exacta con los volúmenes originales (el desplazamiento
+            # por bandas puede redondear) y descarte de segmentos planos
+            v0 = self.v[seg]
+            v1 = self.v[seg + 1]
+            xq = x[query_of]
+            valid = (v1 != v0) & (np.minimum(v0, v1) <= xq) & (xq <= np.maximum(v0, v1))
+            seg, query_of, v0, v1, xq = seg[valid], query_of[valid], v0[valid], v1[valid], xq[valid]
+
+            # Interpolación lineal del flujo en el volumen consultado
+            frac = (xq - v0) / (v1 - v0)
+            flow = self.f[seg] + frac * (self.f[seg + 1] - self.f[seg])
+
+            is_positive = flow > 0
+            is_negative = flow < 0
+            np.maximum.at(positive, query_of[is_positive], flow[is_positive])
+            np.minimum.at(negative, query_of[is_negative], flow[is_negative])
+
+        positive[np.isneginf(positive)] = np.nan
+        negative[np.isposinf(negative)] = np.nan
+        return positive, negative
+
+    def intersections(self, volume):
+        """
+        Flujo máximo positivo y mínimo negativo donde la curva cruza un volumen
+
+        Args:
+            volume (float): Volumen en L
+
+        Returns:
+            tuple: (flujo_positivo, flujo_negativo), None donde no hay cruce
+        """
+        positive, negative = self.intersections_batch([volume])
+        return (
+            None if np.isnan(positive[0]) else float(positive[0]),
+            None if np.isnan(negative[0]) else float(negative[0])
+        )